@@ -3,14 +3,13 @@ import sqlite3
 
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app.auth import require_admin
 from app.db import get_connection
 from app.security import hash_password
+from app.templating import templates
 
 router = APIRouter(prefix="/admin", tags=["admin"])
-templates = Jinja2Templates(directory="templates")
 
 
 @router.get("/usuarios")
@@ -0,0 +1,244 @@
+# app/analytics.py
+import logging
+import os
+import threading
+import time
+
+from app import db
+from app.saldos import SALDOS_SQL
+from app.utils import co_date_today, dia_de
+
+log = logging.getLogger("bless.analytics")
+
+# Reportes pesados (rollups por mes, por cobrador, antigüedad de mora) sobre
+# todo el histórico. Si duckdb está instalado corren en un DuckDB embebido
+# (columnar, vectorizado); si no, el mismo SQL corre en la BD normal.
+# El camino transaccional (app.db) no cambia: DuckDB solo lee.
+# - SQLite: se adjunta el archivo de la BD en modo lectura (extensión sqlite)
+# - Postgres (o si la extensión no carga): snapshot en Parquet de las tablas,
+#   rehecho cuando cambian los datos o pasa ANALYTICS_SNAPSHOT_TTL
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "duckdb")  # duckdb | db
+ANALYTICS_SOURCE = os.getenv("ANALYTICS_SOURCE", "auto")    # auto | snapshot
+ANALYTICS_SNAPSHOT_DIR = os.getenv("ANALYTICS_SNAPSHOT_DIR", "/tmp/bless_analytics")
+ANALYTICS_SNAPSHOT_TTL = int(os.getenv("ANALYTICS_SNAPSHOT_TTL", "900"))  # segundos
+
+TABLAS = ("clientes", "pagos", "base_dia", "gastos", "seguros_recaudos", "prestamos")
+
+_lock = threading.Lock()
+_con = None
+_fuente = ""           # "sqlite" | "snapshot"
+_snapshot_version = ""
+_snapshot_at = 0.0
+_duckdb = None         # módulo duckdb; None = sin probar, False = no instalado
+
+
+def _modulo_duckdb():
+    """duckdb se importa la primera vez que se pide un reporte, no al arrancar."""
+    global _duckdb
+    if _duckdb is None:
+        try:
+            import duckdb  # opcional: pip install duckdb
+        except Exception:
+            duckdb = False
+        _duckdb = duckdb
+    return _duckdb or None
+
+
+def disponible() -> bool:
+    return ANALYTICS_ENGINE == "duckdb" and _modulo_duckdb() is not None
+
+
+def motor() -> str:
+    if not disponible():
+        return "db"
+    return f"duckdb-{_fuente}" if _fuente else "duckdb"
+
+
+# -------------------------
+# Fuente de datos de DuckDB
+# -------------------------
+_TIPOS = {
+    "integer": "BIGINT", "bigint": "BIGINT", "smallint": "BIGINT",
+    "real": "DOUBLE", "double precision": "DOUBLE", "numeric": "DOUBLE",
+    "date": "DATE", "timestamp with time zone": "TIMESTAMPTZ",
+    "timestamp without time zone": "TIMESTAMP", "boolean": "BOOLEAN",
+}
+
+
+def _columnas(tabla: str) -> list[tuple[str, str]]:
+    """(columna, tipo DuckDB) de una tabla de la BD."""
+    if db.db_kind() == "sqlite":
+        rows = db.fetch_all(f'PRAGMA table_info("{tabla}")')
+        return [(r["name"], _TIPOS.get((r["type"] or "").lower(), "VARCHAR")) for r in rows]
+    rows = db.fetch_all("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_name = ? ORDER BY ordinal_position
+    """, [tabla])
+    return [(r["column_name"], _TIPOS.get(r["data_type"], "VARCHAR")) for r in rows]
+
+
+def _snapshot_tabla(con, tabla: str):
+    """Copia la tabla a Parquet por lotes (db.stream) y deja una vista encima."""
+    import pandas as pd
+
+    cols = _columnas(tabla)
+    if not cols:
+        return
+    path = os.path.join(ANALYTICS_SNAPSHOT_DIR, f"{tabla}.parquet")
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    ddl = ", ".join(f'"{c}" {t}' for c, t in cols)
+    select_cols = ", ".join(f'"{c}"' for c, _ in cols)
+    con.execute(f'CREATE OR REPLACE TEMP TABLE "_stg_{tabla}" ({ddl})')
+    with db.stream(f'SELECT {select_cols} FROM "{tabla}"') as s:
+        for lote in s.batches():
+            lote_df = pd.DataFrame.from_records(lote, columns=s.columns)
+            con.register("_lote", lote_df)
+            con.execute(f'INSERT INTO "_stg_{tabla}" SELECT * FROM _lote')
+            con.unregister("_lote")
+    con.execute(f"COPY \"_stg_{tabla}\" TO '{tmp}' (FORMAT parquet)")
+    con.execute(f'DROP TABLE "_stg_{tabla}"')
+    os.replace(tmp, path)
+    con.execute(f"CREATE OR REPLACE VIEW \"{tabla}\" AS SELECT * FROM read_parquet('{path}')")
+
+
+def _refrescar_snapshot(con):
+    global _snapshot_version, _snapshot_at
+    version = db.data_version(*TABLAS)
+    if version == _snapshot_version and time.time() - _snapshot_at < ANALYTICS_SNAPSHOT_TTL:
+        return
+    os.makedirs(ANALYTICS_SNAPSHOT_DIR, exist_ok=True)
+    t0 = time.perf_counter()
+    for t in TABLAS:
+        _snapshot_tabla(con, t)
+    _snapshot_version, _snapshot_at = version, time.time()
+    log.info("Snapshot Parquet para analítica en %.0f ms", (time.perf_counter() - t0) * 1000)
+
+
+def _adjuntar_sqlite(con) -> bool:
+    try:
+        con.execute("INSTALL sqlite")
+        con.execute("LOAD sqlite")
+        con.execute(f"ATTACH '{db.DB_PATH}' AS bless (TYPE sqlite, READ_ONLY)")
+        # vistas en main: los cursores no heredan un USE de la conexión
+        for t in TABLAS:
+            con.execute(f'CREATE OR REPLACE VIEW "{t}" AS SELECT * FROM bless."{t}"')
+        return True
+    except Exception as e:
+        log.warning("DuckDB no pudo adjuntar SQLite (%s); se usa snapshot Parquet", e)
+        return False
+
+
+def _conexion():
+    """Conexión DuckDB lista para consultar (crea/refresca la fuente si hace falta)."""
+    global _con, _fuente, _snapshot_version
+    with _lock:
+        if _con is None:
+            _snapshot_version = ""
+            con = _modulo_duckdb().connect(":memory:")
+            usar_sqlite = db.db_kind() == "sqlite" and ANALYTICS_SOURCE != "snapshot"
+            _fuente = "sqlite" if usar_sqlite and _adjuntar_sqlite(con) else "snapshot"
+            _con = con
+        if _fuente == "snapshot":
+            _refrescar_snapshot(_con)
+        # cursor propio por consulta: DuckDB permite usarlos desde varios hilos
+        return _con.cursor()
+
+
+def consultar(sql: str, params: list | None = None) -> list[dict]:
+    """Corre el reporte en DuckDB si está disponible; si falla o no hay, en la BD."""
+    params = list(params or [])
+    if disponible():
+        try:
+            cur = _conexion()
+            try:
+                res = cur.execute(sql, params)
+                cols = [d[0] for d in res.description]
+                return [dict(zip(cols, r)) for r in res.fetchall()]
+            finally:
+                cur.close()
+        except Exception as e:
+            log.warning("Reporte en DuckDB falló (%s); se usa la BD", e)
+    return db.fetch_all(sql, params)
+
+
+# =========================
+# REPORTES
+# =========================
+# SQL común a SQLite, Postgres y DuckDB. Rangos [desde, hasta) en "YYYY-MM-DD".
+_MES = "substr(CAST(fecha AS TEXT), 1, 7)"
+
+RESUMEN_MENSUAL_SQL = f"""
+    SELECT mes,
+           SUM(base) AS base, SUM(gastos) AS gastos, SUM(seguros) AS seguros,
+           SUM(prestado) AS prestado, SUM(recaudo) AS recaudo, SUM(desembolsado) AS desembolsado
+    FROM (
+        SELECT {_MES} AS mes, base_valor AS base, 0 AS gastos, 0 AS seguros, 0 AS prestado, 0 AS recaudo, 0 AS desembolsado
+        FROM base_dia WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT {_MES}, 0, valor, 0, 0, 0, 0 FROM gastos WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT {_MES}, 0, 0, valor, 0, 0, 0 FROM seguros_recaudos WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT {_MES}, 0, 0, 0, valor, 0, 0 FROM prestamos WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT {_MES}, 0, 0, 0, 0,
+               CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN 0 ELSE COALESCE(monto, 0) END,
+               CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN COALESCE(monto_entregado, 0) ELSE 0 END
+        FROM pagos WHERE fecha >= ? AND fecha < ?
+    ) x
+    GROUP BY mes
+    ORDER BY mes
+"""
+
+POR_COBRADOR_SQL = """
+    SELECT cobrador, SUM(seguros) AS seguros, SUM(gastos) AS gastos, SUM(prestado) AS prestado
+    FROM (
+        SELECT COALESCE(cobrador_username, '') AS cobrador, valor AS seguros, 0 AS gastos, 0 AS prestado
+        FROM seguros_recaudos WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT COALESCE(cobrador_username, ''), 0, valor, 0 FROM gastos WHERE fecha >= ? AND fecha < ?
+        UNION ALL
+        SELECT COALESCE(cobrador_username, ''), 0, 0, valor FROM prestamos WHERE fecha >= ? AND fecha < ?
+    ) x
+    GROUP BY cobrador
+    ORDER BY seguros DESC, cobrador
+"""
+
+# Antigüedad de la mora sobre la misma base que /saldos (app.saldos.SALDOS_SQL)
+MORA_AGING_SQL = f"""
+    SELECT tramo, COUNT(*) AS clientes, SUM(saldo) AS saldo
+    FROM (
+        SELECT saldo,
+               CASE WHEN dias <= 0 THEN '0 al día'
+                    WHEN dias <= 30 THEN '1-30'
+                    WHEN dias <= 60 THEN '31-60'
+                    WHEN dias <= 90 THEN '61-90'
+                    ELSE '90+' END AS tramo
+        FROM (
+            SELECT prestado - abonos AS saldo,
+                   ? - (COALESCE(abono_dia, prestamo_dia)
+                        + CASE frecuencia WHEN 'diario' THEN 1 WHEN 'semanal' THEN 7
+                                          WHEN 'quincenal' THEN 15 ELSE 30 END) AS dias
+            FROM ({SALDOS_SQL}) s
+            WHERE prestamo_dia IS NOT NULL AND prestado - abonos > 0
+        ) d
+    ) t
+    GROUP BY tramo
+    ORDER BY tramo
+"""
+
+
+def resumen_mensual(desde: str, hasta: str) -> list[dict]:
+    return consultar(RESUMEN_MENSUAL_SQL, [desde, hasta] * 5)
+
+
+def por_cobrador(desde: str, hasta: str) -> list[dict]:
+    rows = consultar(POR_COBRADOR_SQL, [desde, hasta] * 3)
+    for r in rows:
+        r["cobrador"] = r["cobrador"] or "(sin cobrador)"
+    return rows
+
+
+def mora_aging() -> list[dict]:
+    return consultar(MORA_AGING_SQL, [dia_de(co_date_today())])
@@ -0,0 +1,206 @@
+# app/api_v1.py
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from app import db
+from app.auth import require_user
+from app.clientes import borrar_cliente, guardar_cliente
+from app.cobros import desmarcar_no_cobrar, marcar_no_cobrar, registrar_pagos_rapidos
+from app.contabilidad import (
+    borrar_gasto,
+    guardar_base_dia,
+    insertar_gasto,
+    insertar_prestamo,
+    insertar_seguro,
+    totales_dia,
+)
+from app.pagos import crear_movimiento, eliminar_movimiento, saldos_de, validar_movimiento
+from app.schemas.api_v1 import (
+    BaseDiaIn,
+    CedulaIn,
+    ClienteIn,
+    GastoIn,
+    MovimientoIn,
+    PagoRapidoIn,
+    PrestamoCajaIn,
+    SeguroIn,
+)
+
+# Variantes JSON de los formularios: mismas escrituras, pero sin el 303 a la
+# pantalla completa. Cada respuesta trae solo la fila creada/actualizada y el
+# saldo (o la caja del día) que cambió, para que el teléfono no tenga que
+# volver a bajar /pagos o /contabilidad después de cada operación.
+router = APIRouter(prefix="/api/v1", tags=["api"])
+
+
+def _error(detalle: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": detalle}, status_code=status_code)
+
+
+def _user(request: Request):
+    user = require_user(request)
+    if isinstance(user, RedirectResponse):
+        return None
+    return user
+
+
+def _no_admin(request: Request) -> JSONResponse | None:
+    """Respuesta de error si no hay sesión de administrador; None si puede seguir."""
+    user = _user(request)
+    if user is None:
+        return _error("sesión vencida", 401)
+    if user.get("role") != "admin":
+        return _error("Solo administrador.", 403)
+    return None
+
+
+# =========================
+# PAGOS (libro de movimientos)
+# =========================
+@router.post("/pagos", status_code=201)
+def api_crear_pago(request: Request, body: MovimientoIn):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    fila, motivo = validar_movimiento(body.model_dump())
+    if fila is None:
+        return _error(motivo, 422)
+    if not db.fetch_one("SELECT id FROM clientes WHERE id = ?", [body.cliente_id]):
+        return _error("cliente no existe", 404)
+
+    return crear_movimiento(fila)
+
+
+@router.delete("/pagos/{pago_id}")
+def api_eliminar_pago(request: Request, pago_id: int):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    row = eliminar_movimiento(pago_id)
+    if row is None:
+        return _error("pago no existe", 404)
+    return row
+
+
+# =========================
+# CLIENTES
+# =========================
+@router.post("/clientes", status_code=201)
+def api_crear_cliente(request: Request, body: ClienteIn):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    cliente = guardar_cliente(**body.model_dump())
+    return {"cliente": cliente, "saldo": 0}
+
+
+@router.put("/clientes/{cliente_id}")
+def api_actualizar_cliente(request: Request, cliente_id: int, body: ClienteIn):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    cliente = guardar_cliente(**body.model_dump(), cliente_id=cliente_id)
+    if cliente is None:
+        return _error("cliente no existe", 404)
+    return {"cliente": cliente, "saldo": saldos_de([cliente_id])[cliente_id]}
+
+
+@router.delete("/clientes/{cliente_id}")
+def api_eliminar_cliente(request: Request, cliente_id: int):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    if not borrar_cliente(cliente_id):
+        return _error("cliente no existe", 404)
+    return {"id": cliente_id, "eliminado": True}
+
+
+# =========================
+# CONTABILIDAD (solo admin)
+# =========================
+@router.put("/contabilidad/base")
+def api_guardar_base(request: Request, body: BaseDiaIn):
+    err = _no_admin(request)
+    if err:
+        return err
+
+    base = guardar_base_dia(body.fecha, body.base_valor)
+    return {"base": base, "totales": totales_dia(body.fecha)}
+
+
+@router.post("/contabilidad/gastos", status_code=201)
+def api_crear_gasto(request: Request, body: GastoIn):
+    err = _no_admin(request)
+    if err:
+        return err
+
+    gasto = insertar_gasto(body.fecha, body.concepto, body.categoria, body.valor, body.cobrador_username)
+    return {"gasto": gasto, "totales": totales_dia(body.fecha)}
+
+
+@router.delete("/contabilidad/gastos/{gasto_id}")
+def api_eliminar_gasto(request: Request, gasto_id: int):
+    err = _no_admin(request)
+    if err:
+        return err
+
+    row = borrar_gasto(gasto_id)
+    if row is None:
+        return _error("gasto no existe", 404)
+    return {"id": gasto_id, "totales": totales_dia(str(row["fecha"]))}
+
+
+@router.post("/contabilidad/seguros", status_code=201)
+def api_crear_seguro(request: Request, body: SeguroIn):
+    err = _no_admin(request)
+    if err:
+        return err
+
+    seguro = insertar_seguro(body.fecha, body.cobrador_username, body.valor)
+    if seguro is None:
+        return _error("falta el cobrador", 422)
+    return {"seguro": seguro, "totales": totales_dia(body.fecha)}
+
+
+@router.post("/contabilidad/prestamos", status_code=201)
+def api_crear_prestamo(request: Request, body: PrestamoCajaIn):
+    err = _no_admin(request)
+    if err:
+        return err
+
+    prestamo = insertar_prestamo(body.fecha, body.valor, body.cliente_id, body.cobrador_username, body.observaciones)
+    return {"prestamo": prestamo, "totales": totales_dia(body.fecha)}
+
+
+# =========================
+# COBROS (Excel)
+# =========================
+@router.post("/cobros/pago_rapido", status_code=201)
+def api_pago_rapido(request: Request, body: PagoRapidoIn):
+    user = _user(request)
+    if user is None:
+        return _error("sesión vencida", 401)
+
+    res = registrar_pagos_rapidos([body.model_dump()], str(user.get("username") or ""))[0]
+    if res["estado"] != "ok":
+        return _error(res["detalle"], 404 if res["detalle"] == "cliente no existe" else 422)
+    return {"cedula": body.cedula, "valor": res["valor"], "saldo": res["saldo"]}
+
+
+@router.post("/cobros/no_cobrar_hoy")
+def api_no_cobrar_hoy(request: Request, body: CedulaIn):
+    user = _user(request)
+    if user is None:
+        return _error("sesión vencida", 401)
+
+    nuevo = marcar_no_cobrar(body.cedula, str(user.get("username") or ""))
+    return {"cedula": body.cedula.strip(), "no_cobrar_hoy": True, "cambio": nuevo}
+
+
+@router.delete("/cobros/no_cobrar_hoy/{cedula}")
+def api_deshacer_no_cobrar_hoy(request: Request, cedula: str):
+    if _user(request) is None:
+        return _error("sesión vencida", 401)
+
+    quitado = desmarcar_no_cobrar(cedula)
+    return {"cedula": cedula.strip(), "no_cobrar_hoy": False, "cambio": quitado}
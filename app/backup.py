@@ -1,10 +1,39 @@
+import argparse
+import gzip
+import hashlib
 import os
 import shutil
+import sqlite3
+import tempfile
+import time
 from datetime import datetime
 
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from app import db
+from app.auth import require_admin
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
 DATA_DIR = "data"
 BACKUP_DIR = "backup"
 
+# -------------------------
+# Backup de la BD (en caliente)
+# -------------------------
+DB_BACKUP_DIR = os.getenv("DB_BACKUP_DIR", os.path.join(BACKUP_DIR, "db"))
+DB_BACKUP_KEEP = int(os.getenv("DB_BACKUP_KEEP", "14"))      # snapshots que se conservan
+DB_BACKUP_PAGES = int(os.getenv("DB_BACKUP_PAGES", "256"))   # páginas SQLite por paso
+DB_BACKUP_PAUSE = float(os.getenv("DB_BACKUP_PAUSE", "0.005"))  # segundos entre pasos
+
+# Tablas que no se vuelcan en Postgres: schema_version la escribe init_db al
+# crear el esquema donde se restaura (el volcado es solo de datos)
+PG_SKIP_TABLES = ("schema_version",)
+
+_CHUNK = 1024 * 1024
+
+
 def hacer_backup():
     if not os.path.exists(DATA_DIR):
         return
@@ -16,3 +45,249 @@ def hacer_backup():
     ruta = os.path.join(BACKUP_DIR, nombre)
 
     shutil.make_archive(ruta.replace(".zip", ""), "zip", DATA_DIR)
+
+
+def _gzip_and_hash(src_path: str, dst_path: str) -> str:
+    """Comprime src_path en dst_path y devuelve el sha256 del .gz."""
+    h = hashlib.sha256()
+    with open(src_path, "rb") as fin, open(dst_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+            while True:
+                chunk = fin.read(_CHUNK)
+                if not chunk:
+                    break
+                gz.write(chunk)
+    with open(dst_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _backup_sqlite(dst_gz: str) -> str:
+    """
+    Copia consistente con sqlite3.Connection.backup(), por lotes de páginas.
+    Entre lotes se duerme un poco para que los requests sigan escribiendo.
+    """
+    def _ceder(status, remaining, total):
+        if remaining:
+            time.sleep(DB_BACKUP_PAUSE)
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(dst_gz))
+    os.close(fd)
+    try:
+        src = sqlite3.connect(db.DB_PATH, timeout=30)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            src.backup(dst, pages=DB_BACKUP_PAGES, progress=_ceder)
+        finally:
+            dst.close()
+            src.close()
+        return _gzip_and_hash(tmp_path, dst_gz)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _pg_tables(conn) -> list[str]:
+    """
+    Tablas de la BD (information_schema), padres antes que hijos según las FK,
+    para que el COPY se pueda restaurar en orden. Así una tabla nueva entra
+    sola al backup.
+    """
+    tablas = [r[0] for r in conn.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+        ORDER BY table_name
+    """).fetchall() if r[0] not in PG_SKIP_TABLES]
+    padres: dict[str, set[str]] = {t: set() for t in tablas}
+    for hijo, padre in conn.execute("""
+        SELECT tc.table_name, ccu.table_name
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.constraint_column_usage ccu
+          ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+        WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public'
+    """).fetchall():
+        if hijo in padres and padre in padres and padre != hijo:
+            padres[hijo].add(padre)
+
+    orden = []
+    pendientes = dict(padres)
+    while pendientes:
+        listas = sorted(t for t, ps in pendientes.items() if not ps & pendientes.keys())
+        if not listas:
+            # ciclo de FK: el resto en orden alfabético
+            listas = sorted(pendientes)
+        for t in listas:
+            orden.append(t)
+            pendientes.pop(t)
+    return orden
+
+
+def _backup_postgres(dst_gz: str) -> str:
+    """
+    Equivalente a `pg_dump --data-only`: COPY ... TO STDOUT por tabla,
+    transmitido directo al .gz sin cargar la tabla en memoria.
+    """
+    if db.psycopg is None:
+        raise RuntimeError("psycopg no está instalado pero DATABASE_URL es Postgres.")
+
+    conn = db.psycopg.connect(db.DATABASE_URL)
+    # Snapshot consistente entre tablas
+    conn.isolation_level = db.psycopg.IsolationLevel.REPEATABLE_READ
+    conn.read_only = True
+    try:
+        with open(dst_gz, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+            gz.write(b"-- bless backup (COPY)\nSET client_encoding = 'UTF8';\n")
+            for t in _pg_tables(conn):
+                gz.write(f"\nCOPY {t} FROM stdin;\n".encode())
+                with conn.cursor().copy(f"COPY {t} TO STDOUT") as copy:
+                    for data in copy:
+                        gz.write(data)
+                gz.write(b"\\.\n")
+                gz.write(
+                    f"SELECT setval(pg_get_serial_sequence('{t}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {t}), 1)) "
+                    f"WHERE pg_get_serial_sequence('{t}', 'id') IS NOT NULL;\n".encode()
+                )
+        conn.rollback()
+    finally:
+        conn.close()
+
+    h = hashlib.sha256()
+    with open(dst_gz, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _snapshots() -> list[str]:
+    """Snapshots completos (con su .sha256), del más viejo al más nuevo."""
+    archivos = set(os.listdir(DB_BACKUP_DIR))
+    return sorted(
+        f for f in archivos
+        if f.startswith("bless_") and f.endswith(".gz") and f + ".sha256" in archivos
+    )
+
+
+def _aplicar_retencion(keep: int) -> list[str]:
+    """Borra los snapshots más viejos (y su .sha256), dejando los últimos `keep`."""
+    snaps = _snapshots()
+    borrados = []
+    for f in snaps[:-keep] if keep > 0 else []:
+        for p in (f, f + ".sha256"):
+            try:
+                os.remove(os.path.join(DB_BACKUP_DIR, p))
+            except OSError:
+                pass
+        borrados.append(f)
+    return borrados
+
+
+def backup_base_datos(keep: int | None = None) -> dict:
+    """
+    Snapshot comprimido + sha256 de la BD activa (SQLite o Postgres),
+    y aplica la retención. Devuelve info del archivo creado.
+    """
+    os.makedirs(DB_BACKUP_DIR, exist_ok=True)
+
+    kind = db.db_kind()
+    fecha = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ext = "db.gz" if kind == "sqlite" else "sql.gz"
+    nombre = f"bless_{fecha}.{ext}"
+    ruta = os.path.join(DB_BACKUP_DIR, nombre)
+
+    t0 = time.perf_counter()
+    # se escribe en .tmp y solo se renombra si terminó bien: un backup cortado
+    # no queda como snapshot ni cuenta para la retención
+    tmp = ruta + ".tmp"
+    try:
+        if kind == "sqlite":
+            sha = _backup_sqlite(tmp)
+        else:
+            sha = _backup_postgres(tmp)
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    # Formato compatible con `sha256sum -c`
+    with open(ruta + ".sha256", "w", encoding="utf-8") as f:
+        f.write(f"{sha}  {nombre}\n")
+
+    borrados = _aplicar_retencion(DB_BACKUP_KEEP if keep is None else keep)
+
+    return {
+        "archivo": nombre,
+        "motor": kind,
+        "bytes": os.path.getsize(ruta),
+        "sha256": sha,
+        "segundos": round(time.perf_counter() - t0, 3),
+        "borrados": borrados,
+    }
+
+
+def verificar_backup(nombre: str) -> bool:
+    ruta = os.path.join(DB_BACKUP_DIR, os.path.basename(nombre))
+    try:
+        with open(ruta + ".sha256", encoding="utf-8") as f:
+            esperado = f.read().split()[0]
+    except (OSError, IndexError):
+        return False
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest() == esperado
+
+
+# =========================
+# ENDPOINTS (solo admin)
+# =========================
+@router.post("/backup")
+def crear_backup(request: Request):
+    user = require_admin(request)
+    if isinstance(user, RedirectResponse):
+        return user
+
+    try:
+        info = backup_base_datos()
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
+    return JSONResponse({"ok": True, **info})
+
+
+@router.get("/backup")
+def listar_backups(request: Request):
+    user = require_admin(request)
+    if isinstance(user, RedirectResponse):
+        return user
+
+    if not os.path.isdir(DB_BACKUP_DIR):
+        return JSONResponse([])
+
+    snaps = sorted(_snapshots(), reverse=True)
+    return JSONResponse([
+        {"archivo": f, "bytes": os.path.getsize(os.path.join(DB_BACKUP_DIR, f))}
+        for f in snaps
+    ])
+
+
+# Uso: python -m app.backup [--keep N] [--verificar ARCHIVO]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup en caliente de la BD de Bless")
+    parser.add_argument("--keep", type=int, default=None, help="snapshots a conservar")
+    parser.add_argument("--verificar", metavar="ARCHIVO", help="valida el sha256 de un snapshot")
+    args = parser.parse_args()
+
+    if args.verificar:
+        ok = verificar_backup(args.verificar)
+        print("✅ OK" if ok else "❌ Checksum inválido")
+        raise SystemExit(0 if ok else 1)
+
+    info = backup_base_datos(keep=args.keep)
+    print("✅ Backup creado:", os.path.join(DB_BACKUP_DIR, info["archivo"]), f"({info['bytes']} bytes)")
@@ -0,0 +1,179 @@
+# app/cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from app import db
+from app.utils import co_date_today
+
+# Cache de páginas completas para vistas de solo lectura.
+# Llave = (ruta, params, rol[, usuario], día, versión de datos). La versión sale
+# de app.db.data_version (contadores por tabla) o del mtime de los Excel, así
+# que una escritura invalida sola; no hay TTL. Las escrituras de otros workers
+# llegan por el aviso de cambios de app.db (start_invalidation_bus).
+# El ETag es función de la llave y Last-Modified es la última escritura en las
+# tablas/archivos: If-None-Match / If-Modified-Since responden 304 sin
+# consultar la BD ni renderizar.
+PAGE_CACHE = os.getenv("PAGE_CACHE", "1") == "1"
+PAGE_CACHE_MAX = int(os.getenv("PAGE_CACHE_MAX", "256"))                 # entradas
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", "4194304"))  # por entrada
+
+_lock = threading.Lock()
+_pages: "OrderedDict[str, tuple[bytes, str | None]]" = OrderedDict()
+_stats = {"hit": 0, "miss": 0, "not_modified": 0}
+
+
+def _files_version(files) -> str:
+    out = []
+    for path in files:
+        try:
+            st = os.stat(path)
+            out.append(f"{st.st_mtime_ns:x}-{st.st_size:x}")
+        except OSError:
+            out.append("0")
+    return ",".join(out)
+
+
+def _files_mtime(files) -> float:
+    out = 0.0
+    for path in files:
+        try:
+            out = max(out, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return out
+
+
+def _etag(key: str) -> str:
+    return 'W/"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def _is_fresh(request: Request, etag: str, modified: float | None) -> bool:
+    inm = request.headers.get("if-none-match", "")
+    if inm:
+        # If-None-Match manda sobre If-Modified-Since (RFC 9110)
+        if inm.strip() == "*":
+            return True
+        # Comparación débil: W/"x" == "x"
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    ims = request.headers.get("if-modified-since", "")
+    if ims and modified:
+        try:
+            return int(modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _headers(etag: str, modified: float | None) -> dict:
+    # private: el HTML depende de la sesión; no-cache: el navegador revalida siempre
+    h = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    if modified:
+        h["Last-Modified"] = formatdate(modified, usegmt=True)
+    return h
+
+
+def not_modified(etag: str, modified: float | None = None) -> Response:
+    return Response(status_code=304, headers=_headers(etag, modified))
+
+
+def page_key(request: Request, user, tables=(), files=(), vary_user: bool = False) -> str:
+    role = user.get("role", "") if isinstance(user, dict) else "anon"
+    who = user.get("username", "") if vary_user and isinstance(user, dict) else ""
+    if "token" in request.cookies:
+        role += "+sesion"  # base.html cambia el menú con la cookie
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    if tables:
+        try:
+            db.revisar_cambios()
+        except Exception:
+            pass  # el hilo del aviso se reconecta solo
+    version = db.data_version(*tables) if tables else ""
+    if files:
+        version += "|" + _files_version(files)
+    return f"{request.url.path}?{params}|{role}|{who}|{co_date_today()}|{version}"
+
+
+def last_modified(tables=(), files=()) -> float:
+    out = db.last_modified(*tables) if tables else 0.0
+    if files:
+        out = max(out, _files_mtime(files))
+    return out
+
+
+def cached_page(
+    request: Request,
+    render: Callable[[], Response],
+    *,
+    user=None,
+    tables: tuple = (),
+    files: tuple = (),
+    vary_user: bool = False,
+) -> Response:
+    """
+    Devuelve la página desde cache (o 304) si los datos no cambiaron; si no,
+    llama render() y guarda el HTML. Solo se guardan respuestas 200.
+
+    - user: dict de la sesión (None/RedirectResponse = anónimo)
+    - tables: tablas de la BD que lee la vista
+    - files: archivos (Excel) que lee la vista
+    - vary_user: la plantilla muestra el usuario (no basta con el rol)
+    """
+    if not PAGE_CACHE:
+        return render()
+
+    key = page_key(request, user, tables, files, vary_user)
+    etag = _etag(key)
+    modified = last_modified(tables, files)
+
+    if _is_fresh(request, etag, modified):
+        with _lock:
+            _stats["not_modified"] += 1
+        return not_modified(etag, modified)
+
+    with _lock:
+        hit = _pages.get(key)
+        if hit is not None:
+            _pages.move_to_end(key)
+            _stats["hit"] += 1
+        else:
+            _stats["miss"] += 1
+    if hit is not None:
+        body, media_type = hit
+        return Response(content=body, media_type=media_type, headers=_headers(etag, modified))
+
+    response = render()
+    if response.status_code != 200 or not hasattr(response, "body"):
+        return response
+
+    response.headers.update(_headers(etag, modified))
+    if len(response.body) <= PAGE_CACHE_MAX_BYTES:
+        with _lock:
+            _pages[key] = (bytes(response.body), response.media_type)
+            while len(_pages) > PAGE_CACHE_MAX:
+                _pages.popitem(last=False)
+    return response
+
+
+def cached_json(request: Request, build: Callable[[], Any], **kw) -> Response:
+    """cached_page para endpoints JSON: build() devuelve datos (dicts, modelos ORM...)."""
+    return cached_page(request, lambda: JSONResponse(jsonable_encoder(build())), **kw)
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "entradas": len(_pages)}
+
+
+def clear():
+    with _lock:
+        _pages.clear()
@@ -1,17 +1,21 @@
 # app/clientes.py
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app import db
+from app.cache import cached_page
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 TIPOS_COBRO = ["diario", "semanal", "quincenal", "mensual"]
 
 @router.get("/clientes")
 def listar_clientes(request: Request, edit_id: int | None = None):
+    return cached_page(request, lambda: _render_clientes(request, edit_id), tables=("clientes",))
+
+
+def _render_clientes(request: Request, edit_id: int | None):
     clientes = db.fetch_all("""
         SELECT
             id, nombre, documento, telefono, direccion, observaciones,
@@ -40,6 +44,48 @@ def listar_clientes(request: Request, edit_id: int | None = None):
         }
     )
 
+
+CLIENTE_COLS = """
+    id, nombre, documento, telefono, direccion, observaciones,
+    COALESCE(NULLIF(tipo_cobro,''), 'mensual') AS tipo_cobro
+"""
+
+
+def _tipo_cobro(tipo_cobro: str) -> str:
+    tipo_cobro = (tipo_cobro or "").strip().lower()
+    return tipo_cobro if tipo_cobro in TIPOS_COBRO else "mensual"
+
+
+def guardar_cliente(nombre: str, documento: str = "", telefono: str = "", direccion: str = "",
+                    observaciones: str = "", tipo_cobro: str = "mensual",
+                    cliente_id: int | None = None) -> dict | None:
+    """Crea (cliente_id=None) o actualiza un cliente; devuelve la fila o None si no existe."""
+    params = [nombre, documento, telefono, direccion, observaciones, _tipo_cobro(tipo_cobro)]
+    with db.transaction() as tx:
+        if cliente_id is None:
+            cliente_id = tx.fetch_one("""
+                INSERT INTO clientes (nombre, documento, telefono, direccion, observaciones, tipo_cobro)
+                VALUES (?, ?, ?, ?, ?, ?)
+                RETURNING id
+            """, params)["id"]
+        elif not tx.execute("""
+            UPDATE clientes
+            SET nombre = ?, documento = ?, telefono = ?, direccion = ?, observaciones = ?, tipo_cobro = ?
+            WHERE id = ?
+        """, params + [cliente_id]):
+            return None
+        return tx.fetch_one(f"SELECT {CLIENTE_COLS} FROM clientes WHERE id = ?", [cliente_id])
+
+
+def borrar_cliente(cliente_id: int) -> bool:
+    with db.transaction() as tx:
+        # En Postgres ON DELETE CASCADE elimina pagos.
+        # En SQLite por seguridad, borra pagos primero.
+        if db.db_kind() == "sqlite":
+            tx.execute("DELETE FROM pagos WHERE cliente_id = ?", (cliente_id,))
+        return tx.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,)) > 0
+
+
 @router.post("/clientes/crear")
 def crear_cliente(
     nombre: str = Form(...),
@@ -49,14 +95,7 @@ def crear_cliente(
     observaciones: str = Form(""),
     tipo_cobro: str = Form("mensual"),
 ):
-    tipo_cobro = (tipo_cobro or "").strip().lower()
-    if tipo_cobro not in TIPOS_COBRO:
-        tipo_cobro = "mensual"
-
-    db.execute("""
-        INSERT INTO clientes (nombre, documento, telefono, direccion, observaciones, tipo_cobro)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (nombre, documento, telefono, direccion, observaciones, tipo_cobro))
+    guardar_cliente(nombre, documento, telefono, direccion, observaciones, tipo_cobro)
 
     return RedirectResponse("/clientes", status_code=303)
 
@@ -70,23 +109,11 @@ def actualizar_cliente(
     observaciones: str = Form(""),
     tipo_cobro: str = Form("mensual"),
 ):
-    tipo_cobro = (tipo_cobro or "").strip().lower()
-    if tipo_cobro not in TIPOS_COBRO:
-        tipo_cobro = "mensual"
-
-    db.execute("""
-        UPDATE clientes
-        SET nombre = ?, documento = ?, telefono = ?, direccion = ?, observaciones = ?, tipo_cobro = ?
-        WHERE id = ?
-    """, (nombre, documento, telefono, direccion, observaciones, tipo_cobro, cliente_id))
+    guardar_cliente(nombre, documento, telefono, direccion, observaciones, tipo_cobro, cliente_id)
 
     return RedirectResponse("/clientes", status_code=303)
 
 @router.post("/clientes/eliminar/{cliente_id}")
 def eliminar_cliente(cliente_id: int):
-    # En Postgres ON DELETE CASCADE elimina pagos.
-    # En SQLite por seguridad, borra pagos primero.
-    if db.db_kind() == "sqlite":
-        db.execute("DELETE FROM pagos WHERE cliente_id = ?", (cliente_id,))
-    db.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
+    borrar_cliente(cliente_id)
     return RedirectResponse("/clientes", status_code=303)
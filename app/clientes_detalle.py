@@ -1,19 +1,19 @@
 import os
-import pandas as pd
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app.auth import require_user
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 CLIENTES_XLSX = "data/clientes.xlsx"
 PAGOS_XLSX = "data/pagos.xlsx"
 
 
 def _load_clientes():
+    import pandas as pd
+
     if not os.path.exists(CLIENTES_XLSX):
         return pd.DataFrame(columns=["nombre", "cedula", "telefono", "monto", "tipo_cobro"])
 
@@ -31,6 +31,8 @@ def _load_clientes():
 
 
 def _load_pagos():
+    import pandas as pd
+
     if not os.path.exists(PAGOS_XLSX):
         return pd.DataFrame(columns=["cedula", "cliente", "fecha", "valor", "tipo_cobro"])
 
@@ -53,6 +55,8 @@ def _load_pagos():
 
 @router.get("/clientes/ver", response_class=HTMLResponse)
 def ver_cliente(request: Request, cedula: str):
+    import pandas as pd
+
     user = require_user(request)
     if isinstance(user, RedirectResponse):
         return user
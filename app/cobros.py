@@ -1,15 +1,18 @@
 import os
+import threading
 from datetime import date, timedelta, datetime
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app.auth import require_user
+from app.templating import templates
+
+if TYPE_CHECKING:
+    import pandas as pd  # solo anotaciones; se importa dentro de cada función
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 DATA_DIR = "data"
 CLIENTES_XLSX = f"{DATA_DIR}/clientes.xlsx"
@@ -21,6 +24,8 @@ WEEKLY_TERM_WEEKS = 12
 
 
 def _load_clientes():
+    import pandas as pd
+
     if not os.path.exists(CLIENTES_XLSX):
         return pd.DataFrame(columns=["nombre", "cedula", "telefono", "monto", "tipo_cobro"])
 
@@ -46,6 +51,8 @@ def _load_clientes():
 
 
 def _load_pagos():
+    import pandas as pd
+
     if not os.path.exists(PAGOS_XLSX):
         return pd.DataFrame(columns=[
             "cedula", "cliente", "fecha", "hora", "valor", "tipo_cobro", "registrado_por", "_fecha_dt"
@@ -79,7 +86,7 @@ def _load_pagos():
     return df
 
 
-def _save_pagos(df: pd.DataFrame):
+def _save_pagos(df: "pd.DataFrame"):
     if "_fecha_dt" in df.columns:
         df = df.drop(columns=["_fecha_dt"])
     df.to_excel(PAGOS_XLSX, index=False)
@@ -90,6 +97,8 @@ def _start_of_week(d: date) -> date:
 
 
 def _load_no_cobrar():
+    import pandas as pd
+
     if not os.path.exists(NO_COBRAR_XLSX):
         return pd.DataFrame(columns=["cedula", "fecha", "hora", "registrado_por"])
 
@@ -107,33 +116,46 @@ def _load_no_cobrar():
     return df
 
 
-def _save_no_cobrar(df: pd.DataFrame):
+def _save_no_cobrar(df: "pd.DataFrame"):
     df.to_excel(NO_COBRAR_XLSX, index=False)
 
 
-def _saldo_actual(cedula: str) -> float:
+# =========================
+# NO COBRAR HOY (AGREGAR)
+# =========================
+_no_cobrar_lock = threading.Lock()
+
+
+def marcar_no_cobrar(cedula: str, registrado_por: str) -> bool:
+    """Marca la cédula como "no cobrar hoy". False si ya estaba marcada."""
+    import pandas as pd
+
     cedula = str(cedula).strip()
+    hoy = date.today().isoformat()
+    hora = datetime.now().strftime("%H:%M:%S")
 
-    clientes = _load_clientes()
-    match = clientes[clientes["cedula"].astype(str) == cedula]
-    if match.empty:
-        return 0.0
+    with _no_cobrar_lock:
+        df = _load_no_cobrar()
 
-    monto = float(match.iloc[0].get("monto") or 0)
+        ya = df[
+            (df["cedula"].astype(str) == cedula) &
+            (df["fecha"].astype(str) == hoy)
+        ]
+        if not ya.empty:
+            return False
 
-    pagos = _load_pagos()
-    pagos_cliente = pagos[pagos["cedula"].astype(str) == cedula]
-    pagado_total = float(pagos_cliente["valor"].sum()) if not pagos_cliente.empty else 0.0
+        nuevo = {
+            "cedula": cedula,
+            "fecha": hoy,
+            "hora": hora,
+            "registrado_por": registrado_por,
+        }
 
-    saldo = monto - pagado_total
-    if saldo < 0:
-        saldo = 0.0
-    return float(saldo)
+        df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
+        _save_no_cobrar(df)
+    return True
 
 
-# =========================
-# NO COBRAR HOY (AGREGAR)
-# =========================
 @router.post("/cobros/no_cobrar_hoy")
 def no_cobrar_hoy(
     request: Request,
@@ -143,38 +165,31 @@ def no_cobrar_hoy(
     if isinstance(user, RedirectResponse):
         return user
 
-    cedula = str(cedula).strip()
-    hoy = date.today().isoformat()
+    marcar_no_cobrar(cedula, str(user.get("username") or ""))
 
-    now = datetime.now()
-    hora = now.strftime("%H:%M:%S")
-    registrado_por = str(user.get("username") or "")
+    return RedirectResponse("/cobros", status_code=303)
 
-    df = _load_no_cobrar()
 
-    ya = df[
-        (df["cedula"].astype(str) == cedula) &
-        (df["fecha"].astype(str) == hoy)
-    ]
-    if not ya.empty:
-        return RedirectResponse("/cobros", status_code=303)
+# =========================
+# DESHACER NO COBRAR HOY (ELIMINAR)
+# =========================
+def desmarcar_no_cobrar(cedula: str) -> bool:
+    """Quita la marca de hoy. False si la cédula no estaba marcada."""
+    cedula = str(cedula).strip()
+    hoy = date.today().isoformat()
 
-    nuevo = {
-        "cedula": cedula,
-        "fecha": hoy,
-        "hora": hora,
-        "registrado_por": registrado_por,
-    }
+    with _no_cobrar_lock:
+        df = _load_no_cobrar()
 
-    df = pd.concat([df, pd.DataFrame([nuevo])], ignore_index=True)
-    _save_no_cobrar(df)
+        before = len(df)
+        df = df[~((df["cedula"].astype(str) == cedula) & (df["fecha"].astype(str) == hoy))]
 
-    return RedirectResponse("/cobros", status_code=303)
+        if len(df) == before:
+            return False
+        _save_no_cobrar(df)
+    return True
 
 
-# =========================
-# DESHACER NO COBRAR HOY (ELIMINAR)
-# =========================
 @router.post("/cobros/deshacer_no_cobrar_hoy")
 def deshacer_no_cobrar_hoy(
     request: Request,
@@ -184,16 +199,7 @@ def deshacer_no_cobrar_hoy(
     if isinstance(user, RedirectResponse):
         return user
 
-    cedula = str(cedula).strip()
-    hoy = date.today().isoformat()
-
-    df = _load_no_cobrar()
-
-    before = len(df)
-    df = df[~((df["cedula"].astype(str) == cedula) & (df["fecha"].astype(str) == hoy))]
-
-    if len(df) != before:
-        _save_no_cobrar(df)
+    desmarcar_no_cobrar(cedula)
 
     return RedirectResponse("/cobros", status_code=303)
 
@@ -201,6 +207,76 @@ def deshacer_no_cobrar_hoy(
 # =========================
 # PAGO RÁPIDO (HOY)
 # =========================
+# pagos.xlsx se lee y reescribe completo: un lock por proceso evita que dos
+# requests se pisen, y un lote de pagos paga una sola lectura/escritura.
+_pagos_lock = threading.Lock()
+
+
+def registrar_pagos_rapidos(pagos: list[dict], registrado_por: str) -> list[dict]:
+    """
+    Registra varios pagos rápidos en pagos.xlsx con una sola escritura.
+    Cada pago: {"cedula", "valor", opcional "fecha" (YYYY-MM-DD) y "hora"}.
+    Devuelve por pago {"estado": "ok", "valor", "saldo"} o {"estado": "error", "detalle"}.
+    """
+    import pandas as pd
+
+    now = datetime.now()
+    resultados = []
+    nuevos = []
+
+    with _pagos_lock:
+        clientes = _load_clientes()
+        por_cedula = {str(r["cedula"]): r for r in clientes.to_dict(orient="records")}
+        pagos_df = _load_pagos()
+        pagado = pagos_df.groupby("cedula")["valor"].sum().to_dict() if not pagos_df.empty else {}
+
+        for p in pagos:
+            cedula = str(p.get("cedula") or "").strip()
+            cliente = por_cedula.get(cedula)
+            if cliente is None:
+                resultados.append({"estado": "error", "detalle": "cliente no existe"})
+                continue
+
+            saldo = max(float(cliente.get("monto") or 0) - float(pagado.get(cedula, 0)), 0.0)
+            try:
+                valor_num = float(p.get("valor") or 0)
+            except (TypeError, ValueError):
+                valor_num = 0.0
+            if saldo <= 0:
+                resultados.append({"estado": "error", "detalle": "sin saldo"})
+                continue
+            if valor_num <= 0:
+                resultados.append({"estado": "error", "detalle": "valor inválido"})
+                continue
+            if valor_num > saldo:
+                valor_num = saldo
+
+            pagado[cedula] = float(pagado.get(cedula, 0)) + valor_num
+            nuevos.append({
+                "cedula": cedula,
+                "cliente": str(cliente.get("nombre") or ""),
+                "fecha": str(p.get("fecha") or now.date().isoformat()),
+                "hora": str(p.get("hora") or now.strftime("%H:%M:%S")),
+                "valor": float(valor_num),
+                "tipo_cobro": str(cliente.get("tipo_cobro") or ""),
+                "registrado_por": registrado_por,
+            })
+            resultados.append({"estado": "ok", "valor": valor_num, "saldo": round(saldo - valor_num, 2)})
+
+        if nuevos:
+            for col in ["cedula", "cliente", "fecha", "hora", "valor", "tipo_cobro", "registrado_por"]:
+                if col not in pagos_df.columns:
+                    pagos_df[col] = ""
+
+            pagos_df = pd.concat(
+                [pagos_df.drop(columns=["_fecha_dt"], errors="ignore"), pd.DataFrame(nuevos)],
+                ignore_index=True
+            )
+            _save_pagos(pagos_df)
+
+    return resultados
+
+
 @router.post("/cobros/pago_rapido")
 def pago_rapido(
     request: Request,
@@ -211,53 +287,7 @@ def pago_rapido(
     if isinstance(user, RedirectResponse):
         return user
 
-    cedula = str(cedula).strip()
-
-    now = datetime.now()
-    fecha_hoy = now.date().isoformat()
-    hora = now.strftime("%H:%M:%S")
-    registrado_por = str(user.get("username") or "")
-
-    clientes = _load_clientes()
-    match = clientes[clientes["cedula"].astype(str) == cedula]
-    if match.empty:
-        return RedirectResponse("/cobros", status_code=303)
-
-    saldo = _saldo_actual(cedula)
-    if saldo <= 0:
-        return RedirectResponse("/cobros", status_code=303)
-
-    valor_num = float(valor or 0)
-    if valor_num <= 0:
-        return RedirectResponse("/cobros", status_code=303)
-
-    if valor_num > saldo:
-        valor_num = saldo
-
-    cliente_nombre = str(match.iloc[0]["nombre"])
-    tipo_cobro = str(match.iloc[0]["tipo_cobro"])
-
-    pagos_df = _load_pagos()
-
-    nuevo = {
-        "cedula": cedula,
-        "cliente": cliente_nombre,
-        "fecha": fecha_hoy,
-        "hora": hora,
-        "valor": float(valor_num),
-        "tipo_cobro": tipo_cobro,
-        "registrado_por": registrado_por,
-    }
-
-    for col in ["cedula", "cliente", "fecha", "hora", "valor", "tipo_cobro", "registrado_por"]:
-        if col not in pagos_df.columns:
-            pagos_df[col] = ""
-
-    pagos_df = pd.concat(
-        [pagos_df.drop(columns=["_fecha_dt"], errors="ignore"), pd.DataFrame([nuevo])],
-        ignore_index=True
-    )
-    _save_pagos(pagos_df)
+    registrar_pagos_rapidos([{"cedula": cedula, "valor": valor}], str(user.get("username") or ""))
 
     return RedirectResponse("/cobros", status_code=303)
 
@@ -1,16 +1,16 @@
   # app/contabilidad.py
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app import db
+from app.cache import cached_page
 from app.utils import co_date_today, to_pesos
 
 # Tu auth ya existe (según tus logs)
 from app.auth import require_user
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 CATEGORIAS = ["general", "transporte", "alimentacion", "servicios", "oficina", "imprevistos"]
 
@@ -35,8 +35,14 @@ def _month_range(yyyymm: str) -> tuple[str, str]:
 
 @router.get("/contabilidad")
 def contabilidad(request: Request, mes: str | None = None):
-    _require_admin(request)
+    user = _require_admin(request)
+    return cached_page(
+        request, lambda: _render_contabilidad(request, mes), user=user,
+        tables=("base_dia", "gastos", "prestamos", "seguros_recaudos", "clientes"),
+    )
+
 
+def _render_contabilidad(request: Request, mes: str | None):
     hoy = co_date_today()
     if not mes:
         mes = f"{hoy.year:04d}-{hoy.month:02d}"
@@ -105,17 +111,86 @@ def contabilidad(request: Request, mes: str | None = None):
     })
 
 
+# =========================
+# ESCRITURAS (formularios y /api/v1)
+# =========================
+def guardar_base_dia(fecha: str, base_valor) -> dict:
+    base_pesos = to_pesos(base_valor)
+    with db.transaction() as tx:
+        tx.execute("""
+            INSERT INTO base_dia (fecha, base_valor) VALUES (?, ?)
+            ON CONFLICT (fecha) DO UPDATE SET base_valor = excluded.base_valor
+        """, [fecha, base_pesos])
+        return tx.fetch_one("SELECT fecha, base_valor FROM base_dia WHERE fecha = ?", [fecha])
+
+
+def insertar_gasto(fecha: str, concepto: str, categoria: str, valor, cobrador_username: str = "") -> dict:
+    v = to_pesos(valor)
+    categoria = (categoria or "general").strip().lower()
+    if categoria not in CATEGORIAS:
+        categoria = "general"
+
+    with db.transaction() as tx:
+        return tx.fetch_one("""
+            INSERT INTO gastos (fecha, concepto, categoria, valor, cobrador_username)
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING id, fecha, concepto, categoria, valor, cobrador_username
+        """, [fecha, concepto.strip(), categoria, v, (cobrador_username or "").strip()])
+
+
+def borrar_gasto(gasto_id: int) -> dict | None:
+    with db.transaction() as tx:
+        return tx.fetch_one("DELETE FROM gastos WHERE id = ? RETURNING id, fecha", [gasto_id])
+
+
+def insertar_seguro(fecha: str, cobrador_username: str, valor) -> dict | None:
+    v = to_pesos(valor)
+    cobrador_username = (cobrador_username or "").strip()
+    if not cobrador_username:
+        return None
+
+    with db.transaction() as tx:
+        return tx.fetch_one("""
+            INSERT INTO seguros_recaudos (fecha, cobrador_username, valor)
+            VALUES (?, ?, ?)
+            RETURNING id, fecha, cobrador_username, valor
+        """, [fecha, cobrador_username, v])
+
+
+def insertar_prestamo(fecha: str, valor, cliente_id="", cobrador_username: str = "", observaciones: str = "") -> dict:
+    v = to_pesos(valor)
+
+    cid = None
+    if str(cliente_id or "").strip().isdigit():
+        cid = int(str(cliente_id).strip())
+
+    with db.transaction() as tx:
+        return tx.fetch_one("""
+            INSERT INTO prestamos (fecha, cliente_id, cobrador_username, valor, observaciones)
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING id, fecha, cliente_id, cobrador_username, valor, observaciones
+        """, [fecha, cid, (cobrador_username or "").strip(), v, (observaciones or "").strip()])
+
+
+def totales_dia(fecha: str) -> dict:
+    """Caja del día: base, gastos, seguros y préstamos (lo que cambia con cada escritura)."""
+    row = db.fetch_one("""
+        SELECT
+            (SELECT COALESCE(MAX(base_valor),0) FROM base_dia WHERE fecha = ?) AS base,
+            (SELECT COALESCE(SUM(valor),0) FROM gastos WHERE fecha = ?) AS gastos,
+            (SELECT COALESCE(SUM(valor),0) FROM seguros_recaudos WHERE fecha = ?) AS seguros,
+            (SELECT COALESCE(SUM(valor),0) FROM prestamos WHERE fecha = ?) AS prestado
+    """, [fecha] * 4) or {}
+    out = {k: int(row.get(k) or 0) for k in ("base", "gastos", "seguros", "prestado")}
+    out["caja"] = out["base"] + out["seguros"] - out["gastos"] - out["prestado"]
+    return {"fecha": fecha, **out}
+
+
 @router.post("/contabilidad/base")
 def guardar_base(request: Request, fecha: str = Form(...), base_valor: str = Form(...)):
     _require_admin(request)
 
-    base_pesos = to_pesos(base_valor)
-
-    existe = db.fetch_one("SELECT fecha FROM base_dia WHERE fecha = ?", [fecha])
-    if existe:
-        db.execute("UPDATE base_dia SET base_valor = ? WHERE fecha = ?", [base_pesos, fecha])
-    else:
-        db.execute("INSERT INTO base_dia (fecha, base_valor) VALUES (?, ?)", [fecha, base_pesos])
+    guardar_base_dia(fecha, base_valor)
 
     return RedirectResponse("/contabilidad", status_code=303)
 
@@ -131,15 +206,7 @@ def crear_gasto(
 ):
     _require_admin(request)
 
-    v = to_pesos(valor)
-    categoria = (categoria or "general").strip().lower()
-    if categoria not in CATEGORIAS:
-        categoria = "general"
-
-    db.execute("""
-        INSERT INTO gastos (fecha, concepto, categoria, valor, cobrador_username)
-        VALUES (?, ?, ?, ?, ?)
-    """, [fecha, concepto.strip(), categoria, v, (cobrador_username or "").strip()])
+    insertar_gasto(fecha, concepto, categoria, valor, cobrador_username)
 
     return RedirectResponse("/contabilidad", status_code=303)
 
@@ -147,7 +214,7 @@ def crear_gasto(
 @router.post("/contabilidad/gasto/eliminar/{gasto_id}")
 def eliminar_gasto(request: Request, gasto_id: int):
     _require_admin(request)
-    db.execute("DELETE FROM gastos WHERE id = ?", [gasto_id])
+    borrar_gasto(gasto_id)
     return RedirectResponse("/contabilidad", status_code=303)
 
 
@@ -160,15 +227,7 @@ def agregar_seguro(
 ):
     _require_admin(request)
 
-    v = to_pesos(valor)
-    cobrador_username = (cobrador_username or "").strip()
-    if not cobrador_username:
-        return RedirectResponse("/contabilidad", status_code=303)
-
-    db.execute("""
-        INSERT INTO seguros_recaudos (fecha, cobrador_username, valor)
-        VALUES (?, ?, ?)
-    """, [fecha, cobrador_username, v])
+    insertar_seguro(fecha, cobrador_username, valor)
 
     return RedirectResponse("/contabilidad", status_code=303)
 
@@ -184,15 +243,6 @@ def agregar_prestamo(
 ):
     _require_admin(request)
 
-    v = to_pesos(valor)
-
-    cid = None
-    if (cliente_id or "").strip().isdigit():
-        cid = int(cliente_id.strip())
-
-    db.execute("""
-        INSERT INTO prestamos (fecha, cliente_id, cobrador_username, valor, observaciones)
-        VALUES (?, ?, ?, ?, ?)
-    """, [fecha, cid, (cobrador_username or "").strip(), v, (observaciones or "").strip()])
+    insertar_prestamo(fecha, valor, cliente_id, cobrador_username, observaciones)
 
     return RedirectResponse("/contabilidad", status_code=303)
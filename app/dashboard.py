@@ -1,19 +1,25 @@
 import os
-import pandas as pd
+from typing import TYPE_CHECKING
+
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from app.auth import require_user
+from app.cache import cached_page
+from app.templating import templates
+
+if TYPE_CHECKING:
+    import pandas as pd  # solo anotaciones; se importa dentro de cada función
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 CLIENTES_XLSX = "data/clientes.xlsx"
 PAGOS_XLSX = "data/pagos.xlsx"
 
 
 def _load_clientes():
+    import pandas as pd
+
     if not os.path.exists(CLIENTES_XLSX):
         return pd.DataFrame(columns=["nombre", "cedula", "telefono", "monto", "tipo_cobro"])
 
@@ -31,6 +37,8 @@ def _load_clientes():
 
 
 def _load_pagos_full():
+    import pandas as pd
+
     if not os.path.exists(PAGOS_XLSX):
         return pd.DataFrame(columns=["cedula", "cliente", "fecha", "valor", "tipo_cobro"])
 
@@ -51,7 +59,9 @@ def _load_pagos_full():
     return df
 
 
-def _compute_saldos(clientes: pd.DataFrame, pagos: pd.DataFrame) -> pd.DataFrame:
+def _compute_saldos(clientes: "pd.DataFrame", pagos: "pd.DataFrame") -> "pd.DataFrame":
+    import pandas as pd
+
     pagos_sum = pagos.groupby("cedula", as_index=False)["valor"].sum()
     pagos_sum.rename(columns={"valor": "pagado"}, inplace=True)
 
@@ -71,6 +81,13 @@ def dashboard(request: Request):
     if isinstance(user, RedirectResponse):
         return user
 
+    return cached_page(request, lambda: _render_dashboard(request, user), user=user,
+                       files=(CLIENTES_XLSX, PAGOS_XLSX), vary_user=True)
+
+
+def _render_dashboard(request: Request, user: dict):
+    import pandas as pd
+
     q = (request.query_params.get("q") or "").strip()
 
     clientes = _load_clientes()
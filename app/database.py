@@ -1,11 +1,9 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./pagos.db"
+# Mismo engine/pool que app.db (SQL crudo): una sola BD para todo
+from app.db import get_engine
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = get_engine()
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -1,17 +1,51 @@
 # app/db.py
+import logging
 import os
+import queue
+import re
 import sqlite3
+import itertools
+import threading
+import time
+from concurrent.futures import Future
 from contextlib import contextmanager
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
+
+from sqlalchemy import create_engine, event
 
 try:
     import psycopg  # psycopg v3
 except Exception:
     psycopg = None
 
+try:
+    import fcntl  # solo Unix; en Windows (dev) no hay lock entre procesos
+except Exception:
+    fcntl = None
+
+log = logging.getLogger("bless.db")
+
 DB_PATH = os.getenv("DB_PATH", "/tmp/bless.db")
 DATABASE_URL = os.getenv("DATABASE_URL", "") or os.getenv("POSTGRES_URL", "")
 
+# Pool compartido por app.db (SQL crudo) y app.database (ORM)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+# Perfil SQLite: se aplica a cada conexión nueva del pool.
+# Cada pragma se puede cambiar por env var (vacío = no se toca).
+SQLITE_PRAGMAS = [
+    ("busy_timeout", os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),   # ms esperando el lock
+    ("journal_mode", os.getenv("SQLITE_JOURNAL_MODE", "WAL")),    # lectores no bloquean al escritor
+    ("synchronous", os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")),   # fsync solo en checkpoint (WAL)
+    ("mmap_size", os.getenv("SQLITE_MMAP_SIZE", "268435456")),    # 256 MB
+    ("cache_size", os.getenv("SQLITE_CACHE_SIZE", "-65536")),     # negativo = KiB (64 MB)
+    ("temp_store", os.getenv("SQLITE_TEMP_STORE", "MEMORY")),
+    ("foreign_keys", os.getenv("SQLITE_FOREIGN_KEYS", "ON")),
+]
+
 
 def db_kind() -> str:
     if DATABASE_URL and DATABASE_URL.startswith("postgres"):
@@ -19,6 +53,10 @@ def db_kind() -> str:
     return "sqlite"
 
 
+def is_postgres() -> bool:
+    return db_kind() == "postgres"
+
+
 def _convert_placeholders(query: str) -> str:
     """
     Convierte placeholders automáticamente según el motor:
@@ -45,36 +83,281 @@ def _rows_to_dicts(cursor, rows) -> list[dict]:
         elif hasattr(r, "keys"):  # sqlite Row
             out.append(dict(r))
         else:
-            out.append({cols[i]: r[i] for i in range(len(cols))})
+            out.append(dict(zip(cols, r)))
     return out
 
 
-@contextmanager
-def get_conn():
-    if db_kind() == "sqlite":
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
+# -------------------------
+# Instrumentación de queries
+# -------------------------
+# Un solo punto por donde pasan los tiempos de SQL crudo y ORM.
+# Cada listener recibe (query, segundos).
+_query_listeners: list[Callable[[str, float], None]] = []
+
+
+def add_query_listener(fn: Callable[[str, float], None]):
+    if fn not in _query_listeners:
+        _query_listeners.append(fn)
+
+
+def _record_query(query: str, seconds: float):
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        log.warning("query lenta (%.1f ms): %s", seconds * 1000, re.sub(r"\s+", " ", query).strip()[:300])
+    for fn in _query_listeners:
         try:
-            yield conn
-        finally:
-            conn.close()
+            fn(query, seconds)
+        except Exception:
+            pass
+
+
+# -------------------------
+# Versión de datos por tabla
+# -------------------------
+# Contador por tabla que sube con cada escritura confirmada. Lo usan el cache
+# de páginas y los ETag (app.cache): si la versión no cambió, la página tampoco.
+# Las escrituras por app.db.execute y por el ORM se detectan solas; quien
+# escriba con su propio cursor (get_connection) debe llamar bump_version().
+_RE_WRITE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`]?(\w+)",
+    re.IGNORECASE,
+)
+# Prefijo por proceso: un reinicio no reutiliza ETags viejos
+_STARTED = time.time()
+_VERSION_EPOCH = f"{os.getpid():x}{int(_STARTED):x}"
+_table_versions: dict[str, int] = {}
+_table_mtimes: dict[str, float] = {}
+_versions_lock = threading.Lock()
+# Con el aviso entre workers activo la versión sale de la tabla `cambios`,
+# igual para todos los workers (ver "Invalidación entre workers").
+_shared_versions: dict[str, int] = {}
+_shared_activo = False
+_shared_por_avisar: set[str] = set()  # escrituras propias aún sin subir en `cambios` (Postgres)
+
+
+def written_table(query: str) -> str | None:
+    m = _RE_WRITE.match(query)
+    return m.group(1).lower() if m else None
+
+
+def bump_version(*tables: str):
+    now = time.time()
+    avisar = _bus_thread is not None and db_kind() == "postgres"
+    with _versions_lock:
+        for t in tables:
+            if t:
+                t = t.lower()
+                _table_versions[t] = _table_versions.get(t, 0) + 1
+                _table_mtimes[t] = now
+                if avisar:
+                    _shared_por_avisar.add(t)
+    if avisar:
+        _avisar_cambios()
+
+
+def data_version(*tables: str) -> str:
+    """
+    Token que cambia cada vez que se escribe en alguna de `tables`. Con el
+    aviso activo es la suma de `cambios.version`: el mismo en todos los workers
+    (y entre reinicios, porque los contadores viven en la BD y no bajan).
+    """
+    with _versions_lock:
+        # una escritura propia sin avisar todavía: token local (único de este proceso)
+        if _shared_activo and not _shared_por_avisar:
+            return "c." + str(sum(_shared_versions.get(t, 0) for t in tables))
+        n = sum(_table_versions.get(t, 0) for t in tables)
+    return f"{_VERSION_EPOCH}.{n}"
+
+
+def last_modified(*tables: str) -> float:
+    """Última escritura vista en `tables` (o el arranque del proceso)."""
+    with _versions_lock:
+        return max([_STARTED] + [_table_mtimes.get(t, 0.0) for t in tables])
+
+
+def _timed_execute(cur, q: str, p):
+    t0 = time.perf_counter()
+    try:
+        cur.execute(q, p)
+    finally:
+        _record_query(q, time.perf_counter() - t0)
+
+
+# -------------------------
+# Engine / pool único
+# -------------------------
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine_url() -> str:
+    if db_kind() == "postgres":
+        # postgres:// | postgresql:// -> driver psycopg v3
+        return "postgresql+psycopg://" + DATABASE_URL.split("://", 1)[1]
+    return f"sqlite:///{DB_PATH}"
+
+
+def _on_connect(dbapi_conn, connection_record):
+    """Pragmas comunes para toda conexión nueva del pool."""
+    if db_kind() != "sqlite":
+        return
+    cur = dbapi_conn.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            if value:
+                cur.execute(f"PRAGMA {name}={value}")
+    finally:
+        cur.close()
+
+
+def sqlite_profile() -> dict:
+    """Valores efectivos de los pragmas en una conexión del pool."""
+    if db_kind() != "sqlite":
+        return {}
+    with get_conn() as conn:
+        cur = conn.cursor()
+        out = {}
+        for name, _ in SQLITE_PRAGMAS:
+            cur.execute(f"PRAGMA {name}")
+            row = cur.fetchone()
+            out[name] = row[0] if row else None
+        return out
+
+
+def ensure_sqlite_wal() -> str:
+    """
+    Autoprueba de arranque con varios workers: la BD SQLite tiene que quedar
+    en WAL (lectores y el escritor no se bloquean entre procesos). En otro modo,
+    o si el sistema de archivos no soporta WAL (p. ej. NFS), falla de una vez
+    en vez de dar "database is locked" bajo carga.
+    """
+    if db_kind() != "sqlite":
+        return ""
+    modo = str(sqlite_profile().get("journal_mode") or "").lower()
+    if modo != "wal":
+        raise RuntimeError(
+            f"SQLite en journal_mode={modo or '?'} ({DB_PATH}); con varios workers se necesita WAL. "
+            "Revisa SQLITE_JOURNAL_MODE o que el disco soporte WAL (no NFS)."
+        )
+    return modo
+
+
+def dispose_engine(close: bool = True):
+    """
+    Suelta las conexiones del pool. Después de un fork (gunicorn con preload)
+    se llama con close=False: las conexiones heredadas son del proceso padre
+    y cerrarlas desde el hijo se las rompe al padre.
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+
+
+def reset_after_fork():
+    """
+    Estado propio de cada worker tras el fork (gunicorn con preload): sin esto
+    todos heredan del master el mismo _STARTED/_VERSION_EPOCH y los mismos
+    contadores, y dos workers darían el mismo ETag para datos distintos.
+    """
+    global _STARTED, _VERSION_EPOCH, _shared_activo, _aviso_con
+    with _versions_lock:
+        _STARTED = time.time()
+        _VERSION_EPOCH = f"{os.getpid():x}{int(_STARTED):x}"
+        _table_versions.clear()
+        _table_mtimes.clear()
+        _shared_versions.clear()
+        _shared_por_avisar.clear()
+        _shared_activo = False
+    _aviso_con = None  # es del master: no se cierra desde aquí
+    dispose_engine(close=False)
+
+
+def _on_checkin(dbapi_conn, connection_record):
+    # get_conn() pone sqlite3.Row; el ORM espera filas normales
+    if isinstance(dbapi_conn, sqlite3.Connection):
+        dbapi_conn.row_factory = None
+    # Escrituras del ORM: ya hubo commit (o rollback, que solo invalida de más)
+    written = connection_record.info.pop("_written", None)
+    if written:
+        bump_version(*written)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info["_query_t0"].pop()
+    _record_query(statement, time.perf_counter() - t0)
+    table = written_table(statement)
+    if table:
+        # se confirma al devolver la conexión al pool (ver _on_checkin)
+        conn.info.setdefault("_written", set()).add(table)
+
+
+def _create_engine():
+    if db_kind() == "sqlite":
+        eng = create_engine(
+            engine_url(),
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+        )
     else:
         if psycopg is None:
             raise RuntimeError("psycopg no está instalado pero DATABASE_URL es Postgres.")
-        conn = psycopg.connect(DATABASE_URL)
-        try:
-            yield conn
-        finally:
-            conn.close()
+        eng = create_engine(
+            engine_url(),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    event.listen(eng, "connect", _on_connect)
+    event.listen(eng, "checkin", _on_checkin)
+    event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+    event.listen(eng, "after_cursor_execute", _after_cursor_execute)
+    return eng
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+
+def get_connection():
+    """
+    Conexión DBAPI prestada del pool (close() la devuelve al pool).
+    En SQLite las filas son sqlite3.Row.
+    """
+    conn = get_engine().raw_connection()
+    if db_kind() == "sqlite":
+        conn.driver_connection.row_factory = sqlite3.Row
+    return conn
+
+
+@contextmanager
+def get_conn():
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 
 def execute(query: str, params: Iterable[Any] | None = None) -> int:
     q = _convert_placeholders(query)
     p = list(params) if params is not None else []
+    if _usar_escritor(q):
+        return _escritor().enviar(q, p).result()
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute(q, p)
+        _timed_execute(cur, q, p)
         conn.commit()
+        bump_version(written_table(q))
         return getattr(cur, "rowcount", 0) or 0
 
 
@@ -83,7 +366,7 @@ def fetch_all(query: str, params: Iterable[Any] | None = None) -> list[dict]:
     p = list(params) if params is not None else []
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute(q, p)
+        _timed_execute(cur, q, p)
         rows = cur.fetchall()
         return _rows_to_dicts(cur, rows)
 
@@ -93,16 +376,338 @@ def fetch_one(query: str, params: Iterable[Any] | None = None) -> dict | None:
     p = list(params) if params is not None else []
     with get_conn() as conn:
         cur = conn.cursor()
-        cur.execute(q, p)
+        _timed_execute(cur, q, p)
         row = cur.fetchone()
         if row is None:
             return None
         return _rows_to_dicts(cur, [row])[0]
 
 
+# -------------------------
+# Lecturas sin un dict por fila
+# -------------------------
+# fetch_all arma un dict por fila; para reportes y barridos grandes sale más
+# barato leer tuplas, columnas o un DataFrame directo del cursor.
+_cursor_ids = itertools.count(1)
+
+
+def _plain_cursor(conn):
+    """Cursor que devuelve tuplas (get_conn pone sqlite3.Row en la conexión)."""
+    cur = conn.cursor()
+    if isinstance(cur, sqlite3.Cursor):
+        cur.row_factory = None
+    return cur
+
+
+def _columns(cur) -> list[str]:
+    return [d[0] for d in (cur.description or [])]
+
+
+def fetch_tuples(query: str, params: Iterable[Any] | None = None) -> tuple[list[str], list[tuple]]:
+    """(columnas, filas como tuplas)."""
+    q = _convert_placeholders(query)
+    p = list(params) if params is not None else []
+    with get_conn() as conn:
+        cur = _plain_cursor(conn)
+        _timed_execute(cur, q, p)
+        rows = cur.fetchall()
+        return _columns(cur), rows
+
+
+def fetch_columns(query: str, params: Iterable[Any] | None = None, as_numpy: bool = False) -> dict[str, Any]:
+    """
+    {columna: valores}. Con as_numpy=True cada columna es un np.ndarray
+    (int64/float64 si la columna es numérica y sin NULL; object si no).
+    """
+    cols, rows = fetch_tuples(query, params)
+    data = list(zip(*rows)) if rows else [()] * len(cols)
+    if not as_numpy:
+        return {c: list(v) for c, v in zip(cols, data)}
+
+    import numpy as np
+    return {c: np.asarray(v) for c, v in zip(cols, data)}
+
+
+def fetch_df(query: str, params: Iterable[Any] | None = None):
+    """DataFrame armado directo de las tuplas del cursor."""
+    import pandas as pd
+
+    cols, rows = fetch_tuples(query, params)
+    return pd.DataFrame.from_records(rows, columns=cols)
+
+
+# -------------------------
+# Streaming (resultados grandes)
+# -------------------------
+# Exportes, reportes y migraciones leen tablas completas: en vez de fetchall,
+# se recorren por lotes y la memoria queda acotada a un lote.
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "2000"))
+
+
+class Stream:
+    """Resultado abierto por stream(): columnas + lotes de tuplas."""
+
+    def __init__(self, cur, batch_size: int):
+        self.cur = cur
+        self.batch_size = batch_size
+        self.columns = _columns(cur)
+
+    def batches(self) -> Iterator[list[tuple]]:
+        while True:
+            rows = self.cur.fetchmany(self.batch_size)
+            if not rows:
+                return
+            yield rows
+
+    def __iter__(self) -> Iterator[tuple]:
+        for rows in self.batches():
+            yield from rows
+
+
+@contextmanager
+def stream(query: str, params: Iterable[Any] | None = None, batch_size: int | None = None):
+    """
+        with db.stream("SELECT * FROM pagos ORDER BY id") as s:
+            print(s.columns)
+            for lote in s.batches():
+                ...
+
+    En Postgres abre un cursor del lado del servidor (named cursor): el
+    servidor manda batch_size filas por viaje. En SQLite usa fetchmany sobre
+    el mismo cursor. La conexión queda tomada mientras el with esté abierto.
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    q = _convert_placeholders(query)
+    p = list(params) if params is not None else []
+    with get_conn() as conn:
+        if is_postgres():
+            cur = conn.cursor(name=f"bless_stream_{next(_cursor_ids)}")
+            cur.itersize = batch_size
+        else:
+            cur = _plain_cursor(conn)
+        try:
+            _timed_execute(cur, q, p)
+            yield Stream(cur, batch_size)
+        finally:
+            cur.close()
+
+
+def iter_rows(query: str, params: Iterable[Any] | None = None, batch_size: int = 1000,
+              as_dict: bool = False) -> Iterator[tuple | dict]:
+    """Filas de stream() una a una (tuplas, o dicts con as_dict=True)."""
+    with stream(query, params, batch_size) as s:
+        for r in s:
+            yield dict(zip(s.columns, r)) if as_dict else r
+
+
+class Tx:
+    """Cursor de una transacción abierta con transaction()."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.written: set[str] = set()
+
+    def execute(self, query: str, params: Iterable[Any] | None = None) -> int:
+        q = _convert_placeholders(query)
+        _timed_execute(self.cur, q, list(params) if params is not None else [])
+        self.written.add(written_table(q))
+        return getattr(self.cur, "rowcount", 0) or 0
+
+    def executemany(self, query: str, seq: Iterable[Iterable[Any]]) -> int:
+        q = _convert_placeholders(query)
+        rows = [list(p) for p in seq]
+        if not rows:
+            return 0
+        t0 = time.perf_counter()
+        try:
+            self.cur.executemany(q, rows)
+        finally:
+            _record_query(q, time.perf_counter() - t0)
+        self.written.add(written_table(q))
+        return len(rows)
+
+    def fetch_all(self, query: str, params: Iterable[Any] | None = None) -> list[dict]:
+        self.execute(query, params)
+        return _rows_to_dicts(self.cur, self.cur.fetchall())
+
+    def fetch_one(self, query: str, params: Iterable[Any] | None = None) -> dict | None:
+        self.execute(query, params)
+        row = self.cur.fetchone()
+        return _rows_to_dicts(self.cur, [row])[0] if row is not None else None
+
+
+def is_integrity_error(e: Exception) -> bool:
+    """Violación de llave/constraint (sqlite3 o psycopg)."""
+    if isinstance(e, sqlite3.IntegrityError):
+        return True
+    return psycopg is not None and isinstance(e, psycopg.IntegrityError)
+
+
+@contextmanager
+def transaction():
+    """
+    Varias sentencias en una sola transacción (un solo commit):
+
+        with db.transaction() as tx:
+            tx.execute("INSERT ...", [...])
+            tx.execute("UPDATE ...", [...])
+
+    Si algo falla se hace rollback. Las tablas escritas suben de versión al confirmar.
+    """
+    with get_conn() as conn:
+        tx = Tx(conn)
+        try:
+            yield tx
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        bump_version(*tx.written)
+
+
+# -------------------------
+# Escritor único con group commit (SQLite, opcional)
+# -------------------------
+# Con muchos cobradores abonando a la vez, cada execute() pelea por el lock de
+# SQLite y hace su propio commit. Con SQLITE_GROUP_COMMIT=1 los INSERT/UPDATE/
+# DELETE de execute() van a una cola: un solo hilo toma lo que haya en cola
+# (hasta GROUP_COMMIT_MAX sentencias) y lo confirma en una sola transacción;
+# lo que llega mientras tanto forma el lote siguiente. Cada llamador sigue
+# bloqueado hasta que su sentencia quedó confirmada. Sin espera por defecto (un
+# solo cobrador no paga latencia extra); GROUP_COMMIT_MS > 0 espera un poco más
+# a que se junten sentencias.
+# Cada sentencia va en su SAVEPOINT: si una falla (p. ej. UNIQUE), el error le
+# llega solo a quien la mandó y las demás del lote se confirman igual.
+# transaction() y el ORM no pasan por la cola (siguen con su propio commit).
+SQLITE_GROUP_COMMIT = os.getenv("SQLITE_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "0"))
+GROUP_COMMIT_MAX = int(os.getenv("GROUP_COMMIT_MAX", "256"))
+
+
+class _Escritor:
+    def __init__(self):
+        self.cola: "queue.SimpleQueue[tuple[str, list, Future]]" = queue.SimpleQueue()
+        self.hilo = threading.Thread(target=self._loop, name="bless-escritor", daemon=True)
+        self.hilo.start()
+
+    def enviar(self, q: str, p: list) -> Future:
+        fut: Future = Future()
+        self.cola.put((q, p, fut))
+        return fut
+
+    def _lote(self) -> list[tuple[str, list, Future]]:
+        lote = [self.cola.get()]
+        limite = time.perf_counter() + GROUP_COMMIT_MS / 1000
+        while len(lote) < GROUP_COMMIT_MAX:
+            espera = limite - time.perf_counter()
+            try:
+                lote.append(self.cola.get(timeout=espera) if espera > 0 else self.cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _loop(self):
+        while True:
+            lote = self._lote()
+            try:
+                self._aplicar(lote)
+            except Exception as e:
+                # falló el BEGIN/COMMIT: nadie del lote quedó escrito
+                for _, _, fut in lote:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _aplicar(self, lote):
+        hechos = []
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for q, p, fut in lote:
+                    cur.execute("SAVEPOINT s")
+                    try:
+                        _timed_execute(cur, q, p)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO s")
+                        cur.execute("RELEASE s")
+                        fut.set_exception(e)
+                        continue
+                    n = getattr(cur, "rowcount", 0) or 0  # antes del RELEASE, que lo pisa
+                    cur.execute("RELEASE s")
+                    hechos.append((q, fut, n))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        bump_version(*{written_table(q) for q, _, _ in hechos})
+        for _, fut, n in hechos:
+            fut.set_result(n)
+
+
+_escritor_unico: _Escritor | None = None
+_escritor_lock = threading.Lock()
+
+
+def _escritor() -> _Escritor:
+    global _escritor_unico
+    # tras un fork (gunicorn con preload) el hilo del padre no existe: uno nuevo
+    if _escritor_unico is None or not _escritor_unico.hilo.is_alive():
+        with _escritor_lock:
+            if _escritor_unico is None or not _escritor_unico.hilo.is_alive():
+                _escritor_unico = _Escritor()
+    return _escritor_unico
+
+
+def _usar_escritor(q: str) -> bool:
+    if not SQLITE_GROUP_COMMIT or db_kind() != "sqlite" or written_table(q) is None:
+        return False
+    # lo que escribe el propio hilo escritor va directo
+    return _escritor_unico is None or threading.current_thread() is not _escritor_unico.hilo
+
+
 # -------------------------
 # Schema
 # -------------------------
+# Texto "YYYY-MM-DD[ HH:MM:SS]" -> días desde 1970-01-01 (NULL si no es fecha)
+_SQLITE_DIA = "CAST(julianday(substr({col}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+
+_PESOS_COLS = ("monto", "seguro", "monto_entregado")
+
+
+def _pagos_pesos_enteros_sqlite():
+    """
+    BDs viejas tienen monto/seguro/monto_entregado como REAL. SQLite no cambia
+    el tipo de una columna: se reconstruye la tabla una vez, redondeando a
+    pesos enteros. Índices y triggers de pagos se guardan antes y se recrean.
+    """
+    cols = fetch_all("PRAGMA table_info(pagos)")
+    if not any(c["name"] in _PESOS_COLS and c["type"].upper() == "REAL" for c in cols):
+        return
+
+    sql = fetch_one("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'pagos'")["sql"]
+    sql = re.sub(r"\b(" + "|".join(_PESOS_COLS) + r")\s+REAL\b", r"\1 INTEGER", sql)
+    sql = re.sub(r"^\s*CREATE TABLE\s+(?:IF NOT EXISTS\s+)?\"?pagos\"?", "CREATE TABLE pagos_new", sql, flags=re.IGNORECASE)
+
+    extras = [r["sql"] for r in fetch_all(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'pagos' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )]
+    names = [c["name"] for c in cols]
+    select = ", ".join(
+        f"CAST(ROUND(COALESCE({n}, 0)) AS INTEGER)" if n in _PESOS_COLS else n for n in names
+    )
+    log.info("Migrando pagos a pesos enteros (%s)", ", ".join(_PESOS_COLS))
+    execute("DROP TABLE IF EXISTS pagos_new")
+    execute(sql)
+    with transaction() as tx:
+        tx.execute(f"INSERT INTO pagos_new ({', '.join(names)}) SELECT {select} FROM pagos")
+        tx.execute("DROP TABLE pagos")
+        tx.execute("ALTER TABLE pagos_new RENAME TO pagos")
+        for q in extras:
+            tx.execute(q)
+
+
 def _create_tables_sqlite():
     execute("""
     CREATE TABLE IF NOT EXISTS usuarios (
@@ -138,6 +743,22 @@ def _create_tables_sqlite():
     )
     """)
 
+    # Columnas del libro de movimientos que usan app.pagos / app.saldos
+    # (montos en pesos enteros, igual que contabilidad)
+    for col in (
+        "tipo TEXT DEFAULT 'abono'",
+        "monto INTEGER DEFAULT 0",
+        "seguro INTEGER DEFAULT 0",
+        "monto_entregado INTEGER DEFAULT 0",
+        "interes_mensual REAL DEFAULT 20",
+        "frecuencia TEXT DEFAULT 'mensual'",
+    ):
+        try:
+            execute(f"ALTER TABLE pagos ADD COLUMN {col}")
+        except Exception:
+            pass
+    execute("CREATE INDEX IF NOT EXISTS idx_pagos_cliente_id ON pagos(cliente_id)")
+
     execute("""
     CREATE TABLE IF NOT EXISTS base_dia (
         fecha TEXT PRIMARY KEY,
@@ -181,6 +802,43 @@ def _create_tables_sqlite():
     )
     """)
 
+    # Columnas que usa el ORM (app.models.Prestamo) sobre la misma tabla
+    for col in (
+        "monto REAL",
+        "interes REAL",
+        "cuotas INTEGER",
+        "frecuencia TEXT DEFAULT 'mensual'",
+    ):
+        try:
+            execute(f"ALTER TABLE prestamos ADD COLUMN {col}")
+        except Exception:
+            pass
+
+    execute("""
+    CREATE TABLE IF NOT EXISTS cuotas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        prestamo_id INTEGER,
+        numero INTEGER,
+        monto REAL,
+        fecha TEXT,                     -- YYYY-MM-DD (vencimiento)
+        pagada INTEGER DEFAULT 0,
+        FOREIGN KEY(prestamo_id) REFERENCES prestamos(id) ON DELETE CASCADE
+    )
+    """)
+    execute("CREATE INDEX IF NOT EXISTS ix_cuotas_fecha_pagada ON cuotas(fecha, pagada)")
+    execute("CREATE INDEX IF NOT EXISTS ix_cuotas_prestamo_id ON cuotas(prestamo_id)")
+
+    # Llaves de idempotencia de la sincronización offline (app.sync)
+    execute("""
+    CREATE TABLE IF NOT EXISTS idempotencia (
+        clave TEXT PRIMARY KEY,
+        usuario TEXT DEFAULT '',
+        operacion TEXT DEFAULT '',
+        resultado TEXT DEFAULT '',
+        creado TEXT DEFAULT (datetime('now'))
+    )
+    """)
+
 
 def _create_tables_postgres():
     execute("""
@@ -216,6 +874,18 @@ def _create_tables_postgres():
     )
     """)
 
+    execute("""
+    ALTER TABLE pagos
+        ADD COLUMN IF NOT EXISTS tipo TEXT DEFAULT 'abono',
+        ADD COLUMN IF NOT EXISTS monto BIGINT DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS seguro BIGINT DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS monto_entregado BIGINT DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS interes_mensual DOUBLE PRECISION DEFAULT 20,
+        ADD COLUMN IF NOT EXISTS frecuencia TEXT DEFAULT 'mensual'
+    """)
+
+    execute("CREATE INDEX IF NOT EXISTS idx_pagos_cliente_id ON pagos(cliente_id)")
+
     try:
         execute("""
         ALTER TABLE pagos
@@ -278,12 +948,433 @@ def _create_tables_postgres():
     except Exception:
         pass
 
+    execute("""
+    ALTER TABLE prestamos
+        ADD COLUMN IF NOT EXISTS monto DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS interes DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS cuotas INTEGER,
+        ADD COLUMN IF NOT EXISTS frecuencia TEXT DEFAULT 'mensual'
+    """)
+
+    execute("""
+    CREATE TABLE IF NOT EXISTS cuotas (
+        id BIGSERIAL PRIMARY KEY,
+        prestamo_id BIGINT REFERENCES prestamos(id) ON DELETE CASCADE,
+        numero INTEGER,
+        monto DOUBLE PRECISION,
+        fecha DATE,
+        pagada BOOLEAN DEFAULT FALSE
+    )
+    """)
+    execute("CREATE INDEX IF NOT EXISTS ix_cuotas_fecha_pagada ON cuotas(fecha, pagada)")
+    execute("CREATE INDEX IF NOT EXISTS ix_cuotas_prestamo_id ON cuotas(prestamo_id)")
+
+    # Llaves de idempotencia de la sincronización offline (app.sync)
+    execute("""
+    CREATE TABLE IF NOT EXISTS idempotencia (
+        clave TEXT PRIMARY KEY,
+        usuario TEXT DEFAULT '',
+        operacion TEXT DEFAULT '',
+        resultado TEXT DEFAULT '',
+        creado TIMESTAMPTZ DEFAULT NOW()
+    )
+    """)
+
+
+# -------------------------
+# Migraciones versionadas
+# -------------------------
+# Cada cambio de esquema es un número en MIGRATIONS. init_db aplica solo los
+# que falten y los anota en schema_version; con el esquema al día el arranque
+# es una sola consulta. La 1 es el esquema base (idempotente, así que sirve
+# también para BDs creadas antes de schema_version). Las nuevas van al final,
+# nunca se renumeran ni se editan las ya publicadas.
+def _m002_pesos_enteros_postgres():
+    # BDs viejas: montos DOUBLE PRECISION -> pesos enteros
+    for col in _PESOS_COLS:
+        row = fetch_one("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'pagos' AND column_name = ?
+        """, [col])
+        if row and row["data_type"] == "double precision":
+            execute(f"ALTER TABLE pagos ALTER COLUMN {col} TYPE BIGINT USING ROUND({col})::bigint")
+
+
+def _m003_dia_sqlite():
+    # Día del movimiento como entero (días desde 1970-01-01): fecha viene como
+    # "YYYY-MM-DD HH:MM:SS" o "YYYY-MM-DD" y así las comparaciones de fechas
+    # se hacen en SQL sin parsear texto en Python. Lo llena un trigger, así
+    # que cualquier INSERT (app, migraciones, scripts) queda con su día.
+    try:
+        execute("ALTER TABLE pagos ADD COLUMN dia INTEGER")
+    except Exception:
+        pass
+    execute(f"UPDATE pagos SET dia = {_SQLITE_DIA.format(col='fecha')} WHERE dia IS NULL")
+    execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_pagos_dia_ins AFTER INSERT ON pagos
+    WHEN NEW.dia IS NULL
+    BEGIN
+        UPDATE pagos SET dia = {_SQLITE_DIA.format(col='NEW.fecha')} WHERE id = NEW.id;
+    END
+    """)
+    execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_pagos_dia_upd AFTER UPDATE OF fecha ON pagos
+    BEGIN
+        UPDATE pagos SET dia = {_SQLITE_DIA.format(col='NEW.fecha')} WHERE id = NEW.id;
+    END
+    """)
+    execute("CREATE INDEX IF NOT EXISTS idx_pagos_cliente_dia ON pagos(cliente_id, dia)")
+
+
+def _m003_dia_postgres():
+    # Mismo día entero que en SQLite; aquí la columna es generada (el ADD COLUMN
+    # la calcula para las filas existentes). fecha tiene que ser DATE: las BD
+    # creadas con versiones viejas de migrate_sqlite_to_postgres.py la tienen TEXT.
+    tipo = fetch_one("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'pagos' AND column_name = 'fecha'
+    """)
+    if tipo and tipo["data_type"] != "date":
+        execute("ALTER TABLE pagos ALTER COLUMN fecha TYPE DATE USING substr(fecha::text, 1, 10)::date")
+    execute("""
+    ALTER TABLE pagos
+        ADD COLUMN IF NOT EXISTS dia INTEGER GENERATED ALWAYS AS (fecha - DATE '1970-01-01') STORED
+    """)
+    execute("CREATE INDEX IF NOT EXISTS idx_pagos_cliente_dia ON pagos(cliente_id, dia)")
+
+
+def _m004_cambios_sqlite():
+    # un contador por tabla; lo suben los triggers de _instalar_avisos_cambios
+    execute("""
+    CREATE TABLE IF NOT EXISTS cambios (
+        tabla TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+
+def _m004_cambios_postgres():
+    # Mismo contador que en SQLite, pero sin triggers: lo sube app.db después
+    # del commit (ver _avisar_cambios), así no queda una fila caliente
+    # bloqueada durante las transacciones de escritura.
+    execute("""
+    CREATE TABLE IF NOT EXISTS cambios (
+        tabla TEXT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0
+    )
+    """)
+
+
+MIGRATIONS: list[tuple[int, str, dict[str, Callable[[], None]]]] = [
+    (1, "esquema base", {"sqlite": _create_tables_sqlite, "postgres": _create_tables_postgres}),
+    (2, "pagos en pesos enteros", {"sqlite": _pagos_pesos_enteros_sqlite, "postgres": _m002_pesos_enteros_postgres}),
+    (3, "pagos.dia (día entero indexado)", {"sqlite": _m003_dia_sqlite, "postgres": _m003_dia_postgres}),
+    (4, "aviso de cambios entre workers", {"sqlite": _m004_cambios_sqlite, "postgres": _m004_cambios_postgres}),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+_MIGRATE_LOCK_ID = 72_115_001  # pg_advisory_lock
+
+
+def schema_version() -> int:
+    """Última migración aplicada (0 si la BD no tiene schema_version)."""
+    try:
+        row = fetch_one("SELECT MAX(version) AS v FROM schema_version")
+    except Exception:
+        return 0
+    return int(row["v"] or 0) if row else 0
+
+
+@contextmanager
+def _migrate_lock():
+    """Un solo proceso migra a la vez (varios workers arrancan juntos)."""
+    if db_kind() == "sqlite":
+        if fcntl is None:
+            yield
+            return
+        with open(f"{DB_PATH}.migrate.lock", "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return
+
+    # el advisory lock es de la sesión: se toma y se suelta en la misma conexión
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", [_MIGRATE_LOCK_ID])
+        conn.commit()
+        try:
+            yield
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", [_MIGRATE_LOCK_ID])
+            conn.commit()
+
 
 def init_db():
+    # camino rápido: esquema al día -> una consulta y listo
+    if schema_version() >= SCHEMA_VERSION:
+        return
+
+    kind = db_kind()
+    with _migrate_lock():
+        if kind == "sqlite":
+            execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descripcion TEXT DEFAULT '',
+                aplicada TEXT DEFAULT (datetime('now'))
+            )
+            """)
+        else:
+            execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descripcion TEXT DEFAULT '',
+                aplicada TIMESTAMPTZ DEFAULT NOW()
+            )
+            """)
+
+        # otro worker pudo migrar mientras esperábamos el lock
+        actual = schema_version()
+        for num, descripcion, pasos in MIGRATIONS:
+            if num <= actual:
+                continue
+            t0 = time.perf_counter()
+            pasos[kind]()
+            execute("INSERT INTO schema_version (version, descripcion) VALUES (?, ?)", [num, descripcion])
+            log.info("Migración %d (%s) aplicada en %.0f ms", num, descripcion, (time.perf_counter() - t0) * 1000)
+
+        # tablas nuevas de estas migraciones también avisan sus cambios
+        _instalar_avisos_cambios()
+
+
+# -------------------------
+# Invalidación entre workers
+# -------------------------
+# Un contador por tabla en `cambios` sube con cada escritura. Un hilo por
+# proceso copia esos contadores a
+# _shared_versions y data_version los usa: todos los workers dan el mismo
+# token para los mismos datos y la caché de páginas deja de servir lo viejo en
+# milisegundos, sin caché externa. Solo cambia una tabla cuyo contador se
+# movió, así las escrituras propias no se cuentan dos veces.
+# - SQLite: lo suben triggers, en la misma transacción (hay un solo escritor).
+#   El hilo mira PRAGMA data_version (cambia cuando otra conexión, incluidas
+#   las del pool de este worker, confirma) y solo entonces lee `cambios`.
+# - Postgres: lo sube bump_version después del commit, una sentencia
+#   autocommit por tabla que además hace pg_notify("tabla:version"): ninguna
+#   transacción de la app bloquea filas de `cambios` y las versiones salen en
+#   orden de commit. El hilo hace LISTEN en una conexión propia (fuera del
+#   pool). Quien escriba por fuera de app.db debe llamar bump_version().
+# Si el hilo no está conectado, data_version vuelve a los contadores locales.
+CACHE_BUS = os.getenv("CACHE_BUS", "1") == "1"
+CACHE_BUS_POLL_MS = float(os.getenv("CACHE_BUS_POLL_MS", "50"))  # solo SQLite
+CANAL_CAMBIOS = "bless_cambios"  # canal LISTEN/NOTIFY (Postgres)
+
+_TABLAS_SIN_AVISO = ("cambios", "schema_version")
+
+_bus_thread: threading.Thread | None = None
+_bus_stop = threading.Event()
+_bus_lock = threading.Lock()
+_bus_con: sqlite3.Connection | None = None  # conexión propia del aviso (SQLite)
+_bus_data_version = None
+_aviso_con = None  # conexión autocommit que sube `cambios` (Postgres)
+_aviso_lock = threading.Lock()
+
+
+def _instalar_avisos_cambios():
+    """Triggers de aviso en todas las tablas de la app (idempotente)."""
     if db_kind() == "sqlite":
-        _create_tables_sqlite()
-    else:
-        _create_tables_postgres()
+        tablas = [r["name"] for r in fetch_all(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )]
+        for t in tablas:
+            if t in _TABLAS_SIN_AVISO:
+                continue
+            execute("INSERT OR IGNORE INTO cambios (tabla) VALUES (?)", [t])
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cambios_{t}_{op.lower()} AFTER {op} ON "{t}"
+                BEGIN
+                    UPDATE cambios SET version = version + 1 WHERE tabla = '{t}';
+                END
+                """)
+        return
+
+    tablas = [r["table_name"] for r in fetch_all("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+    """)]
+    for t in tablas:
+        if t in _TABLAS_SIN_AVISO:
+            continue
+        execute("INSERT INTO cambios (tabla) VALUES (?) ON CONFLICT (tabla) DO NOTHING", [t])
+        # versiones anteriores avisaban con un trigger por sentencia
+        execute(f'DROP TRIGGER IF EXISTS trg_cambios ON "{t}"')
+    execute("DROP FUNCTION IF EXISTS bless_aviso_cambio()")
+
+
+def _avisar_cambios():
+    """
+    Postgres: sube `cambios` de las tablas escritas por este worker (ya
+    confirmadas) y avisa a los demás. Si falla, quedan pendientes y se
+    reintenta en revisar_cambios; mientras tanto data_version usa el token local.
+    """
+    global _aviso_con
+    with _aviso_lock:
+        with _versions_lock:
+            tablas = sorted(_shared_por_avisar)
+        if not tablas:
+            return
+        nuevas = {}
+        try:
+            if _aviso_con is None or _aviso_con.closed:
+                _aviso_con = psycopg.connect(DATABASE_URL, autocommit=True)
+            # una fila por sentencia: nunca se esperan dos locks a la vez
+            for t in tablas:
+                nuevas[t] = int(_aviso_con.execute("""
+                    WITH b AS (
+                        INSERT INTO cambios (tabla, version) VALUES (%s, 1)
+                        ON CONFLICT (tabla) DO UPDATE SET version = cambios.version + 1
+                        RETURNING tabla, version
+                    )
+                    SELECT version, pg_notify(%s, tabla || ':' || version) FROM b
+                """, [t, CANAL_CAMBIOS]).fetchone()[0])
+        except Exception as e:
+            log.warning("No se pudo avisar el cambio de %s (%s); se reintenta", ", ".join(tablas), e)
+            if _aviso_con is not None:
+                _aviso_con.close()
+                _aviso_con = None
+        with _versions_lock:
+            _shared_por_avisar.difference_update(nuevas)
+        _aplicar_versiones(nuevas)
+
+
+def _aplicar_versiones(actuales: dict[str, int]):
+    """Copia contadores de `cambios`; solo cuentan las tablas que avanzaron."""
+    now = time.time()
+    with _versions_lock:
+        for t, v in actuales.items():
+            if v > _shared_versions.get(t, -1):
+                _shared_versions[t] = v
+                _table_mtimes[t] = now
+
+
+def _leer_cambios(con) -> dict[str, int]:
+    """{tabla: version} de `cambios` (con: conexión DBAPI propia del aviso)."""
+    return {t: int(v) for t, v in con.execute("SELECT tabla, version FROM cambios").fetchall()}
+
+
+def _activar_compartidas(actuales: dict[str, int] | None):
+    """Entra (con la foto de `cambios`) o sale (None) del modo compartido."""
+    global _shared_activo
+    with _versions_lock:
+        if actuales is None:
+            _shared_activo = False
+            return
+        _shared_versions.clear()
+        _shared_versions.update(actuales)
+        _shared_activo = True
+
+
+def revisar_cambios():
+    """
+    Pone al día las versiones compartidas sin esperar al hilo del aviso.
+    La usa app.cache antes de armar la llave, así un POST y el GET siguiente
+    (en este worker o en otro) no ven la página vieja.
+    - SQLite: una PRAGMA; solo si cambió se lee `cambios`.
+    - Postgres: reintenta los avisos propios que fallaron (_avisar_cambios).
+    """
+    global _bus_data_version
+    if not _shared_activo:
+        return
+    if db_kind() != "sqlite":
+        if _shared_por_avisar:
+            _avisar_cambios()
+        return
+    with _bus_lock:
+        con = _bus_con
+        if con is None:
+            return
+        dv = con.execute("PRAGMA data_version").fetchone()[0]
+        if dv == _bus_data_version:
+            return
+        _bus_data_version = dv
+        _aplicar_versiones(_leer_cambios(con))
+
+
+def _bus_sqlite():
+    global _bus_con, _bus_data_version
+    con = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+    try:
+        with _bus_lock:
+            _bus_data_version = con.execute("PRAGMA data_version").fetchone()[0]
+            _activar_compartidas(_leer_cambios(con))
+            _bus_con = con
+        while not _bus_stop.wait(CACHE_BUS_POLL_MS / 1000):
+            revisar_cambios()
+    finally:
+        with _bus_lock:
+            _bus_con = None
+            _activar_compartidas(None)
+        con.close()
+
+
+def _bus_postgres():
+    with psycopg.connect(DATABASE_URL, autocommit=True) as con:
+        try:
+            # LISTEN antes de la foto: un aviso que llegue en medio no se pierde
+            con.execute(f"LISTEN {CANAL_CAMBIOS}")
+            _activar_compartidas(_leer_cambios(con))
+            while not _bus_stop.is_set():
+                # cada aviso se aplica al llegar; timeout para revisar _bus_stop
+                for n in con.notifies(timeout=1.0):
+                    tabla, _, version = n.payload.rpartition(":")
+                    if tabla and version.isdigit():
+                        _aplicar_versiones({tabla: int(version)})
+                    if _bus_stop.is_set():
+                        break
+        finally:
+            _activar_compartidas(None)
+
+
+def _bus_loop():
+    while not _bus_stop.is_set():
+        try:
+            # al (re)conectar se toma la foto de `cambios`: lo que cambió
+            # mientras no escuchábamos ya trae otro contador
+            if db_kind() == "sqlite":
+                _bus_sqlite()
+            else:
+                _bus_postgres()
+        except Exception as e:
+            log.warning("Aviso de cambios entre workers falló (%s); se reintenta", e)
+            _bus_stop.wait(2)
+
+
+def start_invalidation_bus():
+    """Arranca el hilo de avisos (una vez por worker, después del fork)."""
+    global _bus_thread
+    if not CACHE_BUS or (_bus_thread is not None and _bus_thread.is_alive()):
+        return
+    if db_kind() == "postgres" and psycopg is None:
+        return
+    _bus_stop.clear()
+    _bus_thread = threading.Thread(target=_bus_loop, name="bless-cache-bus", daemon=True)
+    _bus_thread.start()
+
+
+def stop_invalidation_bus():
+    global _bus_thread, _aviso_con
+    _bus_stop.set()
+    if _bus_thread is not None:
+        _bus_thread.join(timeout=2)
+        _bus_thread = None
+    with _aviso_lock:
+        if _aviso_con is not None:
+            _aviso_con.close()
+            _aviso_con = None
 
 
 def ensure_admin(username: str, password: str):
@@ -292,7 +1383,8 @@ def ensure_admin(username: str, password: str):
     u = fetch_one("SELECT id FROM usuarios WHERE username = ?", [username])
     if u:
         return
+    # varios workers arrancan a la vez: el que llegue segundo no hace nada
     execute(
-        "INSERT INTO usuarios (username, password, role) VALUES (?, ?, ?)",
+        "INSERT INTO usuarios (username, password, role) VALUES (?, ?, ?) ON CONFLICT (username) DO NOTHING",
         [username, password, "admin"]
     )
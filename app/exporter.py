@@ -1,55 +1,53 @@
 from io import BytesIO
-import pandas as pd
 
-from .db import get_connection, is_postgres
+from . import db
+from .db import is_postgres
 
 
-def _list_tables(conn):
-    cur = conn.cursor()
+def _list_tables():
     if is_postgres():
-        cur.execute("""
+        _, rows = db.fetch_tuples("""
             SELECT table_name
             FROM information_schema.tables
             WHERE table_schema = 'public'
               AND table_type = 'BASE TABLE'
             ORDER BY table_name
         """)
-        return [r[0] for r in cur.fetchall()]
     else:
-        cur.execute("""
+        _, rows = db.fetch_tuples("""
             SELECT name
             FROM sqlite_master
             WHERE type='table'
               AND name NOT LIKE 'sqlite_%'
             ORDER BY name
         """)
-        return [r[0] for r in cur.fetchall()]
+    return [r[0] for r in rows]
 
 
 def export_all_tables_to_excel_bytes() -> bytes:
-    conn = get_connection()
-    try:
-        tables = _list_tables(conn)
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            for t in tables:
-                sheet = (t[:31] if t else "tabla")  # Excel máximo 31 chars
-
-                # lee tabla completa
-                try:
-                    df = pd.read_sql_query(f'SELECT * FROM "{t}"', conn)
-                except Exception:
-                    df = pd.read_sql_query(f"SELECT * FROM {t}", conn)
-
-                if df.empty:
-                    pd.DataFrame({"info": [f"Tabla '{t}' está vacía"]}).to_excel(
-                        writer, index=False, sheet_name=sheet
-                    )
-                else:
-                    df.to_excel(writer, index=False, sheet_name=sheet)
-
-        output.seek(0)
-        return output.read()
-    finally:
-        conn.close()
+    from openpyxl import Workbook  # pesado: solo cuando se exporta
+
+    # write_only: openpyxl escribe cada fila al archivo y no guarda las celdas;
+    # con db.stream la tabla se lee por lotes, así la memoria no crece con la BD.
+    wb = Workbook(write_only=True)
+
+    for t in _list_tables():
+        ws = wb.create_sheet(t[:31] if t else "tabla")  # Excel máximo 31 chars
+
+        # lee tabla completa, por lotes
+        with db.stream(f'SELECT * FROM "{t}"') as s:
+            vacia = True
+            for lote in s.batches():
+                if vacia:
+                    ws.append(s.columns)
+                    vacia = False
+                for r in lote:
+                    ws.append(r)
+
+        if vacia:
+            ws.append(["info"])
+            ws.append([f"Tabla '{t}' está vacía"])
+
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
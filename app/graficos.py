@@ -1,18 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
-import pandas as pd
 import os
 
+from app.cache import cached_json
+
 router = APIRouter()
 
 @router.get("/graficos/pagos")
-def grafico_pagos():
+def grafico_pagos(request: Request):
     ruta = "data/pagos.xlsx"
     if not os.path.exists(ruta):
         return JSONResponse([])
 
+    return cached_json(request, lambda: _resumen_pagos(ruta), files=(ruta,))
+
+
+def _resumen_pagos(ruta: str):
+    import pandas as pd
+
     df = pd.read_excel(ruta)
     df["fecha"] = pd.to_datetime(df["fecha"]).dt.date
     resumen = df.groupby("fecha")["valor"].sum().reset_index()
 
-    return JSONResponse(resumen.to_dict(orient="records"))
+    return resumen.to_dict(orient="records")
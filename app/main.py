@@ -3,10 +3,9 @@ from datetime import datetime
 
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 
-from app.db import init_db, ensure_admin
+from app.db import init_db, ensure_admin, start_invalidation_bus, stop_invalidation_bus
 from app.auth import router as auth_router, require_user
 from app.clientes import router as clientes_router
 from app.pagos import router as pagos_router
@@ -15,6 +14,7 @@ from app.reportes import router as reportes_router
 from app.admin_users import router as admin_users_router
 
 from app.exporter import export_all_tables_to_excel_bytes  # ✅ NUEVO
+from app.templating import templates, warm_up
 
 
 app = FastAPI()
@@ -27,9 +27,15 @@ def startup_event():
         os.getenv("ADMIN_USER", "admin"),
         os.getenv("ADMIN_PASS", "admin123")
     )
+    warm_up()
+    start_invalidation_bus()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_invalidation_bus()
 
 
-templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
@@ -0,0 +1,240 @@
+# app/metrics.py
+import functools
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from jinja2 import Template
+from sqlalchemy import event
+
+from app import cache, db
+from app.auth import require_admin
+
+router = APIRouter()
+
+# Si se define, /metrics acepta "Authorization: Bearer <token>" (para Prometheus).
+# Si no, solo un admin logueado puede verlo.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_QUERIES = 500  # tope de queries distintas (cardinalidad)
+
+_lock = threading.Lock()
+
+# (method, route, status) -> [buckets..., +Inf], sum, count
+_http: dict[tuple, list] = {}
+# query normalizada -> [count, sum_segundos]
+_queries: dict[str, list] = {}
+# template -> [count, sum_segundos]
+_templates: dict[str, list] = {}
+_counters = {"db_connections_opened": 0, "db_connections_checkout": 0}
+
+# Tiempos acumulados del request actual (para Server-Timing)
+_req_stats: ContextVar[dict | None] = ContextVar("bless_req_stats", default=None)
+
+
+# -------------------------
+# Normalización de SQL
+# -------------------------
+_RE_STR = re.compile(r"'(?:[^']|'')*'")
+_RE_NUM = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_WS = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=MAX_QUERIES)  # el mismo SQL llega una y otra vez
+def normalize_query(q: str) -> str:
+    q = q.replace("%s", "?")
+    q = _RE_STR.sub("?", q)
+    q = _RE_NUM.sub("?", q)
+    q = _RE_LIST.sub("(?)", q)
+    return _RE_WS.sub(" ", q).strip()
+
+
+# -------------------------
+# Colectores
+# -------------------------
+def _observe(store: dict, key, seconds: float):
+    row = store.get(key)
+    if row is None:
+        row = store[key] = [0, 0.0]
+    row[0] += 1
+    row[1] += seconds
+
+
+def _on_query(query: str, seconds: float):
+    key = normalize_query(query)
+    with _lock:
+        if key not in _queries and len(_queries) >= MAX_QUERIES:
+            key = "other"
+        _observe(_queries, key, seconds)
+    st = _req_stats.get()
+    if st is not None:
+        st["db"] += seconds
+        st["db_n"] += 1
+
+
+def _on_connect(dbapi_conn, connection_record):
+    with _lock:
+        _counters["db_connections_opened"] += 1
+
+
+def _on_checkout(dbapi_conn, connection_record, connection_proxy):
+    with _lock:
+        _counters["db_connections_checkout"] += 1
+
+
+def _observe_http(method: str, route: str, status: int, seconds: float):
+    key = (method, route, status)
+    with _lock:
+        row = _http.get(key)
+        if row is None:
+            row = _http[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        buckets = row[0]
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b:
+                buckets[i] += 1
+        buckets[-1] += 1
+        row[1] += seconds
+        row[2] += 1
+
+
+class TimedTemplate(Template):
+    """Template de Jinja2 que mide su tiempo de render."""
+
+    def render(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - t0
+            with _lock:
+                _observe(_templates, self.name or "<string>", seconds)
+            st = _req_stats.get()
+            if st is not None:
+                st["tpl"] += seconds
+
+
+def instrument_templates(templates):
+    """Aplica TimedTemplate a un Jinja2Templates (antes de cargar plantillas)."""
+    templates.env.template_class = TimedTemplate
+    return templates
+
+
+_installed = False
+
+
+def install():
+    """Engancha los listeners de app.db y del engine (idempotente)."""
+    global _installed
+    if _installed:
+        return
+    db.add_query_listener(_on_query)
+    eng = db.get_engine()
+    event.listen(eng, "connect", _on_connect)
+    event.listen(eng, "checkout", _on_checkout)
+    _installed = True
+
+
+# -------------------------
+# Middleware
+# -------------------------
+class MetricsMiddleware:
+    """
+    ASGI puro (sin BaseHTTPMiddleware, que cuesta una tarea y un stream por
+    request): envuelve send para poner Server-Timing y leer el status.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        st = {"db": 0.0, "db_n": 0, "tpl": 0.0}
+        token = _req_stats.set(st)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # la respuesta ya está armada: queries y render ya pasaron
+                timing = (
+                    f'db;dur={st["db"] * 1000:.1f};desc="{st["db_n"]} queries", '
+                    f'tpl;dur={st["tpl"] * 1000:.1f}, '
+                    f'app;dur={(time.perf_counter() - t0) * 1000:.1f}'
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _req_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            _observe_http(scope["method"], path, status, time.perf_counter() - t0)
+
+
+# -------------------------
+# Exposición (formato texto de Prometheus)
+# -------------------------
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus() -> str:
+    out = []
+    with _lock:
+        out.append("# HELP bless_http_request_duration_seconds Latencia por ruta.")
+        out.append("# TYPE bless_http_request_duration_seconds histogram")
+        for (method, route, status), (buckets, total, count) in sorted(_http.items()):
+            lbl = f'method="{method}",route="{_esc(route)}",status="{status}"'
+            for b, n in zip(BUCKETS, buckets):
+                out.append(f'bless_http_request_duration_seconds_bucket{{{lbl},le="{b}"}} {n}')
+            out.append(f'bless_http_request_duration_seconds_bucket{{{lbl},le="+Inf"}} {buckets[-1]}')
+            out.append(f"bless_http_request_duration_seconds_sum{{{lbl}}} {total:.6f}")
+            out.append(f"bless_http_request_duration_seconds_count{{{lbl}}} {count}")
+
+        out.append("# HELP bless_db_query_seconds Tiempo por query normalizada.")
+        out.append("# TYPE bless_db_query_seconds summary")
+        for q, (count, total) in sorted(_queries.items()):
+            lbl = f'query="{_esc(q)}"'
+            out.append(f"bless_db_query_seconds_sum{{{lbl}}} {total:.6f}")
+            out.append(f"bless_db_query_seconds_count{{{lbl}}} {count}")
+
+        out.append("# HELP bless_template_render_seconds Tiempo de render por plantilla.")
+        out.append("# TYPE bless_template_render_seconds summary")
+        for name, (count, total) in sorted(_templates.items()):
+            lbl = f'template="{_esc(name)}"'
+            out.append(f"bless_template_render_seconds_sum{{{lbl}}} {total:.6f}")
+            out.append(f"bless_template_render_seconds_count{{{lbl}}} {count}")
+
+        for name, value in _counters.items():
+            out.append(f"# TYPE bless_{name}_total counter")
+            out.append(f"bless_{name}_total {value}")
+
+    out.append("# TYPE bless_page_cache_total counter")
+    for name, value in cache.stats().items():
+        if name != "entradas":
+            out.append(f'bless_page_cache_total{{result="{name}"}} {value}')
+
+    return "\n".join(out) + "\n"
+
+
+@router.get("/metrics")
+def metrics(request: Request):
+    auth = request.headers.get("authorization", "")
+    if not (METRICS_TOKEN and auth == f"Bearer {METRICS_TOKEN}"):
+        user = require_admin(request)
+        if isinstance(user, RedirectResponse):
+            return user
+
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
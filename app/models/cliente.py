@@ -7,4 +7,5 @@ class Cliente(Base):
     nombre = Column(String, nullable=False)
     documento = Column(String, unique=True, nullable=False)
     telefono = Column(String, nullable=False)
+    direccion = Column(String, default="")
 
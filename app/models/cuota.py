@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Float, Boolean, Date, ForeignKey, Index
 from app.database import Base
 
 class Cuota(Base):
     __tablename__ = "cuotas"
+    __table_args__ = (
+        # "cuotas de hoy": WHERE fecha = ? AND pagada = ?
+        Index("ix_cuotas_fecha_pagada", "fecha", "pagada"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    prestamo_id = Column(Integer, ForeignKey("prestamos.id"))
+    prestamo_id = Column(Integer, ForeignKey("prestamos.id"), index=True)
     numero = Column(Integer)
     monto = Column(Float)
+    fecha = Column(Date)
     pagada = Column(Boolean, default=False)
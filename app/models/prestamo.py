@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from datetime import date
+
+from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -6,9 +8,13 @@ class Prestamo(Base):
     __tablename__ = "prestamos"
 
     id = Column(Integer, primary_key=True, index=True)
+    fecha = Column(Date, nullable=False, default=date.today)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
     monto = Column(Float, nullable=False)
     interes = Column(Float, nullable=False)
     cuotas = Column(Integer, nullable=False)
+    valor = Column(Integer, nullable=False, default=0)  # pesos entregados (contabilidad)
+    frecuencia = Column(String, default="mensual")
+    cobrador_username = Column(String, default="")
 
     cliente = relationship("Cliente")
@@ -1,26 +1,255 @@
 # app/pagos.py
+import json
+import os
+
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
 from datetime import datetime
 
 from app import db
 from app.auth import require_user
+from app.cache import cached_page
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 FRECUENCIAS = ["diario", "semanal", "quincenal", "mensual"]
 
 def _now_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+
+INSERT_MOVIMIENTO = """
+    INSERT INTO pagos (cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def pesos(valor) -> int:
+    """Monto del libro en pesos enteros (monto/seguro/monto_entregado son BIGINT)."""
+    return int(round(float(valor or 0)))
+
+
+def movimiento_params(cliente_id, tipo, monto=0, seguro=0, monto_entregado=0,
+                      interes_mensual=20, frecuencia="mensual", fecha=None) -> list:
+    """Fila de INSERT_MOVIMIENTO (abono | prestamo), igual que el formulario."""
+    # str(): del JSON puede llegar cualquier tipo
+    tipo = str(tipo or "").strip().lower()
+    frecuencia = str(frecuencia or "").strip().lower()
+    if frecuencia not in FRECUENCIAS:
+        frecuencia = "mensual"
+    fecha = str(fecha) if fecha else _now_str()
+
+    if tipo == "abono":
+        # en abono no aplica frecuencia
+        return [cliente_id, fecha, "abono", pesos(monto), pesos(seguro), 0, 0, None]
+    return [cliente_id, fecha, "prestamo", 0, pesos(seguro), pesos(monto_entregado), float(interes_mensual or 20), frecuencia]
+
+
+# =========================
+# LOTE (fin de ruta / outbox offline)
+# =========================
+PAGOS_LOTE_MAX = int(os.getenv("PAGOS_LOTE_MAX", "2000"))
+
+
+def validar_movimiento(p: dict) -> tuple[list | None, str]:
+    """Fila para INSERT_MOVIMIENTO o (None, motivo)."""
+    try:
+        cliente_id = int(p.get("cliente_id"))
+        monto = pesos(p.get("monto"))
+        seguro = pesos(p.get("seguro"))
+        entregado = pesos(p.get("monto_entregado"))
+        interes = float(p.get("interes_mensual") or 20)
+    except (TypeError, ValueError, OverflowError):
+        return None, "datos inválidos"
+
+    tipo = p.get("tipo") or "abono"
+    tipo = tipo.strip().lower() if isinstance(tipo, str) else ""
+    if tipo not in ("abono", "prestamo"):
+        return None, "tipo debe ser abono o prestamo"
+    if min(monto, seguro, entregado, interes) < 0:
+        return None, "valores negativos"
+    if tipo == "abono" and monto <= 0:
+        return None, "abono sin monto"
+    if tipo == "prestamo" and entregado <= 0:
+        return None, "préstamo sin monto entregado"
+
+    fecha = str(p.get("fecha") or "").strip().replace("T", " ")[:19] or None
+    if fecha:
+        try:
+            datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S" if len(fecha) > 10 else "%Y-%m-%d")
+        except ValueError:
+            return None, "fecha inválida"
+    return movimiento_params(cliente_id, tipo, monto, seguro, entregado, interes, p.get("frecuencia"), fecha), ""
+
+
+def _in(n: int) -> str:
+    return ", ".join(["?"] * n)
+
+
+def saldos_de(cliente_ids, tx=None) -> dict[int, int]:
+    """
+    Saldo (prestado + seguro - abonos, mínimo 0) de varios clientes en una query.
+    Con tx lee dentro de esa transacción; sin tx, con una conexión del pool.
+    """
+    ids = sorted(set(cliente_ids))
+    if not ids:
+        return {}
+    rows = (tx or db).fetch_all(f"""
+        SELECT cliente_id,
+               COALESCE(SUM(CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN COALESCE(monto_entregado,0) + COALESCE(seguro,0) ELSE 0 END), 0)
+             - COALESCE(SUM(CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN 0 ELSE COALESCE(monto,0) END), 0) AS saldo
+        FROM pagos
+        WHERE cliente_id IN ({_in(len(ids))})
+        GROUP BY cliente_id
+    """, ids)
+    out = {i: 0 for i in ids}
+    for r in rows:
+        out[int(r["cliente_id"])] = max(int(r["saldo"] or 0), 0)
+    return out
+
+
+def _ingresar(tx, pagos: list[dict], usuario: str) -> list[dict]:
+    resultados: list[dict | None] = [None] * len(pagos)
+    claves = {}
+    filas = []  # (posición, fila INSERT_MOVIMIENTO)
+
+    # 1) validar y deduplicar dentro del lote
+    for i, p in enumerate(pagos):
+        clave = str(p.get("clave") or "").strip()[:100]
+        if clave:
+            if clave in claves:
+                resultados[i] = {"estado": "duplicado", "detalle": "llave repetida en el lote"}
+                continue
+            claves[clave] = i
+        fila, motivo = validar_movimiento(p)
+        if fila is None:
+            resultados[i] = {"estado": "error", "detalle": motivo}
+        else:
+            filas.append((i, fila))
+
+    # 2) llaves ya aplicadas en lotes anteriores: mismo resultado, sin reinsertar
+    previos = {}
+    lista = list(claves)
+    for k in range(0, len(lista), 500):
+        chunk = lista[k:k + 500]
+        for r in tx.fetch_all(f"SELECT clave, resultado FROM idempotencia WHERE clave IN ({_in(len(chunk))})", chunk):
+            try:
+                previos[r["clave"]] = json.loads(r["resultado"] or "{}")
+            except ValueError:
+                previos[r["clave"]] = {}
+    for clave, prev in previos.items():
+        i = claves[clave]
+        resultados[i] = {"estado": "duplicado", **prev, "repetido": True}
+    filas = [(i, f) for i, f in filas if resultados[i] is None]
+
+    # 3) clientes existentes (una query)
+    ids = sorted({f[0] for _, f in filas})
+    existentes = set()
+    for k in range(0, len(ids), 500):
+        chunk = ids[k:k + 500]
+        existentes |= {int(r["id"]) for r in tx.fetch_all(f"SELECT id FROM clientes WHERE id IN ({_in(len(chunk))})", chunk)}
+    for i, f in filas:
+        if f[0] not in existentes:
+            resultados[i] = {"estado": "error", "detalle": "cliente no existe"}
+    filas = [(i, f) for i, f in filas if resultados[i] is None]
+
+    # 4) un solo executemany para todo el lote
+    tx.executemany(INSERT_MOVIMIENTO, [f for _, f in filas])
+
+    # 5) saldo una vez por cliente afectado
+    saldos = saldos_de([f[0] for _, f in filas], tx)
+    for i, f in filas:
+        resultados[i] = {"estado": "ok", "cliente_id": f[0], "saldo": saldos[f[0]]}
+
+    # 6) guardar llaves (también las de error: un reintento da la misma respuesta)
+    nuevas = [
+        (clave, usuario, "pago", json.dumps(resultados[i]))
+        for clave, i in claves.items()
+        if clave not in previos and resultados[i] and resultados[i]["estado"] != "duplicado"
+    ]
+    tx.executemany("INSERT INTO idempotencia (clave, usuario, operacion, resultado) VALUES (?, ?, ?, ?)", nuevas)
+
+    return [{"clave": p.get("clave"), **r} for p, r in zip(pagos, resultados)]
+
+
+def ingresar_movimientos(pagos: list[dict], usuario: str) -> list[dict]:
+    """
+    Inserta un lote de movimientos (abonos/préstamos) en una transacción.
+    Cada pago: {"clave"?, "cliente_id", "tipo", "monto", "seguro", "monto_entregado",
+    "interes_mensual", "frecuencia", "fecha"?}. Devuelve un resultado por pago.
+    """
+    try:
+        with db.transaction() as tx:
+            return _ingresar(tx, pagos, usuario)
+    except Exception as e:
+        if not db.is_integrity_error(e):
+            raise
+    # Otro request metió alguna de las llaves en paralelo: al repetir salen como duplicadas
+    with db.transaction() as tx:
+        return _ingresar(tx, pagos, usuario)
+
+
+# =========================
+# UN MOVIMIENTO (formulario y /api/v1)
+# =========================
+MOVIMIENTO_COLS = "id, cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia"
+
+
+def crear_movimiento(params: list) -> dict:
+    """Inserta una fila de movimiento_params(); devuelve la fila y el saldo del cliente."""
+    with db.transaction() as tx:
+        row = tx.fetch_one(INSERT_MOVIMIENTO.rstrip() + f" RETURNING {MOVIMIENTO_COLS}", params)
+        saldo = saldos_de([row["cliente_id"]], tx)[row["cliente_id"]]
+    return {"pago": row, "saldo": saldo}
+
+
+def eliminar_movimiento(pago_id: int) -> dict | None:
+    """Borra el movimiento; devuelve {"id", "cliente_id", "saldo"} o None si no existía."""
+    with db.transaction() as tx:
+        row = tx.fetch_one("DELETE FROM pagos WHERE id = ? RETURNING id, cliente_id", [pago_id])
+        if row is None:
+            return None
+        row["saldo"] = saldos_de([row["cliente_id"]], tx)[row["cliente_id"]]
+    return row
+
+
+@router.post("/pagos/lote")
+async def pagos_lote(request: Request):
+    """
+    Body: {"pagos": [{...}, ...]} (ver ingresar_movimientos).
+    Respuesta: {"insertados": n, "resultados": [...]} en el mismo orden.
+    """
+    user = require_user(request)
+    if isinstance(user, RedirectResponse):
+        return JSONResponse({"error": "sesión vencida"}, status_code=401)
+
+    try:
+        body = await request.json()
+        pagos = [p if isinstance(p, dict) else {} for p in (body.get("pagos") or [])]
+    except Exception:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    if len(pagos) > PAGOS_LOTE_MAX:
+        return JSONResponse({"error": f"máximo {PAGOS_LOTE_MAX} pagos por lote"}, status_code=413)
+
+    resultados = await run_in_threadpool(ingresar_movimientos, pagos, str(user.get("username") or ""))
+    return JSONResponse({
+        "insertados": sum(1 for r in resultados if r["estado"] == "ok" and not r.get("repetido")),
+        "resultados": resultados,
+    })
+
+
 @router.get("/pagos")
 def pagos_home(request: Request):
     user = require_user(request)
     if isinstance(user, RedirectResponse):
         return user
 
+    return cached_page(request, lambda: _render_pagos(request, user), user=user, tables=("pagos", "clientes"))
+
+
+def _render_pagos(request: Request, user: dict):
     clientes = db.fetch_all("""
         SELECT id, nombre, documento
         FROM clientes
@@ -54,9 +283,9 @@ def crear_pago(
     request: Request,
     cliente_id: int = Form(...),
     tipo: str = Form(...),  # abono | prestamo
-    monto: float = Form(0),
-    seguro: float = Form(0),
-    monto_entregado: float = Form(0),
+    monto: int = Form(0),
+    seguro: int = Form(0),
+    monto_entregado: int = Form(0),
     interes_mensual: float = Form(20),
     frecuencia: str = Form("mensual"),
 ):
@@ -64,29 +293,9 @@ def crear_pago(
     if isinstance(user, RedirectResponse):
         return user
 
-    tipo = (tipo or "").strip().lower()
-    frecuencia = (frecuencia or "").strip().lower()
-    if frecuencia not in FRECUENCIAS:
-        frecuencia = "mensual"
-
-    fecha = _now_str()
-
-    if tipo == "abono":
-        # en abono no aplica frecuencia
-        params = [cliente_id, fecha, "abono", float(monto or 0), float(seguro or 0), 0, 0, None]
-    else:
-        params = [cliente_id, fecha, "prestamo", 0, float(seguro or 0), float(monto_entregado or 0), float(interes_mensual or 20), frecuencia]
-
-    if db.db_kind() == "sqlite":
-        db.execute("""
-            INSERT INTO pagos (cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, params)
-    else:
-        db.execute("""
-            INSERT INTO pagos (cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, params)
+    crear_movimiento(movimiento_params(
+        cliente_id, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia, _now_str()
+    ))
 
     return RedirectResponse("/pagos", status_code=303)
 
@@ -96,9 +305,6 @@ def eliminar_pago(request: Request, pago_id: int):
     if isinstance(user, RedirectResponse):
         return user
 
-    if db.db_kind() == "sqlite":
-        db.execute("DELETE FROM pagos WHERE id = ?", [pago_id])
-    else:
-        db.execute("DELETE FROM pagos WHERE id = %s", [pago_id])
+    eliminar_movimiento(pago_id)
 
     return RedirectResponse("/pagos", status_code=303)
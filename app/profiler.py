@@ -0,0 +1,185 @@
+# app/profiler.py
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+from datetime import datetime
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+
+from app.auth import get_current_user, require_admin
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Perfilado por request (muestreo de stacks, formato "folded" de flamegraph):
+# - admin: ?_profile=1 o header "X-Profile: 1"
+# - muestreo: PROFILE_SAMPLE_RATE=0.01 perfila ~1% de los requests
+# Apagado no cuesta nada: solo se mira un header/param.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/bless_profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+
+# Muestreador del request en curso; los hilos del threadpool reciben una copia
+# del contexto (run_in_threadpool), así se sabe qué hilos trabajan para él.
+_perfil: ContextVar["_Sampler | None"] = ContextVar("bless_profile", default=None)
+
+
+class _Sampler(threading.Thread):
+    """
+    Toma cada PROFILE_INTERVAL_MS el stack de los hilos que trabajan para este
+    request y de ningún otro (dos requests a la misma ruta no se mezclan):
+    - el hilo del event loop, solo mientras corre bajo el frame del middleware
+      de este request (endpoints async);
+    - los hilos del threadpool que ejecutan una copia de su contexto (endpoints
+      sync y run_in_threadpool desde endpoints async).
+    """
+
+    def __init__(self, raiz):
+        super().__init__(daemon=True, name="bless-profiler")
+        self.raiz = raiz  # frame de ProfilerMiddleware.__call__ de este request
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def _es_del_request(self, frames: list) -> bool:
+        # frames: del más externo al más interno
+        if any(f is self.raiz for f in frames):
+            return True
+        # el worker del threadpool guarda el contexto del trabajo en un local
+        # de su bucle, cerca de la base del stack
+        for f in frames[:5]:
+            if f.f_locals is f.f_globals:
+                continue
+            for v in f.f_locals.values():
+                if isinstance(v, Context) and v.get(_perfil) is self:
+                    return True
+        return False
+
+    def run(self):
+        interval = PROFILE_INTERVAL_MS / 1000.0
+        me = threading.get_ident()
+        while not self._halt.wait(interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                frames = []
+                f = frame
+                while f is not None:
+                    frames.append(f)
+                    f = f.f_back
+                frames.reverse()
+                if not self._es_del_request(frames):
+                    continue
+                stack = ";".join(
+                    f"{f.f_code.co_name} ({os.path.basename(f.f_code.co_filename)}:{f.f_lineno})" for f in frames
+                )
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def _wants_profile(scope: dict) -> bool:
+    # apagado: solo se miran bytes del scope, sin armar un Request
+    if b"_profile=" in scope.get("query_string", b"") or any(k == b"x-profile" for k, _ in scope["headers"]):
+        request = Request(scope)
+        if request.query_params.get("_profile") or request.headers.get("x-profile"):
+            user = get_current_user(request)
+            return not isinstance(user, RedirectResponse) and user.get("role") == "admin"
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _nombre(scope: dict, seconds: float) -> str:
+    slug = scope["path"].strip("/").replace("/", "_") or "root"
+    ms = int(seconds * 1000)
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{slug}_{ms}ms.folded"
+
+
+def _save(sampler: _Sampler, name: str) -> str:
+    sampler.stop()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+        for stack, n in sampler.stacks.most_common():
+            f.write(f"{stack} {n}\n")
+
+    perfiles = sorted(p for p in os.listdir(PROFILE_DIR) if p.endswith(".folded"))
+    for viejo in perfiles[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, viejo))
+        except OSError:
+            pass
+    return name
+
+
+class ProfilerMiddleware:
+    """ASGI puro: apagado pasa el request tal cual, sin tareas ni streams extra."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            return await self.app(scope, receive, send)
+
+        sampler = _Sampler(sys._getframe())
+        token = _perfil.set(sampler)
+        t0 = time.perf_counter()
+        name = None
+
+        async def send_profiled(message):
+            nonlocal name
+            if message["type"] == "http.response.start":
+                # el nombre (con la duración hasta la respuesta) va en el header
+                name = _nombre(scope, time.perf_counter() - t0)
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", name.encode())]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _perfil.reset(token)
+            if name is None:
+                sampler.stop()
+            else:
+                # join del hilo y escritura del archivo fuera del event loop
+                await run_in_threadpool(_save, sampler, name)
+
+
+# =========================
+# DESCARGA (solo admin)
+# =========================
+@router.get("/profiles")
+def listar_perfiles(request: Request):
+    user = require_admin(request)
+    if isinstance(user, RedirectResponse):
+        return user
+
+    if not os.path.isdir(PROFILE_DIR):
+        return JSONResponse([])
+    perfiles = sorted((p for p in os.listdir(PROFILE_DIR) if p.endswith(".folded")), reverse=True)
+    return JSONResponse([
+        {"archivo": p, "url": f"/admin/profiles/{p}"} for p in perfiles
+    ])
+
+
+@router.get("/profiles/{nombre}")
+def descargar_perfil(request: Request, nombre: str):
+    user = require_admin(request)
+    if isinstance(user, RedirectResponse):
+        return user
+
+    ruta = os.path.join(PROFILE_DIR, os.path.basename(nombre))
+    if not os.path.isfile(ruta):
+        return JSONResponse({"error": "No existe"}, status_code=404)
+    # Compatible con flamegraph.pl y speedscope.app
+    return FileResponse(ruta, media_type="text/plain", filename=os.path.basename(ruta))
@@ -1,62 +1,81 @@
-import os
-import sqlite3
+import tempfile
 from datetime import datetime
-from io import BytesIO
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import RedirectResponse, StreamingResponse
-from fastapi.templating import Jinja2Templates
-
-from openpyxl import Workbook
-from openpyxl.styles import Font
+from starlette.background import BackgroundTask
 
+from app import analytics, db
 from app.auth import require_admin
+from app.cache import cached_json
+from app.templating import templates
 
 router = APIRouter(prefix="/reportes", tags=["reportes"])
-templates = Jinja2Templates(directory="templates")
 
-DB_PATH = os.getenv("DB_PATH", "/tmp/bless.db")
 
+# Ancho de columnas: se calcula con el primer lote (en write_only no se
+# pueden releer las celdas después de escritas)
+def _column_widths(columns, rows) -> list[int]:
+    widths = [len(str(c)) for c in columns]
+    for r in rows:
+        for i, v in enumerate(r):
+            n = 0 if v is None else len(str(v))
+            if n > widths[i]:
+                widths[i] = n
+    return [max(10, min(w + 2, 60)) for w in widths]
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
-    try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-    except Exception:
-        pass
-    return conn
 
+def _table_columns(table_name: str) -> list[str]:
+    if db.db_kind() == "sqlite":
+        return [c["name"] for c in db.fetch_all(f'PRAGMA table_info("{table_name}")')]  # nombre real de columnas
+    return [c["column_name"] for c in db.fetch_all("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = ? ORDER BY ordinal_position
+    """, [table_name])]
 
-def _fetch_table_as_columns_and_rows(conn: sqlite3.Connection, table_name: str):
-    cur = conn.cursor()
 
-    cur.execute(f'PRAGMA table_info("{table_name}")')
-    cols_info = cur.fetchall()
-    columns = [c[1] for c in cols_info]  # nombre real de columnas
+def _write_table_sheet(wb, sheet_name: str, table_name: str):
+    """Hoja con la tabla completa, leída por lotes (db.stream) y escrita en modo write_only."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
 
-    if not columns:
-        return [], []
+    ws = wb.create_sheet(sheet_name)
 
-    order_clause = ""
-    if "id" in columns:
-        order_clause = ' ORDER BY "id" ASC'
+    columns = _table_columns(table_name)
+    if not columns:
+        cell = WriteOnlyCell(ws, value=f"Sin datos (tabla {table_name} no encontrada o sin columnas)")
+        cell.font = Font(bold=True)
+        ws.append([cell])
+        return
 
+    order_clause = ' ORDER BY "id" ASC' if "id" in columns else ""
     select_cols = ", ".join([f'"{c}"' for c in columns])
-    cur.execute(f'SELECT {select_cols} FROM "{table_name}"{order_clause}')
-    rows = cur.fetchall()
 
-    return columns, rows
+    with db.stream(f'SELECT {select_cols} FROM "{table_name}"{order_clause}') as s:
+        first = True
+        for lote in s.batches():
+            if first:
+                for i, w in enumerate(_column_widths(columns, lote), start=1):
+                    ws.column_dimensions[get_column_letter(i)].width = w
+                _append_header(ws, columns)
+                first = False
+            for r in lote:
+                ws.append([("" if v is None else v) for v in r])
+        if first:
+            _append_header(ws, columns)
 
 
-def _autosize_worksheet(ws):
-    for col_cells in ws.columns:
-        max_len = 0
-        col_letter = col_cells[0].column_letter
-        for cell in col_cells:
-            value = "" if cell.value is None else str(cell.value)
-            if len(value) > max_len:
-                max_len = len(value)
-        ws.column_dimensions[col_letter].width = max(10, min(max_len + 2, 60))
+def _append_header(ws, columns):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    header = []
+    for c in columns:
+        cell = WriteOnlyCell(ws, value=c)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
 
 
 @router.get("/", response_class=None)
@@ -71,59 +90,59 @@ def ver_reportes(request: Request):
     )
 
 
+def _mes_siguiente(yyyymm: str) -> str:
+    y, m = map(int, yyyymm.split("-"))
+    return f"{y + (m == 12):04d}-{m % 12 + 1:02d}-01"
+
+
+@router.get("/analitica")
+def reporte_analitica(
+    request: Request,
+    desde: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
+    hasta: str = Query(..., pattern=r"^\d{4}-\d{2}$"),
+):
+    """Rollups de varios meses (desde/hasta en YYYY-MM, ambos incluidos); ver app.analytics."""
+    user = require_admin(request)
+    if isinstance(user, RedirectResponse):
+        return user
+
+    inicio, fin = f"{desde}-01", _mes_siguiente(hasta)
+
+    def _build():
+        return {
+            "motor": analytics.motor(),
+            "desde": desde,
+            "hasta": hasta,
+            "por_mes": analytics.resumen_mensual(inicio, fin),
+            "por_cobrador": analytics.por_cobrador(inicio, fin),
+            "mora": analytics.mora_aging(),
+        }
+
+    return cached_json(request, _build, user=user, tables=analytics.TABLAS)
+
+
 @router.get("/exportar-todo")
 def exportar_todo(request: Request):
     user = require_admin(request)
     if isinstance(user, RedirectResponse):
         return user
 
-    conn = get_connection()
-    try:
-        clientes_cols, clientes_rows = _fetch_table_as_columns_and_rows(conn, "clientes")
-        pagos_cols, pagos_rows = _fetch_table_as_columns_and_rows(conn, "pagos")
-
-        wb = Workbook()
-        wb.remove(wb.active)  # quita hoja por defecto
-
-        # Hoja CLIENTES
-        ws_clientes = wb.create_sheet("CLIENTES")
-        if clientes_cols:
-            ws_clientes.append(clientes_cols)
-            for cell in ws_clientes[1]:
-                cell.font = Font(bold=True)
-            for r in clientes_rows:
-                ws_clientes.append([("" if v is None else v) for v in r])
-            _autosize_worksheet(ws_clientes)
-        else:
-            ws_clientes.append(["Sin datos (tabla clientes no encontrada o sin columnas)"])
-            ws_clientes["A1"].font = Font(bold=True)
-
-        # Hoja PAGOS
-        ws_pagos = wb.create_sheet("PAGOS")
-        if pagos_cols:
-            ws_pagos.append(pagos_cols)
-            for cell in ws_pagos[1]:
-                cell.font = Font(bold=True)
-            for r in pagos_rows:
-                ws_pagos.append([("" if v is None else v) for v in r])
-            _autosize_worksheet(ws_pagos)
-        else:
-            ws_pagos.append(["Sin datos (tabla pagos no encontrada o sin columnas)"])
-            ws_pagos["A1"].font = Font(bold=True)
-
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-
-        filename = f"BLESS_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        return StreamingResponse(
-            output,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+    from openpyxl import Workbook  # pesado: solo cuando se exporta
+
+    wb = Workbook(write_only=True)
+    _write_table_sheet(wb, "CLIENTES", "clientes")
+    _write_table_sheet(wb, "PAGOS", "pagos")
+
+    # El xlsx se arma en un archivo temporal (en disco si pasa de 8 MB)
+    output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    wb.save(output)
+    output.seek(0)
+
+    filename = f"BLESS_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    return StreamingResponse(
+        output,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(output.close),
+    )
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 
+from app.cache import cached_json
 from app.database import get_db
 from app.models.cliente import Cliente
 from app.schemas.cliente import ClienteCreate, ClienteResponse
@@ -13,8 +14,12 @@ router = APIRouter(
 
 # LISTAR CLIENTES
 @router.get("/", response_model=List[ClienteResponse], summary="Listar clientes")
-def listar_clientes(db: Session = Depends(get_db)):
-    return db.query(Cliente).all()
+def listar_clientes(request: Request, db: Session = Depends(get_db)):
+    return cached_json(
+        request,
+        lambda: [ClienteResponse.model_validate(c, from_attributes=True) for c in db.query(Cliente).all()],
+        tables=("clientes",),
+    )
 
 # CREAR CLIENTE
 @router.post("/", response_model=ClienteResponse, summary="Crear cliente")
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.cache import cached_json
 from app.database import get_db
+from app.models.cliente import Cliente
 from app.models.cuota import Cuota
+from app.models.prestamo import Prestamo
+from app.utils import co_date_today
 
 router = APIRouter(
     prefix="/cuotas",
@@ -11,8 +17,70 @@ router = APIRouter(
 
 # 🔹 Listar todas las cuotas
 @router.get("/", summary="Listar cuotas")
-def listar_cuotas(db: Session = Depends(get_db)):
-    return db.query(Cuota).all()
+def listar_cuotas(request: Request, db: Session = Depends(get_db)):
+    return cached_json(request, lambda: db.query(Cuota).all(), tables=("cuotas",))
+
+
+# 🔹 Cuotas pendientes que vencen hoy (usa ix_cuotas_fecha_pagada)
+@router.get("/hoy", summary="Cuotas que vencen hoy")
+def cuotas_de_hoy(request: Request, db: Session = Depends(get_db)):
+    hoy = co_date_today()  # mismo día que la llave de cached_json
+
+    return cached_json(request, lambda: db.query(Cuota).filter(
+        Cuota.fecha == hoy,
+        Cuota.pagada == False
+    ).all(), tables=("cuotas",))
+
+
+# 🔹 Planilla de ruta: cuotas de hoy con nombre/dirección, por cobrador
+@router.get("/hoy/ruta", summary="Planilla de cobro del día por cobrador")
+def ruta_de_hoy(request: Request, fecha: date | None = None, db: Session = Depends(get_db)):
+    return cached_json(request, lambda: _ruta(db, fecha or co_date_today()),
+                       tables=("cuotas", "prestamos", "clientes"))
+
+
+def _ruta(db: Session, dia: date) -> dict:
+
+    stmt = (
+        select(
+            Cuota.id,
+            Cuota.numero,
+            Cuota.monto,
+            Cuota.prestamo_id,
+            Prestamo.cobrador_username,
+            Prestamo.frecuencia,
+            Cliente.id.label("cliente_id"),
+            Cliente.nombre,
+            Cliente.direccion,
+            Cliente.telefono,
+        )
+        .join(Prestamo, Prestamo.id == Cuota.prestamo_id)
+        .join(Cliente, Cliente.id == Prestamo.cliente_id)
+        .where(Cuota.fecha == dia, Cuota.pagada == False)
+        .order_by(Prestamo.cobrador_username, Cliente.direccion, Cliente.nombre)
+    )
+
+    rutas = {}
+    for r in db.execute(stmt):
+        cobrador = r.cobrador_username or "sin_asignar"
+        ruta = rutas.setdefault(cobrador, {"cobrador": cobrador, "total": 0.0, "cuotas": []})
+        ruta["total"] += float(r.monto or 0)
+        ruta["cuotas"].append({
+            "cuota_id": r.id,
+            "numero": r.numero,
+            "monto": r.monto,
+            "prestamo_id": r.prestamo_id,
+            "frecuencia": r.frecuencia,
+            "cliente_id": r.cliente_id,
+            "nombre": r.nombre,
+            "direccion": r.direccion,
+            "telefono": r.telefono,
+        })
+
+    for ruta in rutas.values():
+        ruta["total"] = round(ruta["total"], 2)
+
+    return {"fecha": dia.isoformat(), "rutas": list(rutas.values())}
 
 
 # 🔹 Marcar una cuota como pagada
@@ -34,43 +102,3 @@ def pagar_cuota(cuota_id: int, db: Session = Depends(get_db)):
         "mensaje": "Cuota marcada como pagada",
         "cuota_id": cuota.id
     }
-from datetime import date
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends
-from app.database import get_db
-from app.models.cuota import Cuota
-
-router = APIRouter(
-    prefix="/cuotas",
-    tags=["Cuotas"]
-)
-
-@router.get("/hoy")
-def cuotas_de_hoy(db: Session = Depends(get_db)):
-    hoy = date.today()
-
-    cuotas = db.query(Cuota).filter(
-        Cuota.pagada == False,
-        Cuota.fecha == hoy
-    ).all()
-
-    return cuotas
-from fastapi import HTTPException
-
-@router.put("/{cuota_id}/pagar")
-def pagar_cuota(cuota_id: int, db: Session = Depends(get_db)):
-    cuota = db.query(Cuota).filter(Cuota.id == cuota_id).first()
-
-    if not cuota:
-        raise HTTPException(status_code=404, detail="Cuota no encontrada")
-
-    if cuota.pagada:
-        return {"mensaje": "La cuota ya estaba pagada"}
-
-    cuota.pagada = True
-    db.commit()
-
-    return {
-        "mensaje": "Cuota pagada correctamente",
-        "cuota_id": cuota.id
-    }
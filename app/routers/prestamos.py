@@ -1,33 +1,47 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.prestamo import Prestamo
 from app.models.cuota import Cuota
 from app.schemas.prestamo import PrestamoCreate
+from app.services.amortizacion import generar_cronograma
 
 router = APIRouter(prefix="/prestamos", tags=["Préstamos"])
 
 @router.post("/")
 def crear_prestamo(data: PrestamoCreate, db: Session = Depends(get_db)):
 
-    prestamo = Prestamo(**data.dict())
+    prestamo = Prestamo(
+        cliente_id=data.cliente_id,
+        monto=data.monto,
+        valor=int(round(data.monto)),
+        interes=data.interes,
+        cuotas=data.cuotas,
+        frecuencia=data.frecuencia,
+        cobrador_username=(data.cobrador_username or "").strip(),
+    )
     db.add(prestamo)
-    db.commit()
-    db.refresh(prestamo)
+    db.flush()  # obtiene prestamo.id sin cerrar la transacción
 
     # 🔹 CÁLCULO DE CUOTAS
-    interes_total = prestamo.monto * (prestamo.interes / 100)
-    total_pagar = prestamo.monto + interes_total
-    valor_cuota = total_pagar / prestamo.plazo_meses
+    total_pagar = prestamo.monto * (1 + prestamo.interes / 100)
+    cronograma = generar_cronograma(
+        total_pagar,
+        prestamo.cuotas,
+        fecha_inicio=data.fecha_inicio,
+        frecuencia=data.frecuencia,
+        saltar_domingos=data.saltar_domingos,
+    )
 
-    for n in range(1, prestamo.plazo_meses + 1):
-        cuota = Cuota(
-            prestamo_id=prestamo.id,
-            numero_cuota=n,
-            valor=round(valor_cuota, 2)
-        )
-        db.add(cuota)
+    # Un solo INSERT (executemany) en la misma transacción del préstamo
+    if cronograma:
+        db.execute(insert(Cuota), [{"prestamo_id": prestamo.id, **c} for c in cronograma])
 
     db.commit()
 
-    return {"mensaje": "Préstamo y cuotas creadas correctamente"}
+    return {
+        "mensaje": "Préstamo y cuotas creadas correctamente",
+        "prestamo_id": prestamo.id,
+        "cuotas": len(cronograma),
+    }
@@ -1,31 +1,22 @@
 # app/saldos.py
+from typing import TYPE_CHECKING
+
 from fastapi import APIRouter, Request
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from datetime import datetime, date
 
 from app import db
 from app.auth import require_user
+from app.cache import cached_page
+from app.templating import templates
+from app.utils import co_date_today, dia_de
+
+if TYPE_CHECKING:
+    import numpy as np
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 FREQ_DAYS = {"diario": 1, "semanal": 7, "quincenal": 15, "mensual": 30}
 
-def _parse_dt(s: str):
-    if not s:
-        return None
-    s = str(s).strip()
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            pass
-    try:
-        return datetime.fromisoformat(s)
-    except Exception:
-        return None
-
 def _norm_freq(freq: str) -> str:
     f = (freq or "").strip().lower()
     return f if f in FREQ_DAYS else "mensual"
@@ -36,96 +27,104 @@ def saldos_home(request: Request):
     if isinstance(user, RedirectResponse):
         return user
 
-    clientes = db.fetch_all("""
-        SELECT id, nombre, documento, telefono,
-               COALESCE(NULLIF(tipo_cobro,''), 'mensual') AS tipo_cobro
-        FROM clientes
-        ORDER BY nombre ASC
-    """)
-
-    today = date.today()
-    rows = []
-
-    for c in clientes:
-        cid = c["id"]
-        movs = db.fetch_all(
-            """
-            SELECT tipo, fecha, monto, seguro, monto_entregado, interes_mensual,
-                   COALESCE(NULLIF(frecuencia,''), 'mensual') AS frecuencia
-            FROM pagos
-            WHERE cliente_id = %s
-            ORDER BY id ASC
-            """ if db.db_kind()=="postgres" else
-            """
-            SELECT tipo, fecha, monto, seguro, monto_entregado, interes_mensual,
-                   COALESCE(NULLIF(frecuencia,''), 'mensual') AS frecuencia
-            FROM pagos
-            WHERE cliente_id = ?
-            ORDER BY id ASC
-            """,
-            [cid]
+    return cached_page(
+        request,
+        lambda: templates.TemplateResponse("saldos.html", {"request": request, "user": user, "rows": _calcular_saldos()}),
+        user=user, tables=("clientes", "pagos"),
+    )
+
+
+# Un solo query para todos los clientes. Las fechas se comparan como
+# pagos.dia (entero, ver app.db) en vez de parsear el texto de cada movimiento.
+# El tipo se compara como antes en Python: sin mayúsculas, y NULL cuenta como
+# abono (hay filas viejas con 'Prestamo' o sin tipo).
+SALDOS_SQL = """
+    WITH tot AS (
+        SELECT cliente_id,
+               SUM(CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN COALESCE(monto_entregado,0) + COALESCE(seguro,0) ELSE 0 END) AS prestado,
+               SUM(CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN 0 ELSE COALESCE(monto,0) END) AS abonos,
+               MAX(CASE WHEN LOWER(COALESCE(tipo,'')) = 'prestamo' THEN id END) AS ult_prestamo
+        FROM pagos
+        GROUP BY cliente_id
+    )
+    SELECT c.id, c.nombre, c.documento, c.telefono,
+           COALESCE(NULLIF(c.tipo_cobro,''), 'mensual') AS tipo_cobro,
+           COALESCE(t.prestado, 0) AS prestado,
+           COALESCE(t.abonos, 0) AS abonos,
+           p.dia AS prestamo_dia,
+           COALESCE(NULLIF(p.frecuencia,''), 'mensual') AS frecuencia,
+           p.interes_mensual,
+           (SELECT a.dia FROM pagos a
+             WHERE a.cliente_id = c.id AND LOWER(COALESCE(a.tipo,'')) <> 'prestamo'
+               AND a.id > p.id AND a.dia >= p.dia
+             ORDER BY a.id DESC LIMIT 1) AS abono_dia
+    FROM clientes c
+    LEFT JOIN tot t ON t.cliente_id = c.id
+    LEFT JOIN pagos p ON p.id = t.ult_prestamo
+    ORDER BY c.nombre ASC
+"""
+
+
+def _int64(valores, default: int = 0) -> "np.ndarray":
+    import numpy as np
+
+    return np.fromiter((default if v is None else int(v) for v in valores), dtype=np.int64, count=len(valores))
+
+
+def _calcular_saldos() -> list[dict]:
+    # Columnas en vez de un dict por cliente (ver db.fetch_columns)
+    import numpy as np
+
+    cols = db.fetch_columns(SALDOS_SQL)
+    n = len(cols["id"])
+    if not n:
+        return []
+    today = dia_de(co_date_today())
+
+    # Pesos enteros de punta a punta: las sumas salen de SQL como enteros y el
+    # resto se calcula por columnas (int64), sin float por fila.
+    saldo = np.maximum(_int64(cols["prestado"]) - _int64(cols["abonos"]), 0)
+
+    tiene_prestamo = np.fromiter((v is not None for v in cols["prestamo_dia"]), dtype=bool, count=n)
+    prestamo_dia = _int64(cols["prestamo_dia"])
+    abono_dia = _int64(cols["abono_dia"], default=-1)
+    base_dia = np.where(abono_dia >= 0, abono_dia, prestamo_dia)
+
+    freqs = [
+        _norm_freq(f if p is not None else t)
+        for f, p, t in zip(cols["frecuencia"], cols["prestamo_dia"], cols["tipo_cobro"])
+    ]
+    freq_days = np.fromiter((FREQ_DAYS.get(f, 30) for f in freqs), dtype=np.int64, count=n)
+
+    activo = (saldo > 0) & tiene_prestamo
+    mora_dias = np.where(activo, today - (base_dia + freq_days), 0)
+    en_mora = mora_dias > 0
+    mora_dias = np.maximum(mora_dias, 0)
+
+    interes_mensual = np.fromiter((float(v or 20) for v in cols["interes_mensual"]), dtype=np.float64, count=n)
+    meses = np.maximum(today - prestamo_dia, 0) / 30.0
+    interes = np.where(activo, np.rint(saldo * (interes_mensual / 100.0) * meses), 0).astype(np.int64)
+    total = saldo + interes
+
+    out = [
+        {
+            "nombre": nombre,
+            "documento": documento,
+            "telefono": telefono,
+            "frecuencia": f,
+            "saldo": s,
+            "interes": i,
+            "total": t,
+            "en_mora": m,
+            "mora_dias": d,
+        }
+        for nombre, documento, telefono, f, s, i, t, m, d in zip(
+            cols["nombre"], cols["documento"], cols["telefono"], freqs,
+            saldo.tolist(), interes.tolist(), total.tolist(), en_mora.tolist(), mora_dias.tolist(),
         )
-
-        total_prestado = 0.0
-        total_abonos = 0.0
-        last_prestamo_dt = None
-        last_abono_dt = None
-        last_freq = None
-        last_interes = 20.0
-
-        for m in movs:
-            t = (m.get("tipo") or "").lower()
-            dt = _parse_dt(m.get("fecha"))
-            if t == "prestamo":
-                total_prestado += float(m.get("monto_entregado") or 0) + float(m.get("seguro") or 0)
-                last_prestamo_dt = dt
-                last_abono_dt = None
-                last_freq = _norm_freq(m.get("frecuencia"))
-                last_interes = float(m.get("interes_mensual") or 20)
-            else:
-                total_abonos += float(m.get("monto") or 0)
-                if last_prestamo_dt and dt and dt >= last_prestamo_dt:
-                    last_abono_dt = dt
-
-        saldo = total_prestado - total_abonos
-        if saldo < 0:
-            saldo = 0.0
-
-        freq = last_freq or _norm_freq(c.get("tipo_cobro")) or "mensual"
-        freq_days = FREQ_DAYS.get(freq, 30)
-
-        base_dt = last_abono_dt or last_prestamo_dt
-        en_mora = False
-        mora_dias = 0
-
-        if saldo > 0 and base_dt:
-            due = date.fromordinal(base_dt.date().toordinal() + freq_days)
-            if today > due:
-                en_mora = True
-                mora_dias = (today - due).days
-
-        interes_estimado = 0.0
-        if saldo > 0 and last_prestamo_dt:
-            dias = (today - last_prestamo_dt.date()).days
-            meses = max(0.0, dias / 30.0)
-            interes_estimado = saldo * (last_interes / 100.0) * meses
-
-        total = saldo + interes_estimado
-
-        rows.append({
-            "nombre": c.get("nombre"),
-            "documento": c.get("documento"),
-            "telefono": c.get("telefono"),
-            "frecuencia": freq,
-            "saldo": round(saldo, 2),
-            "interes": round(interes_estimado, 2),
-            "total": round(total, 2),
-            "en_mora": en_mora,
-            "mora_dias": mora_dias
-        })
-
-    rows.sort(key=lambda r: (0 if r["en_mora"] else 1, -r["total"]))
-    return templates.TemplateResponse("saldos.html", {"request": request, "user": user, "rows": rows})
+    ]
+    out.sort(key=lambda r: (0 if r["en_mora"] else 1, -r["total"]))
+    return out
 
 @router.get("/alertas/mora")
 def alertas_mora(request: Request):
@@ -134,7 +133,8 @@ def alertas_mora(request: Request):
         return user
 
     # Recalcular igual que saldos y filtrar morosos
-    resp = saldos_home(request)
-    data = resp.context
-    morosos = [r for r in data["rows"] if r["en_mora"] and r["total"] > 0]
-    return templates.TemplateResponse("alertas_mora.html", {"request": request, "user": user, "rows": morosos})
+    def _render():
+        morosos = [r for r in _calcular_saldos() if r["en_mora"] and r["total"] > 0]
+        return templates.TemplateResponse("alertas_mora.html", {"request": request, "user": user, "rows": morosos})
+
+    return cached_page(request, _render, user=user, tables=("clientes", "pagos"))
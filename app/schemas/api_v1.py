@@ -0,0 +1,57 @@
+from pydantic import BaseModel
+
+
+class MovimientoIn(BaseModel):
+    cliente_id: int
+    tipo: str = "abono"  # abono | prestamo
+    monto: int = 0  # pesos enteros
+    seguro: int = 0
+    monto_entregado: int = 0
+    interes_mensual: float = 20
+    frecuencia: str = "mensual"
+    fecha: str | None = None
+
+
+class ClienteIn(BaseModel):
+    nombre: str
+    documento: str = ""
+    telefono: str = ""
+    direccion: str = ""
+    observaciones: str = ""
+    tipo_cobro: str = "mensual"
+
+
+class BaseDiaIn(BaseModel):
+    fecha: str
+    base_valor: str
+
+
+class GastoIn(BaseModel):
+    fecha: str
+    concepto: str
+    categoria: str = "general"
+    valor: str
+    cobrador_username: str = ""
+
+
+class SeguroIn(BaseModel):
+    fecha: str
+    cobrador_username: str
+    valor: str
+
+
+class PrestamoCajaIn(BaseModel):
+    fecha: str
+    valor: str
+    cliente_id: str = ""
+    cobrador_username: str = ""
+    observaciones: str = ""
+
+
+class PagoRapidoIn(BaseModel):
+    cedula: str
+    valor: float
+
+
+class CedulaIn(BaseModel):
+    cedula: str
@@ -5,6 +5,7 @@ class ClienteBase(BaseModel):
     nombre: str
     documento: str
     telefono: str
+    direccion: str = ""
 
 
 class ClienteCreate(ClienteBase):
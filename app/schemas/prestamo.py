@@ -1,10 +1,23 @@
+from datetime import date
+from typing import Optional
+
 from pydantic import BaseModel
 
 class PrestamoCreate(BaseModel):
     cliente_id: int
     monto: float
     interes: float
-    plazo_meses: int
+    cuotas: int
+    frecuencia: str = "mensual"
+    fecha_inicio: Optional[date] = None
+    saltar_domingos: bool = True
+    cobrador_username: str = ""
 
-class PrestamoResponse(PrestamoCreate):
+class PrestamoResponse(BaseModel):
     id: int
+    cliente_id: int
+    monto: float
+    interes: float
+    cuotas: int
+    frecuencia: str
+    cobrador_username: str
@@ -0,0 +1,78 @@
+import os
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+FRECUENCIAS = ["diario", "semanal", "quincenal", "mensual"]
+
+# Festivos opcionales: FESTIVOS="2026-01-01,2026-01-12,..."
+FESTIVOS = [f.strip() for f in os.getenv("FESTIVOS", "").split(",") if f.strip()]
+
+# Lunes..Sábado hábiles (domingo no se cobra)
+_SIN_DOMINGOS = "1111110"
+_TODOS = "1111111"
+
+
+def _fechas(inicio: date, n: int, frecuencia: str, weekmask: str, festivos) -> "np.ndarray":
+    import numpy as np
+
+    start = np.datetime64(inicio, "D")
+    k = np.arange(1, n + 1)
+
+    if frecuencia == "diario":
+        # n días hábiles después del inicio, en una sola llamada
+        return np.busday_offset(start, k, roll="forward", weekmask=weekmask, holidays=festivos)
+
+    if frecuencia == "mensual":
+        # mismo día del mes; si no existe (31 -> 30/28) se usa el último día
+        meses = np.datetime64(inicio, "M") + k
+        ultimo = (meses + 1).astype("datetime64[D]") - 1
+        nominal = np.minimum(meses.astype("datetime64[D]") + (inicio.day - 1), ultimo)
+    else:
+        paso = 7 if frecuencia == "semanal" else 15
+        nominal = start + k * paso
+
+    # si cae domingo/festivo se corre al siguiente día hábil
+    return np.busday_offset(nominal, 0, roll="forward", weekmask=weekmask, holidays=festivos)
+
+
+def generar_cronograma(
+    total: float,
+    n_cuotas: int,
+    fecha_inicio: date | None = None,
+    frecuencia: str = "mensual",
+    saltar_domingos: bool = True,
+    festivos: list[str] | None = None,
+) -> list[dict]:
+    """
+    Cronograma de cuotas iguales (vectorizado con numpy).
+    La diferencia de redondeo se carga a la última cuota para que la suma
+    sea exactamente `total`.
+    """
+    import numpy as np
+
+    n = int(n_cuotas or 0)
+    if n <= 0:
+        return []
+
+    frecuencia = (frecuencia or "").strip().lower()
+    if frecuencia not in FRECUENCIAS:
+        frecuencia = "mensual"
+
+    inicio = fecha_inicio or date.today()
+    weekmask = _SIN_DOMINGOS if saltar_domingos else _TODOS
+    hol = np.array(FESTIVOS if festivos is None else festivos, dtype="datetime64[D]")
+
+    fechas = _fechas(inicio, n, frecuencia, weekmask, hol)
+
+    # en centavos para no arrastrar error de float
+    total_cent = int(round(float(total) * 100))
+    montos = np.full(n, total_cent // n, dtype=np.int64)
+    montos[-1] += total_cent - int(montos.sum())
+
+    return [
+        {"numero": i + 1, "fecha": f, "monto": m / 100}
+        for i, (f, m) in enumerate(zip(fechas.astype(object), montos.tolist()))
+    ]
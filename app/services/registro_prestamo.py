@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Prestamo, Cuota
-from datetime import datetime, timedelta
+from app.services.amortizacion import generar_cronograma
+from datetime import datetime
 
 router = APIRouter()
 
@@ -13,35 +15,29 @@ def registrar_prestamo(
     interes: float, 
     total: float, 
     fecha_inicio: datetime, 
+    cuotas: int = 12,
+    frecuencia: str = "mensual",
     db: Session = Depends(get_db)
 ):
-    # Crear el préstamo
+    # Crear el préstamo (sin commit: todo va en una sola transacción)
     prestamo = Prestamo(
         cliente_id=cliente_id, 
         monto=monto, 
+        valor=int(round(monto)),
+        fecha=fecha_inicio.date(),
         interes=interes, 
-        total=total, 
-        fecha_inicio=fecha_inicio
+        cuotas=cuotas,
+        frecuencia=frecuencia,
     )
     
     db.add(prestamo)
-    db.commit()
-    
-    # Calcular las cuotas (suponiendo cuotas mensuales)
-    cuotas = []
-    fecha_cuota = fecha_inicio
-    for i in range(12):  # Suponiendo 12 cuotas
-        fecha_cuota = fecha_cuota + timedelta(days=30)
-        cuota = Cuota(
-            prestamo_id=prestamo.id, 
-            numero=i+1, 
-            valor=total / 12, 
-            fecha_pago=fecha_cuota, 
-            estado="pendiente"
-        )
-        cuotas.append(cuota)
+    db.flush()
     
-    db.add_all(cuotas)
+    # Calcular las cuotas según la frecuencia del préstamo
+    cronograma = generar_cronograma(total, cuotas, fecha_inicio.date(), frecuencia)
+    if cronograma:
+        db.execute(insert(Cuota), [{"prestamo_id": prestamo.id, **c} for c in cronograma])
+
     db.commit()
     
     return {"mensaje": "Préstamo registrado con cuotas", "prestamo_id": prestamo.id}
@@ -0,0 +1,171 @@
+# app/sync.py
+import json
+import os
+
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from app import db
+from app.auth import require_user
+from app.cobros import registrar_pagos_rapidos
+from app.pagos import ingresar_movimientos
+
+router = APIRouter()
+
+# Sincronización del modo offline (static/outbox.js): el teléfono guarda los
+# POST en IndexedDB con una llave de idempotencia y los manda por lotes.
+# Reenviar el mismo lote es seguro: cada llave se aplica una sola vez.
+SYNC_MAX_ITEMS = int(os.getenv("SYNC_MAX_ITEMS", "500"))
+
+OPERACIONES = ("pago_rapido", "pago")
+
+# Resultado de una llave reclamada cuyo pago aún no se confirmó en pagos.xlsx
+PENDIENTE = {"estado": "pendiente", "detalle": "en proceso; se reintenta después"}
+
+
+def _reclamar(tx, clave: str, usuario: str, op: str) -> bool:
+    """Registra la llave (pendiente); False si ya estaba (otro lote o un reintento)."""
+    n = tx.execute(
+        "INSERT INTO idempotencia (clave, usuario, operacion, resultado) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (clave) DO NOTHING",
+        [clave, usuario, op, json.dumps(PENDIENTE)],
+    )
+    return n > 0
+
+
+def _liberar(claves: list[str]):
+    """Suelta llaves que siguen pendientes (la escritura del Excel falló)."""
+    with db.transaction() as tx:
+        for clave in claves:
+            tx.execute("DELETE FROM idempotencia WHERE clave = ? AND resultado = ?", [clave, json.dumps(PENDIENTE)])
+
+
+def _guardar_resultado(tx, clave: str, resultado: dict):
+    tx.execute("UPDATE idempotencia SET resultado = ? WHERE clave = ?", [json.dumps(resultado), clave])
+
+
+def _previos(claves: list[str]) -> dict[str, dict]:
+    out = {}
+    for i in range(0, len(claves), 500):
+        chunk = claves[i:i + 500]
+        rows = db.fetch_all(
+            f"SELECT clave, resultado FROM idempotencia WHERE clave IN ({', '.join(['?'] * len(chunk))})",
+            chunk,
+        )
+        for r in rows:
+            try:
+                out[r["clave"]] = json.loads(r["resultado"] or "{}")
+            except ValueError:
+                out[r["clave"]] = {}
+    return out
+
+
+def _aplicar_pagos_rapidos(items: list[dict], usuario: str) -> dict[str, dict]:
+    """
+    Tres pasos para no tener el Excel dentro de una transacción de la BD:
+    1. las llaves se reclaman como "pendiente" en una transacción corta;
+    2. un solo read/write de pagos.xlsx para todo el lote, sin transacción abierta;
+    3. se guardan los resultados.
+    Si el Excel falla se liberan las llaves y el teléfono puede reintentar. Si
+    falla el paso 3, las llaves quedan pendientes: un reintento no aplica dos veces.
+    """
+    out = {}
+    nuevos = []
+    with db.transaction() as tx:
+        for it in items:
+            if _reclamar(tx, it["id"], usuario, "pago_rapido"):
+                nuevos.append(it)
+            else:
+                out[it["id"]] = {"estado": "duplicado"}
+
+    if not nuevos:
+        return out
+
+    fechas = [(it.get("fecha") or "").replace("T", " ").split(" ") for it in nuevos]
+    pagos = [
+        {**(it.get("datos") or {}), "fecha": f[0] or None, "hora": (f[1][:8] if len(f) > 1 else None)}
+        for it, f in zip(nuevos, fechas)
+    ]
+    try:
+        resultados = registrar_pagos_rapidos(pagos, usuario)
+    except Exception:
+        _liberar([it["id"] for it in nuevos])
+        raise
+
+    with db.transaction() as tx:
+        for it, res in zip(nuevos, resultados):
+            _guardar_resultado(tx, it["id"], res)
+            out[it["id"]] = res
+    return out
+
+
+@router.post("/sync/lote")
+async def sync_lote(request: Request):
+    """
+    Body: {"items": [{"id": "<uuid>", "op": "pago_rapido"|"pago", "fecha": "<ISO>", "datos": {...}}]}
+    Respuesta: {"resultados": [{"id", "estado": "ok"|"duplicado"|"error", ...}]} en el mismo orden.
+    Una llave ya aplicada devuelve el resultado original con "repetido": true.
+    """
+    user = require_user(request)
+    if isinstance(user, RedirectResponse):
+        return JSONResponse({"error": "sesión vencida"}, status_code=401)
+
+    try:
+        body = await request.json()
+        items = list(body.get("items") or [])
+    except Exception:
+        return JSONResponse({"error": "JSON inválido"}, status_code=400)
+    if len(items) > SYNC_MAX_ITEMS:
+        return JSONResponse({"error": f"máximo {SYNC_MAX_ITEMS} items por lote"}, status_code=413)
+
+    resultados = await run_in_threadpool(procesar_lote, items, str(user.get("username") or ""))
+    return JSONResponse({"resultados": resultados})
+
+
+def procesar_lote(items: list[dict], usuario: str) -> list[dict]:
+    """Aplica un lote de la outbox; un resultado por item, en el mismo orden."""
+    items = [it if isinstance(it, dict) else {} for it in items]
+    resultados: dict[str, dict] = {}
+    vistos = set()
+    por_op: dict[str, list] = {op: [] for op in OPERACIONES}
+
+    for it in items:
+        clave = str(it.get("id") or "").strip()
+        if not clave or len(clave) > 100:
+            continue
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        if it.get("op") not in OPERACIONES:
+            resultados[clave] = {"estado": "error", "detalle": "operación desconocida"}
+            continue
+        por_op[it["op"]].append({**it, "id": clave})
+
+    # Movimientos del libro: mismo camino que /pagos/lote (executemany + llaves)
+    if por_op["pago"]:
+        movs = [{**(it.get("datos") or {}), "clave": it["id"], "fecha": it.get("fecha")} for it in por_op["pago"]]
+        for it, res in zip(por_op["pago"], ingresar_movimientos(movs, usuario)):
+            res.pop("clave", None)
+            resultados[it["id"]] = res
+
+    # Reintentos de lotes ya aplicados: se responden sin tocar nada
+    previos = _previos([it["id"] for it in por_op["pago_rapido"]])
+    pendientes = []
+    for it in por_op["pago_rapido"]:
+        if it["id"] in previos:
+            # mismo resultado que la primera vez (ok, error o aún pendiente), marcado como repetido
+            resultados[it["id"]] = {"estado": "duplicado", **previos[it["id"]], "repetido": True}
+        else:
+            pendientes.append(it)
+    por_op["pago_rapido"] = pendientes
+
+    if por_op["pago_rapido"]:
+        resultados.update(_aplicar_pagos_rapidos(por_op["pago_rapido"], usuario))
+
+    out = []
+    for it in items:
+        clave = str(it.get("id") or "").strip()
+        res = resultados.get(clave) or {"estado": "error", "detalle": "sin id"}
+        out.append({"id": clave, **res})
+    return out
@@ -0,0 +1,54 @@
+# app/templating.py
+import logging
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from app.utils import money_miles
+
+log = logging.getLogger("bless.templates")
+
+# Un solo Environment de Jinja2 para toda la app (antes cada módulo creaba el
+# suyo y compilaba las mismas plantillas por separado).
+# - TEMPLATES_DIR: carpeta de plantillas
+# - TEMPLATE_CACHE_DIR: bytecode compilado, sobrevive reinicios de workers ("" = sin cache)
+# - TEMPLATES_AUTO_RELOAD=1 en desarrollo para ver cambios sin reiniciar
+TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", "templates")
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "/tmp/bless_jinja_cache")
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1"
+
+
+def _bytecode_cache():
+    if not TEMPLATE_CACHE_DIR:
+        return None
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError as e:
+        log.warning("Sin cache de bytecode de plantillas (%s): %s", TEMPLATE_CACHE_DIR, e)
+        return None
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+    bytecode_cache=_bytecode_cache(),
+    cache_size=-1,  # nunca sacar plantillas compiladas de memoria
+)
+env.filters["miles"] = money_miles
+
+templates = Jinja2Templates(env=env)
+
+
+def warm_up() -> int:
+    """Compila todas las plantillas al arrancar (el primer request no paga el costo)."""
+    n = 0
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+            n += 1
+        except Exception as e:
+            log.warning("Plantilla %s no compila: %s", name, e)
+    return n
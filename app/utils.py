@@ -2,6 +2,7 @@
 import os
 import sqlite3
 from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Iterable
 
 try:
@@ -325,3 +326,45 @@ def ensure_admin(username: str, password: str):
         "INSERT INTO usuarios (username, password, role) VALUES (?, ?, ?)",
         [username, password, "admin"]
     )
+
+
+# -------------------------
+# Formato / fechas (Colombia)
+# -------------------------
+CO_TZ = timezone(timedelta(hours=-5))  # Colombia no tiene horario de verano
+
+
+def co_date_today() -> date:
+    return datetime.now(CO_TZ).date()
+
+
+_EPOCH_ORD = date(1970, 1, 1).toordinal()
+
+
+def dia_de(d: date) -> int:
+    """Fecha -> número de día (días desde 1970-01-01), igual que la columna pagos.dia."""
+    return d.toordinal() - _EPOCH_ORD
+
+
+def to_pesos(valor) -> int:
+    """
+    Convierte lo que escribe el usuario a pesos enteros:
+    "150" -> 150000 (se escribe en miles), "150000" / "150.000" / "$150,000" -> 150000
+    """
+    s = str(valor or "").strip().replace("$", "").replace(" ", "")
+    s = s.replace(".", "").replace(",", "")
+    if not s.lstrip("-").isdigit():
+        return 0
+    n = int(s)
+    if 0 < abs(n) < 1000:
+        n *= 1000
+    return n
+
+
+def money_miles(valor) -> str:
+    """Pesos -> miles con separador de puntos (1500000 -> "1.500")."""
+    try:
+        n = int(round(float(valor or 0) / 1000))
+    except (TypeError, ValueError):
+        return "0"
+    return f"{n:,}".replace(",", ".")
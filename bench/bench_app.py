@@ -0,0 +1,16 @@
+"""
+App para benchmarks / carga: main.app + las pantallas que main.py todavía
+no monta (/saldos, /dashboard).
+
+    uvicorn bench_app:app   (con bench/ en PYTHONPATH)
+"""
+import main
+from app.saldos import router as saldos_router
+from app.dashboard import router as dashboard_router
+
+app = main.app
+
+_rutas = {getattr(r, "path", None) for r in app.routes}
+for _router in (saldos_router, dashboard_router):
+    if not any(getattr(r, "path", None) in _rutas for r in _router.routes):
+        app.include_router(_router)
@@ -0,0 +1,129 @@
+"""
+Throughput de escrituras concurrentes de pagos en SQLite.
+
+Compara el perfil por defecto de SQLite (rollback journal, synchronous=FULL)
+contra el perfil de app.db (WAL, synchronous=NORMAL, mmap, cache...) y contra
+el mismo perfil con el escritor único de app.db (SQLITE_GROUP_COMMIT=1: una
+cola, un hilo, un commit por lote). Cada perfil corre en un subproceso porque
+app.db lee la configuración al importar.
+
+Uso:
+    python bench/bench_escrituras.py                       # 1 vs 50 writers
+    python bench/bench_escrituras.py --writers 1 8 32 --inserts 200
+    python bench/bench_escrituras.py --perfiles bless_profile bless_group_commit
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PERFILES = {
+    "sqlite_default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "SQLITE_TEMP_STORE": "DEFAULT",
+    },
+    "bless_profile": {},  # valores por defecto de app.db
+    "bless_group_commit": {"SQLITE_GROUP_COMMIT": "1"},
+    # con fsync en cada commit es donde más se nota juntar commits
+    "bless_full_sync": {"SQLITE_SYNCHRONOUS": "FULL"},
+    "bless_full_sync_group_commit": {"SQLITE_SYNCHRONOUS": "FULL", "SQLITE_GROUP_COMMIT": "1"},
+}
+
+
+def _worker(writers: int, inserts: int) -> dict:
+    """Corre dentro del subproceso: N hilos insertando pagos a la vez."""
+    sys.path.insert(0, ROOT)
+    from app import db
+
+    db.init_db()
+    db.execute("INSERT INTO clientes (nombre, documento) VALUES (?, ?)", ["Bench", "0"])
+    cid = db.fetch_one("SELECT MAX(id) AS id FROM clientes")["id"]
+
+    errores = []
+    barrera = threading.Barrier(writers)
+
+    def escribir(n):
+        barrera.wait()
+        for i in range(inserts):
+            try:
+                db.execute(
+                    "INSERT INTO pagos (cliente_id, fecha, valor, observaciones) VALUES (?, ?, ?, ?)",
+                    [cid, "2026-01-01", 10000 + i, f"w{n}"],
+                )
+            except Exception as e:
+                errores.append(str(e))
+
+    hilos = [threading.Thread(target=escribir, args=(n,)) for n in range(writers)]
+    t0 = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    seg = time.perf_counter() - t0
+
+    total = writers * inserts - len(errores)
+    return {
+        "writers": writers,
+        "inserts": total,
+        "errores": len(errores),
+        "segundos": round(seg, 3),
+        "inserts_por_seg": round(total / seg, 1) if seg else 0.0,
+        "pragmas": db.sqlite_profile(),
+    }
+
+
+def correr(perfil: str, writers: int, inserts: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.pop("DATABASE_URL", None)
+        env.pop("POSTGRES_URL", None)
+        env["DB_PATH"] = os.path.join(tmp, "bench.db")
+        env["DB_POOL_SIZE"] = str(max(5, writers))
+        env.update(PERFILES[perfil])
+        out = subprocess.run(
+            [sys.executable, __file__, "--_worker", str(writers), str(inserts)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["perfil"] = perfil
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--perfiles", nargs="+", choices=list(PERFILES), default=list(PERFILES))
+    parser.add_argument("--inserts", type=int, default=200, help="inserts por writer")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda resultados en JSON")
+    parser.add_argument("--_worker", nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._worker:
+        print(json.dumps(_worker(*args._worker)))
+        return
+
+    resultados = []
+    print(f"{'perfil':<28} {'writers':>7} {'inserts':>8} {'errores':>7} {'seg':>8} {'ins/s':>10}")
+    for w in args.writers:
+        for perfil in args.perfiles:
+            r = correr(perfil, w, args.inserts)
+            resultados.append(r)
+            print(f"{perfil:<28} {w:>7} {r['inserts']:>8} {r['errores']:>7} "
+                  f"{r['segundos']:>8.3f} {r['inserts_por_seg']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
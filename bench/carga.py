@@ -0,0 +1,233 @@
+"""
+Prueba de carga HTTP con flujos reales de cobradores.
+
+Cada cobrador virtual hace:
+    login -> GET /cobros -> POST /cobros/pago_rapido x N -> GET /saldos
+y se repite durante --duracion segundos.
+
+Por defecto levanta un uvicorn local sobre un SQLite temporal con un
+portafolio sintético (bench/generador.py). Con --url se apunta a un server
+ya levantado (p.ej. uno con DATABASE_URL a un Postgres local).
+
+Uso:
+    python bench/carga.py --cobradores 20 --pagos 10 --duracion 60
+    python bench/carga.py --url http://127.0.0.1:8000 --usuario admin --clave admin123
+
+Reporta p50/p95/p99, tasa de error y throughput por endpoint (y --json).
+Requiere httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+CLAVE_COBRADOR = "cobro123"
+
+
+class Stats:
+    def __init__(self):
+        self.lat: dict[str, list[float]] = {}
+        self.err: dict[str, int] = {}
+
+    def add(self, nombre: str, seg: float, ok: bool):
+        self.lat.setdefault(nombre, []).append(seg)
+        if not ok:
+            self.err[nombre] = self.err.get(nombre, 0) + 1
+
+    @staticmethod
+    def _pct(xs: list[float], p: float) -> float:
+        if not xs:
+            return 0.0
+        xs = sorted(xs)
+        k = min(len(xs) - 1, max(0, int(round(p / 100 * len(xs) + 0.5)) - 1))
+        return xs[k]
+
+    def resumen(self, segundos: float) -> dict:
+        out = {}
+        for nombre, xs in self.lat.items():
+            n = len(xs)
+            out[nombre] = {
+                "requests": n,
+                "errores": self.err.get(nombre, 0),
+                "error_rate": round(self.err.get(nombre, 0) / n, 4) if n else 0.0,
+                "rps": round(n / segundos, 2) if segundos else 0.0,
+                "p50_ms": round(self._pct(xs, 50) * 1000, 1),
+                "p95_ms": round(self._pct(xs, 95) * 1000, 1),
+                "p99_ms": round(self._pct(xs, 99) * 1000, 1),
+                "max_ms": round(max(xs) * 1000, 1),
+            }
+        return out
+
+
+async def _req(client, stats: Stats, nombre: str, method: str, url: str, esperado: tuple, **kw):
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kw)
+        ok = r.status_code in esperado
+    except Exception:
+        r, ok = None, False
+    stats.add(nombre, time.perf_counter() - t0, ok)
+    return r
+
+
+async def cobrador(base: str, usuario: str, clave: str, cedulas: list[str], n_pagos: int,
+                   fin: float, stats: Stats, seed: int):
+    rnd = random.Random(seed)
+    async with httpx.AsyncClient(base_url=base, follow_redirects=False, timeout=60) as c:
+        while time.perf_counter() < fin:
+            r = await _req(c, stats, "POST /login", "POST", "/login", (302, 303),
+                           data={"username": usuario, "password": clave})
+            if r is None or "token" not in c.cookies:
+                await asyncio.sleep(0.5)
+                continue
+
+            await _req(c, stats, "GET /cobros", "GET", "/cobros", (200,))
+            for _ in range(n_pagos):
+                if time.perf_counter() >= fin:
+                    break
+                await _req(c, stats, "POST /cobros/pago_rapido", "POST", "/cobros/pago_rapido", (303,),
+                           data={"cedula": rnd.choice(cedulas), "valor": rnd.choice([5000, 10000, 20000])})
+            await _req(c, stats, "GET /saldos", "GET", "/saldos", (200,))
+            c.cookies.clear()
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _preparar_local(tmp: str, clientes: int, cobradores: int) -> tuple[dict, list[str]]:
+    """Portafolio sintético + usuarios cobradores en un SQLite temporal."""
+    for d in ("templates", "static"):
+        os.symlink(os.path.join(ROOT, d), os.path.join(tmp, d))
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env.pop("POSTGRES_URL", None)
+    env.update({"DB_PATH": os.path.join(tmp, "carga.db"), "PYTHONPATH": os.pathsep.join([ROOT, os.path.join(ROOT, "bench")])})
+
+    script = (
+        "import generador\n"
+        "from app import db\n"
+        f"p = generador.generar_portafolio({clientes}, cobradores={cobradores})\n"
+        "generador.cargar_bd(p)\n"
+        "generador.escribir_xlsx(p, 'data')\n"
+        f"for u in p['cobradores']:\n"
+        f"    db.execute('INSERT INTO usuarios (username, password, role) VALUES (?, ?, ?)', [u, '{CLAVE_COBRADOR}', 'user'])\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=tmp, env=env, check=True)
+    cedulas = [str(10_000_000 + i) for i in range(1, clientes + 1)]
+    return env, cedulas
+
+
+async def _esperar_server(base: str, proc, timeout: float = 30):
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base) as c:
+        while time.perf_counter() - t0 < timeout:
+            if proc is not None and proc.poll() is not None:
+                raise SystemExit("uvicorn terminó antes de arrancar")
+            try:
+                await c.get("/login")
+                return
+            except Exception:
+                await asyncio.sleep(0.2)
+    raise SystemExit("uvicorn no respondió a tiempo")
+
+
+async def correr(args) -> dict:
+    stats = Stats()
+    proc = None
+    tmp = None
+    try:
+        if args.url:
+            base = args.url.rstrip("/")
+            usuarios = [(args.usuario, args.clave)] * args.cobradores
+            cedulas = args.cedulas or [str(10_000_000 + i) for i in range(1, args.clientes + 1)]
+        else:
+            tmp = tempfile.TemporaryDirectory(prefix="bless_carga_")
+            env, cedulas = _preparar_local(tmp.name, args.clientes, args.cobradores)
+            port = _puerto_libre()
+            base = f"http://127.0.0.1:{port}"
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "bench_app:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=tmp.name, env=env,
+            )
+            usuarios = [(f"cobrador{i % args.cobradores + 1}", CLAVE_COBRADOR) for i in range(args.cobradores)]
+
+        await _esperar_server(base, proc)
+
+        t0 = time.perf_counter()
+        fin = t0 + args.duracion
+        await asyncio.gather(*[
+            cobrador(base, u, p, cedulas, args.pagos, fin, stats, seed=i)
+            for i, (u, p) in enumerate(usuarios)
+        ])
+        seg = time.perf_counter() - t0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        if tmp is not None:
+            tmp.cleanup()
+
+    total = sum(len(x) for x in stats.lat.values())
+    errores = sum(stats.err.values())
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("clave", "json", "cedulas")},
+        "segundos": round(seg, 2),
+        "total_requests": total,
+        "error_rate": round(errores / total, 4) if total else 0.0,
+        "rps": round(total / seg, 2) if seg else 0.0,
+        "endpoints": stats.resumen(seg),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de Bless")
+    parser.add_argument("--cobradores", type=int, default=10, help="usuarios concurrentes")
+    parser.add_argument("--pagos", type=int, default=10, help="pago_rapido por vuelta")
+    parser.add_argument("--duracion", type=float, default=30, help="segundos")
+    parser.add_argument("--clientes", type=int, default=1000, help="tamaño del portafolio local")
+    parser.add_argument("--workers", type=int, default=1, help="workers de uvicorn (modo local)")
+    parser.add_argument("--url", help="server ya levantado (omite el uvicorn local)")
+    parser.add_argument("--usuario", default="admin", help="usuario para --url")
+    parser.add_argument("--clave", default="admin123", help="clave para --url")
+    parser.add_argument("--cedulas", nargs="*", help="cédulas a cobrar con --url")
+    parser.add_argument("--json", metavar="ARCHIVO", help="guarda el reporte en JSON")
+    args = parser.parse_args()
+
+    if httpx is None:
+        raise SystemExit("Falta httpx: pip install httpx")
+
+    rep = asyncio.run(correr(args))
+
+    print(f"{rep['total_requests']} requests en {rep['segundos']}s  "
+          f"({rep['rps']} req/s, error {rep['error_rate'] * 100:.2f}%)")
+    print(f"{'endpoint':<28} {'n':>6} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for nombre, e in rep["endpoints"].items():
+        print(f"{nombre:<28} {e['requests']:>6} {e['error_rate'] * 100:>6.2f} {e['rps']:>7.2f} "
+              f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
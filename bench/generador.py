@@ -0,0 +1,213 @@
+"""
+Generador de portafolios sintéticos (reproducible con --seed).
+
+Crea N clientes, M préstamos y abonos diarios durante K meses, y los carga en:
+  - la BD de app.db (SQLite en DB_PATH o Postgres en DATABASE_URL)
+  - data/clientes.xlsx y data/pagos.xlsx (pantallas que leen Excel: /cobros, /dashboard)
+
+Uso:
+    DB_PATH=/tmp/bench.db python bench/generador.py --clientes 10000 --meses 3 --xlsx data
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FRECUENCIAS = ["diario", "diario", "diario", "semanal", "quincenal", "mensual"]
+CATEGORIAS = ["general", "transporte", "alimentacion", "servicios", "oficina", "imprevistos"]
+NOMBRES = ["Ana", "Luis", "Carlos", "María", "Jorge", "Luz", "Pedro", "Sandra", "Diego", "Paola"]
+APELLIDOS = ["Gómez", "Rodríguez", "Martínez", "López", "García", "Pérez", "Díaz", "Torres", "Ruiz"]
+PASO = {"diario": 1, "semanal": 7, "quincenal": 15, "mensual": 30}
+EXCEL_MAX_FILAS = 1_048_575
+
+BATCH = 10_000
+
+
+def generar_portafolio(n_clientes: int, n_prestamos: int | None = None, meses: int = 3,
+                       cobradores: int = 10, seed: int = 42, hoy: date | None = None) -> dict:
+    """
+    Devuelve listas de tuplas listas para executemany. Los abonos se generan
+    con un generador (pueden ser millones) — ver `abonos`.
+    """
+    rnd = random.Random(seed)
+    hoy = hoy or date.today()
+    inicio = hoy - timedelta(days=30 * meses)
+    n_prestamos = n_clientes if n_prestamos is None else n_prestamos
+    users = [f"cobrador{i + 1}" for i in range(cobradores)]
+
+    clientes = []
+    for i in range(1, n_clientes + 1):
+        clientes.append((
+            i,
+            f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {i}",
+            str(10_000_000 + i),
+            f"3{rnd.randint(100000000, 199999999)}",
+            f"Calle {rnd.randint(1, 120)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}",
+            rnd.choice(FRECUENCIAS),
+        ))
+
+    # préstamos: (cliente_id, fecha, monto_entregado, seguro, interes, frecuencia, cobrador)
+    prestamos = []
+    for k in range(n_prestamos):
+        cid = (k % n_clientes) + 1 if k < n_clientes else rnd.randint(1, n_clientes)
+        freq = clientes[cid - 1][5]
+        entregado = rnd.choice([200, 300, 500, 800, 1000, 1500, 2000]) * 1000
+        dia = inicio + timedelta(days=rnd.randint(0, 15))
+        prestamos.append((cid, dia, entregado, int(entregado * 0.05), 20, freq, rnd.choice(users)))
+
+    return {
+        "seed": seed, "hoy": hoy, "inicio": inicio, "cobradores": users,
+        "clientes": clientes, "prestamos": prestamos, "rnd_state": rnd.getstate(),
+    }
+
+
+def abonos(portafolio: dict):
+    """
+    Abonos diarios por préstamo hasta hoy (sin domingos), con días que el
+    cliente no paga. Yields (cliente_id, fecha, monto, cobrador).
+    """
+    rnd = random.Random()
+    rnd.setstate(portafolio["rnd_state"])
+    hoy = portafolio["hoy"]
+    for cid, dia0, entregado, seguro, interes, freq, cobrador in portafolio["prestamos"]:
+        total = entregado * (1 + interes / 100)
+        n_cuotas = {"diario": 30, "semanal": 12, "quincenal": 6, "mensual": 3}[freq]
+        cuota = int(round(total / n_cuotas / 100) * 100)
+        pagado = 0
+        d = dia0 + timedelta(days=PASO[freq])
+        while d <= hoy and pagado < total:
+            if d.weekday() != 6 and rnd.random() < 0.85:
+                v = min(cuota, int(total - pagado))
+                pagado += v
+                yield cid, d, v, cobrador
+            d += timedelta(days=PASO[freq])
+
+
+def _batches(it, size=BATCH):
+    buf = []
+    for x in it:
+        buf.append(x)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def cargar_bd(portafolio: dict) -> dict:
+    """Carga el portafolio en la BD de app.db (tablas vacías o nuevas)."""
+    from app import db
+
+    db.init_db()
+    ph = "%s" if db.db_kind() == "postgres" else "?"
+
+    def ins(table, cols, rows):
+        q = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join([ph] * len(cols))})"
+        n = 0
+        with db.get_conn() as conn:
+            cur = conn.cursor()
+            for chunk in _batches(rows):
+                cur.executemany(q, chunk)
+                n += len(chunk)
+            conn.commit()
+        return n
+
+    cuentas = {}
+    cuentas["clientes"] = ins(
+        "clientes", ["id", "nombre", "documento", "telefono", "direccion", "tipo_cobro"],
+        portafolio["clientes"],
+    )
+
+    def ledger():
+        for cid, dia, entregado, seguro, interes, freq, _ in portafolio["prestamos"]:
+            yield (cid, f"{dia.isoformat()} 08:00:00", "prestamo", 0, seguro, entregado, interes, freq, 0)
+        for cid, dia, v, _ in abonos(portafolio):
+            yield (cid, f"{dia.isoformat()} 10:30:00", "abono", v, 0, 0, 0, None, v)
+
+    cuentas["pagos"] = ins(
+        "pagos",
+        ["cliente_id", "fecha", "tipo", "monto", "seguro", "monto_entregado", "interes_mensual", "frecuencia", "valor"],
+        ledger(),
+    )
+
+    # Contabilidad: préstamos, seguros y gastos por día
+    cuentas["prestamos"] = ins(
+        "prestamos", ["fecha", "cliente_id", "cobrador_username", "valor"],
+        ((dia.isoformat(), cid, cob, entregado) for cid, dia, entregado, _, _, _, cob in portafolio["prestamos"]),
+    )
+    rnd = random.Random(portafolio["seed"] + 1)
+    dias = [portafolio["inicio"] + timedelta(days=i)
+            for i in range((portafolio["hoy"] - portafolio["inicio"]).days + 1)]
+    cuentas["seguros_recaudos"] = ins(
+        "seguros_recaudos", ["fecha", "cobrador_username", "valor"],
+        ((d.isoformat(), u, rnd.randint(1, 40) * 1000) for d in dias for u in portafolio["cobradores"]),
+    )
+    cuentas["gastos"] = ins(
+        "gastos", ["fecha", "concepto", "categoria", "valor", "cobrador_username"],
+        ((d.isoformat(), "gasto ruta", rnd.choice(CATEGORIAS), rnd.randint(5, 80) * 1000, u)
+         for d in dias for u in portafolio["cobradores"]),
+    )
+    if db.db_kind() == "postgres":
+        # ids explícitos: mover las secuencias
+        for t in cuentas:
+            db.execute(f"SELECT setval(pg_get_serial_sequence('{t}', 'id'), COALESCE((SELECT MAX(id) FROM {t}), 1))")
+    return cuentas
+
+
+def escribir_xlsx(portafolio: dict, data_dir: str) -> dict:
+    """clientes.xlsx / pagos.xlsx con las columnas que leen /cobros y /dashboard."""
+    import pandas as pd
+
+    os.makedirs(data_dir, exist_ok=True)
+    por_cliente = {}
+    for cid, _, entregado, _, interes, _, _ in portafolio["prestamos"]:
+        por_cliente[cid] = por_cliente.get(cid, 0) + int(entregado * (1 + interes / 100))
+
+    cl = portafolio["clientes"]
+    pd.DataFrame({
+        "nombre": [c[1] for c in cl],
+        "cedula": [c[2] for c in cl],
+        "telefono": [c[3] for c in cl],
+        "monto": [por_cliente.get(c[0], 0) for c in cl],
+        "tipo_cobro": [c[5] for c in cl],
+    }).to_excel(os.path.join(data_dir, "clientes.xlsx"), index=False)
+
+    filas = []
+    for cid, dia, v, cob in abonos(portafolio):
+        c = cl[cid - 1]
+        filas.append((c[2], c[1], dia.isoformat(), "10:30:00", v, c[5], cob))
+        if len(filas) >= EXCEL_MAX_FILAS:
+            break
+    pd.DataFrame(filas, columns=["cedula", "cliente", "fecha", "hora", "valor", "tipo_cobro", "registrado_por"]) \
+        .to_excel(os.path.join(data_dir, "pagos.xlsx"), index=False)
+
+    return {"clientes.xlsx": len(cl), "pagos.xlsx": len(filas)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un portafolio sintético")
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--prestamos", type=int, default=None, help="por defecto 1 por cliente")
+    parser.add_argument("--meses", type=int, default=3)
+    parser.add_argument("--cobradores", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--xlsx", metavar="DIR", help="además escribe clientes.xlsx/pagos.xlsx en DIR")
+    parser.add_argument("--sin-bd", action="store_true", help="no cargar la BD")
+    args = parser.parse_args()
+
+    t0 = datetime.now()
+    p = generar_portafolio(args.clientes, args.prestamos, args.meses, args.cobradores, args.seed)
+    if not args.sin_bd:
+        print("BD:", cargar_bd(p))
+    if args.xlsx:
+        print("XLSX:", escribir_xlsx(p, args.xlsx))
+    print(f"✅ Listo en {(datetime.now() - t0).total_seconds():.1f}s")
+
+
+if __name__ == "__main__":
+    main()
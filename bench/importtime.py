@@ -0,0 +1,95 @@
+"""
+Presupuesto de tiempo de importación en frío de la app.
+
+Corre `python -X importtime -c "import main"` en un subproceso limpio, toma el
+tiempo acumulado del módulo (con todo lo que importa) y falla (exit 1) si pasa del
+presupuesto o si al arrancar quedó cargada alguna librería pesada (pandas,
+numpy, openpyxl, duckdb): esas se importan dentro de las funciones que las usan.
+
+Uso:
+    python bench/importtime.py                      # main, presupuesto por defecto
+    python bench/importtime.py --module app.main --budget-ms 900
+    IMPORT_BUDGET_MS=1200 python bench/importtime.py --top 15
+
+Pensado para CI: el código de salida indica si se cumple el presupuesto.
+tests/test_importtime.py corre la misma medición con pytest.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+PESADAS = ("pandas", "numpy", "openpyxl", "duckdb", "matplotlib")
+
+_RE_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir(module: str) -> tuple[float, list[tuple[str, float]], list[str]]:
+    """(ms totales, [(import directo del módulo, ms acumulados)], librerías pesadas cargadas)."""
+    tmp = tempfile.mkdtemp(prefix="bless_import_")  # BD vacía, no se toca la real
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "DB_PATH": os.path.join(tmp, "import.db"),
+    }
+    codigo = (
+        f"import {module}, sys; "
+        f"print(','.join(m for m in {PESADAS!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"no se pudo importar {module}")
+
+    # sangría: 1 espacio = el módulo pedido, 3 = lo que importa directamente
+    total = 0.0
+    directos = []
+    for linea in proc.stderr.splitlines():
+        m = _RE_LINEA.match(linea)
+        if not m:
+            continue
+        ms = int(m.group(2)) / 1000
+        if len(m.group(3)) == 1 and m.group(4) == module:
+            total = ms
+        elif len(m.group(3)) == 3:
+            directos.append((m.group(4), ms))
+
+    pesadas = [m for m in proc.stdout.strip().split(",") if m]
+    return total, directos, pesadas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Presupuesto de importación en frío")
+    ap.add_argument("--module", default="main")
+    ap.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=10, help="módulos más lentos a mostrar")
+    args = ap.parse_args()
+
+    total, modulos, pesadas = medir(args.module)
+
+    print(f"import {args.module}: {total:.0f} ms (presupuesto {args.budget_ms:.0f} ms)")
+    for nombre, ms in sorted(modulos, key=lambda x: -x[1])[:args.top]:
+        print(f"  {ms:8.1f} ms  {nombre}")
+
+    fallas = []
+    if total > args.budget_ms:
+        fallas.append(f"import en frío {total:.0f} ms > {args.budget_ms:.0f} ms")
+    if pesadas:
+        fallas.append(f"librerías pesadas cargadas al arrancar: {', '.join(pesadas)}")
+
+    for f in fallas:
+        print(f"FALLA: {f}")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
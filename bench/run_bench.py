@@ -0,0 +1,224 @@
+"""
+Suite de benchmarks de Bless sobre portafolios sintéticos.
+
+Por cada tamaño (clientes) genera BD + Excel con bench/generador.py en un
+directorio temporal y mide, en un subproceso aislado:
+  /saldos, /alertas/mora, /cobros, /contabilidad (mes actual y pasado),
+  /dashboard, los exportadores a Excel y (opcional) la migración a Postgres.
+
+Uso:
+    python bench/run_bench.py --sizes 1000 10000 100000
+    python bench/run_bench.py --sizes 1000 --compare bench/results/base.json
+    BENCH_PG_URL=postgresql://... python bench/run_bench.py   # incluye la migración
+
+Los resultados quedan en bench/results/<fecha>.json para comparar regresiones.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+ADMIN_USER = "bench_admin"
+ADMIN_PASS = "bench_pass"
+
+
+def _mes_pasado() -> str:
+    hoy = date.today()
+    y, m = (hoy.year, hoy.month - 1) if hoy.month > 1 else (hoy.year - 1, 12)
+    return f"{y:04d}-{m:02d}"
+
+
+ENDPOINTS = [
+    ("saldos", "/saldos"),
+    ("alertas_mora", "/alertas/mora"),
+    ("cobros", "/cobros"),
+    ("contabilidad", "/contabilidad"),
+    ("contabilidad_mes_pasado", f"/contabilidad?mes={_mes_pasado()}"),
+    ("dashboard", "/dashboard"),
+    ("reportes_exportar", "/reportes/exportar-todo"),
+]
+
+
+def _timeit(fn, repeat: int) -> dict:
+    tiempos = []
+    extra = {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        tiempos.append(time.perf_counter() - t0)
+        if isinstance(out, dict):
+            extra = out
+    return {
+        "median_s": round(statistics.median(tiempos), 4),
+        "min_s": round(min(tiempos), 4),
+        "runs": repeat,
+        **extra,
+    }
+
+
+def _worker(clientes: int, meses: int, repeat: int, seed: int) -> dict:
+    """Corre dentro del subproceso (cwd = directorio temporal con data/ y templates/)."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "bench"))
+    import generador
+
+    res = {}
+
+    t0 = time.perf_counter()
+    p = generador.generar_portafolio(clientes, meses=meses, seed=seed)
+    filas = generador.cargar_bd(p)
+    res["generar_bd"] = {"segundos": round(time.perf_counter() - t0, 2), "filas": filas}
+
+    t0 = time.perf_counter()
+    filas = generador.escribir_xlsx(p, "data")
+    res["generar_xlsx"] = {"segundos": round(time.perf_counter() - t0, 2), "filas": filas}
+
+    from fastapi.testclient import TestClient
+    from bench_app import app
+
+    with TestClient(app) as client:
+        r = client.post("/login", data={"username": ADMIN_USER, "password": ADMIN_PASS},
+                        follow_redirects=False)
+        if r.status_code >= 400 or "token" not in client.cookies:
+            raise SystemExit(f"login falló: {r.status_code}")
+
+        for nombre, url in ENDPOINTS:
+            def _get(url=url):
+                resp = client.get(url, follow_redirects=False)
+                return {"status": resp.status_code, "bytes": len(resp.content)}
+            try:
+                res[nombre] = _timeit(_get, repeat)
+            except Exception as e:
+                res[nombre] = {"error": repr(e)}
+
+    from app.exporter import export_all_tables_to_excel_bytes
+
+    try:
+        res["exporter_todas_las_tablas"] = _timeit(
+            lambda: {"bytes": len(export_all_tables_to_excel_bytes())}, repeat
+        )
+    except Exception as e:
+        res["exporter_todas_las_tablas"] = {"error": repr(e)}
+
+    pg_url = os.getenv("BENCH_PG_URL", "")
+    if pg_url:
+        env = dict(os.environ, DATABASE_URL=pg_url)
+        def _migrar():
+            subprocess.run([sys.executable, os.path.join(ROOT, "migrate_sqlite_to_postgres.py")],
+                           env=env, check=True, capture_output=True)
+        res["migrate_sqlite_to_postgres"] = _timeit(_migrar, 1)
+    else:
+        res["migrate_sqlite_to_postgres"] = {"skipped": "sin BENCH_PG_URL"}
+
+    return res
+
+
+def correr(clientes: int, meses: int, repeat: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bless_bench_") as tmp:
+        for d in ("templates", "static"):
+            os.symlink(os.path.join(ROOT, d), os.path.join(tmp, d))
+        env = dict(os.environ)
+        env.pop("DATABASE_URL", None)
+        env.pop("POSTGRES_URL", None)
+        env.update({
+            "DB_PATH": os.path.join(tmp, "bench.db"),
+            "ADMIN_USER": ADMIN_USER,
+            "ADMIN_PASS": ADMIN_PASS,
+            "PYTHONPATH": ROOT,
+        })
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--_worker",
+             str(clientes), str(meses), str(repeat), str(seed)],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"error": out.stderr.strip().splitlines()[-1:] or ["?"]}
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def comparar(actual: dict, base: dict, umbral: float) -> list[str]:
+    """Lista de regresiones (median_s sube más que `umbral`)."""
+    regresiones = []
+    for size, medidas in actual["resultados"].items():
+        for nombre, m in medidas.items():
+            b = base.get("resultados", {}).get(size, {}).get(nombre, {})
+            if "median_s" not in m or "median_s" not in b or not b["median_s"]:
+                continue
+            ratio = m["median_s"] / b["median_s"]
+            marca = "  ⚠️ REGRESIÓN" if ratio > 1 + umbral else ""
+            print(f"{size:>8} {nombre:<28} {b['median_s']:>9.4f}s -> {m['median_s']:>9.4f}s  x{ratio:.2f}{marca}")
+            if marca:
+                regresiones.append(f"{size}/{nombre}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de Bless")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--meses", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="archivo JSON de salida")
+    parser.add_argument("--compare", metavar="BASE.json", help="compara contra otra corrida")
+    parser.add_argument("--umbral", type=float, default=0.2, help="tolerancia de regresión (0.2 = 20%%)")
+    parser.add_argument("--_worker", nargs=4, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._worker:
+        print(json.dumps(_worker(*args._worker)))
+        return
+
+    resultado = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "meses": args.meses,
+            "seed": args.seed,
+        },
+        "resultados": {},
+    }
+
+    for n in args.sizes:
+        print(f"== {n} clientes ...", flush=True)
+        r = correr(n, args.meses, args.repeat, args.seed)
+        resultado["resultados"][str(n)] = r
+        for nombre, m in r.items():
+            if isinstance(m, dict) and "median_s" in m:
+                print(f"   {nombre:<28} {m['median_s']:>9.4f}s  (status {m.get('status', '-')})")
+            else:
+                print(f"   {nombre:<28} {m}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print("Resultados:", out)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(resultado, base, args.umbral):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
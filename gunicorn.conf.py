@@ -0,0 +1,58 @@
+# gunicorn.conf.py
+# Servidor de producción: gunicorn (master) + workers de uvicorn.
+#   gunicorn main:app -c gunicorn.conf.py
+# Para desarrollo sigue run.py (uvicorn con reload).
+import multiprocessing
+import os
+
+# -------------------------
+# Workers
+# -------------------------
+# Un solo proceso se queda bloqueado con un bcrypt o una exportación grande;
+# con varios, el resto sigue atendiendo. WEB_CONCURRENCY manda si se define.
+WEB_MAX_WORKERS = int(os.getenv("WEB_MAX_WORKERS", "8"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or min(multiprocessing.cpu_count() * 2 + 1, WEB_MAX_WORKERS))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# La app se importa una vez en el master y los workers la heredan por fork
+# (copy-on-write): arrancan rápido y comparten la memoria de los módulos.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Reciclado: cada worker se reinicia tras max_requests (+ jitter, para que no
+# se reinicien todos a la vez) y así no acumula memoria.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Worker colgado más de timeout segundos -> se mata y se levanta otro.
+# graceful_timeout: tiempo para terminar los requests en curso al reciclar.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+# -------------------------
+# Hooks
+# -------------------------
+def on_starting(server):
+    """En el master, antes de crear workers: migraciones y autoprueba de WAL."""
+    from app import db
+
+    db.init_db()  # una vez aquí; en cada worker queda en el camino rápido
+    if workers > 1:
+        db.ensure_sqlite_wal()
+    # el master no usa la BD: que los hijos no hereden conexiones abiertas
+    db.dispose_engine()
+    server.log.info("BD lista (%s), %d workers", db.db_kind(), workers)
+
+
+def post_fork(server, worker):
+    # con preload el engine y las versiones por proceso vienen del master
+    from app import db
+
+    db.reset_after_fork()
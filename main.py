@@ -1,11 +1,12 @@
 # main.py
 import os
 from fastapi import FastAPI
+from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
-from app.db import init_db, ensure_admin
-from app.utils import money_miles
+from app.db import init_db, ensure_admin, start_invalidation_bus, stop_invalidation_bus
+from app import metrics, profiler
+from app.templating import templates, warm_up
 
 # Routers existentes (ajusta si alguno tiene otro nombre)
 from app.auth import router as auth_router
@@ -15,15 +16,48 @@ from app.pagos import router as pagos_router
 # Nuevo: contabilidad
 from app.contabilidad import router as contabilidad_router
 
+# Backup en caliente de la BD (solo admin)
+from app.backup import router as backup_router
+
+# Reportes (solo admin): exportación a Excel y analítica por meses (app.analytics)
+from app.reportes import router as reportes_router
+
+# Plan de cobro del día + sincronización offline (outbox del service worker)
+from app.cobros import router as cobros_router
+from app.sync import router as sync_router
+
+# Variantes JSON (sin redirect) de los formularios de escritura
+from app.api_v1 import router as api_v1_router
+
+# API ORM (mismo engine/BD que app.db)
+from app.routers.prestamos import router as prestamos_router
+from app.routers.cuotas import router as cuotas_router
+
 
 app = FastAPI()
 
+# Métricas: latencia por ruta, SQL, conexiones y render (ver /metrics)
+metrics.install()
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Perfilado opt-in por request (?_profile=1 admin, o PROFILE_SAMPLE_RATE)
+app.add_middleware(profiler.ProfilerMiddleware)
+
 # Static
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Templates + filtros
-templates = Jinja2Templates(directory="templates")
-templates.env.filters["miles"] = money_miles
+
+# Service worker en la raíz: desde /static/ solo podría controlar /static/*
+@app.get("/sw.js", include_in_schema=False)
+def service_worker():
+    return FileResponse(
+        "static/sw.js",
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache", "Service-Worker-Allowed": "/"},
+    )
+
+# Templates: un solo Environment compartido (filtros en app/templating.py)
+metrics.instrument_templates(templates)
 
 
 @app.on_event("startup")
@@ -35,9 +69,29 @@ def startup_event():
     admin_pass = os.getenv("ADMIN_PASS", "admin123")
     ensure_admin(admin_user, admin_pass)
 
+    # Precompila plantillas (bytecode cache en TEMPLATE_CACHE_DIR)
+    warm_up()
+
+    # Escrituras de otros workers invalidan la caché de este (ver app.db)
+    start_invalidation_bus()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_invalidation_bus()
+
 
 # Routers
 app.include_router(auth_router)
 app.include_router(clientes_router)
 app.include_router(pagos_router)
 app.include_router(contabilidad_router)
+app.include_router(backup_router)
+app.include_router(reportes_router)
+app.include_router(prestamos_router)
+app.include_router(cuotas_router)
+app.include_router(metrics.router)
+app.include_router(profiler.router)
+app.include_router(cobros_router)
+app.include_router(sync_router)
+app.include_router(api_v1_router)
@@ -1,6 +1,7 @@
 # scripts/migrate_sqlite_to_postgres.py
 import os
 import sqlite3
+from datetime import date
 
 # Requiere psycopg (v3) instalado en tu entorno local:
 # pip install "psycopg[binary]"
@@ -20,11 +21,27 @@ if "sslmode=" not in DATABASE_URL:
     DATABASE_URL = f"{DATABASE_URL}{sep}sslmode=require"
 
 
-def sqlite_rows(conn, table: str):
+BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "2000"))
+
+
+def sqlite_batches(conn, table: str):
+    """Lotes de filas (dicts) con fetchmany: la tabla nunca está entera en memoria."""
+    if not _sqlite_has_table(conn, table):
+        return
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute(f"SELECT * FROM {table} ORDER BY id ASC")
-    return [dict(r) for r in cur.fetchall()]
+    while True:
+        rows = cur.fetchmany(BATCH_SIZE)
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+
+
+def sqlite_count(conn, table: str) -> int:
+    if not _sqlite_has_table(conn, table):
+        return 0
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
 
 
 def ensure_tables(pg):
@@ -53,11 +70,11 @@ def ensure_tables(pg):
         CREATE TABLE IF NOT EXISTS pagos (
             id SERIAL PRIMARY KEY,
             cliente_id INTEGER NOT NULL REFERENCES clientes(id) ON DELETE CASCADE,
-            fecha TEXT NOT NULL,
+            fecha DATE NOT NULL,
             tipo TEXT NOT NULL,
-            monto DOUBLE PRECISION DEFAULT 0,
-            seguro DOUBLE PRECISION DEFAULT 0,
-            monto_entregado DOUBLE PRECISION DEFAULT 0,
+            monto BIGINT DEFAULT 0,
+            seguro BIGINT DEFAULT 0,
+            monto_entregado BIGINT DEFAULT 0,
             interes_mensual DOUBLE PRECISION DEFAULT 20,
             frecuencia TEXT DEFAULT 'mensual'
         )
@@ -66,6 +83,13 @@ def ensure_tables(pg):
         cur.execute("CREATE INDEX IF NOT EXISTS idx_pagos_fecha ON pagos(fecha)")
 
 
+def fecha_pg(valor):
+    """Fecha de SQLite ('YYYY-MM-DD' o con hora) -> date para la columna DATE."""
+    if not valor:
+        return None
+    return date.fromisoformat(str(valor)[:10])
+
+
 def set_sequence(pg, table: str):
     # Ajusta la secuencia al MAX(id) para que nuevos inserts sigan bien
     with pg.cursor() as cur:
@@ -79,14 +103,10 @@ def main():
     print("SQLite:", SQLITE_PATH)
     print("Postgres:", DATABASE_URL.split("@")[-1].split("?")[0])
 
-    # Leer SQLite
+    # Leer SQLite (por lotes, ver sqlite_batches)
     sconn = sqlite3.connect(SQLITE_PATH)
-    usuarios = sqlite_rows(sconn, "usuarios") if _sqlite_has_table(sconn, "usuarios") else []
-    clientes = sqlite_rows(sconn, "clientes") if _sqlite_has_table(sconn, "clientes") else []
-    pagos = sqlite_rows(sconn, "pagos") if _sqlite_has_table(sconn, "pagos") else []
-    sconn.close()
-
-    print(f"SQLite rows -> usuarios={len(usuarios)} clientes={len(clientes)} pagos={len(pagos)}")
+    tablas = ("usuarios", "clientes", "pagos")
+    print("SQLite rows -> " + " ".join(f"{t}={sqlite_count(sconn, t)}" for t in tablas))
 
     # Conectar Postgres
     pg = psycopg.connect(DATABASE_URL, row_factory=dict_row)
@@ -97,26 +117,24 @@ def main():
 
             # MIGRAR USUARIOS (por username único)
             with pg.cursor() as cur:
-                for u in usuarios:
-                    cur.execute("""
+                for lote in sqlite_batches(sconn, "usuarios"):
+                    cur.executemany("""
                         INSERT INTO usuarios (id, username, password, role)
                         VALUES (%s, %s, %s, %s)
                         ON CONFLICT (username) DO UPDATE
                         SET password = EXCLUDED.password,
                             role = EXCLUDED.role
-                    """, [
+                    """, [[
                         u.get("id"),
                         u.get("username"),
                         u.get("password"),
                         u.get("role") or "user"
-                    ])
+                    ] for u in lote])
 
             # MIGRAR CLIENTES (por id)
             with pg.cursor() as cur:
-                for c in clientes:
-                    # Compat: si en SQLite existía cedula y no documento
-                    documento = c.get("documento") or c.get("cedula")
-                    cur.execute("""
+                for lote in sqlite_batches(sconn, "clientes"):
+                    cur.executemany("""
                         INSERT INTO clientes (id, nombre, documento, telefono, direccion, observaciones, tipo_cobro)
                         VALUES (%s, %s, %s, %s, %s, %s, %s)
                         ON CONFLICT (id) DO UPDATE
@@ -126,22 +144,22 @@ def main():
                             direccion = EXCLUDED.direccion,
                             observaciones = EXCLUDED.observaciones,
                             tipo_cobro = EXCLUDED.tipo_cobro
-                    """, [
+                    """, [[
                         c.get("id"),
                         c.get("nombre"),
-                        documento,
+                        # Compat: si en SQLite existía cedula y no documento
+                        c.get("documento") or c.get("cedula"),
                         c.get("telefono"),
                         c.get("direccion"),
                         c.get("observaciones"),
                         (c.get("tipo_cobro") or "mensual")
-                    ])
+                    ] for c in lote])
 
             # MIGRAR PAGOS (por id)
             with pg.cursor() as cur:
-                for p in pagos:
-                    frecuencia = p.get("frecuencia") or "mensual"
-                    # en abono puede venir null -> ok
-                    cur.execute("""
+                for lote in sqlite_batches(sconn, "pagos"):
+                    # en abono frecuencia puede venir null -> ok
+                    cur.executemany("""
                         INSERT INTO pagos (id, cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia)
                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                         ON CONFLICT (id) DO UPDATE
@@ -153,17 +171,17 @@ def main():
                             monto_entregado = EXCLUDED.monto_entregado,
                             interes_mensual = EXCLUDED.interes_mensual,
                             frecuencia = EXCLUDED.frecuencia
-                    """, [
+                    """, [[
                         p.get("id"),
                         p.get("cliente_id"),
-                        p.get("fecha"),
+                        fecha_pg(p.get("fecha")),
                         p.get("tipo"),
-                        p.get("monto") or 0,
-                        p.get("seguro") or 0,
-                        p.get("monto_entregado") or 0,
+                        round(p.get("monto") or 0),
+                        round(p.get("seguro") or 0),
+                        round(p.get("monto_entregado") or 0),
                         p.get("interes_mensual") or 0,
-                        frecuencia
-                    ])
+                        p.get("frecuencia") or "mensual"
+                    ] for p in lote])
 
             # Ajustar secuencias
             set_sequence(pg, "usuarios")
@@ -173,6 +191,7 @@ def main():
         print("✅ Migración terminada OK.")
     finally:
         pg.close()
+        sconn.close()
 
 
 def _sqlite_has_table(conn, table: str) -> bool:
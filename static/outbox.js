@@ -0,0 +1,101 @@
+// static/outbox.js
+// Cola de escrituras offline (IndexedDB). La usan la página (base.html) y el
+// service worker (sw.js, vía importScripts).
+// Cada item lleva una llave de idempotencia generada aquí: el servidor
+// (/sync/lote) aplica cada llave una sola vez, así que reintentar es seguro.
+(function (root) {
+  const DB_NAME = "bless-outbox";
+  const STORE = "items";
+  const LOTE = 50;
+  const SYNC_URL = "/sync/lote";
+
+  function abrir() {
+    return new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NAME, 1);
+      req.onupgradeneeded = () => {
+        const store = req.result.createObjectStore(STORE, { keyPath: "id" });
+        store.createIndex("creado", "creado");
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  function tx(modo, fn) {
+    return abrir().then((db) => new Promise((resolve, reject) => {
+      const t = db.transaction(STORE, modo);
+      const out = fn(t.objectStore(STORE));
+      t.oncomplete = () => { db.close(); resolve(out && out.result !== undefined ? out.result : out); };
+      t.onerror = () => { db.close(); reject(t.error); };
+    }));
+  }
+
+  function uuid() {
+    if (root.crypto && root.crypto.randomUUID) return root.crypto.randomUUID();
+    return "xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx".replace(/[xy]/g, (c) => {
+      const r = (Math.random() * 16) | 0;
+      return (c === "x" ? r : (r & 0x3) | 0x8).toString(16);
+    });
+  }
+
+  function ahoraLocal() {
+    const d = new Date();
+    const p = (n) => String(n).padStart(2, "0");
+    return `${d.getFullYear()}-${p(d.getMonth() + 1)}-${p(d.getDate())} ${p(d.getHours())}:${p(d.getMinutes())}:${p(d.getSeconds())}`;
+  }
+
+  function agregar(op, datos) {
+    const item = { id: uuid(), op, datos, fecha: ahoraLocal(), creado: Date.now(), estado: "pendiente" };
+    return tx("readwrite", (s) => s.put(item)).then(() => item);
+  }
+
+  function listar() {
+    return tx("readonly", (s) => s.getAll()).then((items) =>
+      (items || []).sort((a, b) => a.creado - b.creado));
+  }
+
+  function pendientes() {
+    return listar().then((items) => items.filter((i) => i.estado === "pendiente").length);
+  }
+
+  let enviando = null;
+
+  // Manda la cola por lotes. Los "ok"/"duplicado" se borran; los "pendiente"
+  // (el servidor aún no confirma) siguen en cola; los "error" quedan marcados
+  // (no se reintentan) para que el cobrador los vea.
+  function sincronizar() {
+    if (enviando) return enviando;
+    enviando = (async () => {
+      let enviados = 0;
+      const items = (await listar()).filter((i) => i.estado === "pendiente");
+      for (let i = 0; i < items.length; i += LOTE) {
+        const lote = items.slice(i, i + LOTE);
+        const resp = await fetch(SYNC_URL, {
+          method: "POST",
+          credentials: "same-origin",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ items: lote.map(({ id, op, datos, fecha }) => ({ id, op, datos, fecha })) }),
+        });
+        if (!resp.ok) break;  // sin sesión o servidor caído: se reintenta después
+        const { resultados } = await resp.json();
+        await tx("readwrite", (s) => {
+          for (const r of resultados || []) {
+            if (r.estado === "ok" || r.estado === "duplicado") {
+              s.delete(r.id);
+            } else if (r.estado === "pendiente") {
+              continue;
+            } else {
+              const it = lote.find((x) => x.id === r.id);
+              if (it) s.put({ ...it, estado: "error", detalle: r.detalle || "" });
+            }
+          }
+        });
+        enviados += lote.length;
+      }
+      return enviados;
+    })().finally(() => { enviando = null; });
+    return enviando;
+  }
+
+  root.BlessOutbox = { agregar, listar, pendientes, sincronizar };
+})(self);
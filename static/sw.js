@@ -1,27 +1,29 @@
-<<<<<<< HEAD
-const CACHE_VERSION = "v3";
+// static/sw.js (servido en /sw.js para que controle toda la app)
+importScripts("/static/outbox.js");
+
+const CACHE_VERSION = "v4";
 const STATIC_CACHE = `bless-static-${CACHE_VERSION}`;
+const PAGES_CACHE = `bless-pages-${CACHE_VERSION}`;
 
 const STATIC_ASSETS = [
-=======
-const CACHE_NAME = "bless-v1";
-const ASSETS = [
-  "/",
-  "/dashboard",
-  "/login",
->>>>>>> 6b4abd0 (Fix static paths for PWA)
   "/static/manifest.json",
+  "/static/outbox.js",
   "/static/icons/icon-192.png",
   "/static/icons/icon-512.png"
 ];
 
+// Pantallas que se guardan para trabajar sin señal (plan de cobro y clientes del día)
+const OFFLINE_PAGES = ["/cobros", "/clientes", "/pagos", "/saldos"];
+
+// POST que se encolan si no hay red: ruta -> [operación de /sync/lote, a dónde volver]
+const QUEUED_POSTS = {
+  "/cobros/pago_rapido": ["pago_rapido", "/cobros"],
+  "/pagos/crear": ["pago", "/pagos"]
+};
+
 self.addEventListener("install", (event) => {
   event.waitUntil(
-<<<<<<< HEAD
     caches.open(STATIC_CACHE).then((cache) => cache.addAll(STATIC_ASSETS)).catch(() => {})
-=======
-    caches.open(CACHE_NAME).then((cache) => cache.addAll(ASSETS)).catch(() => {})
->>>>>>> 6b4abd0 (Fix static paths for PWA)
   );
   self.skipWaiting();
 });
@@ -29,25 +31,88 @@ self.addEventListener("install", (event) => {
 self.addEventListener("activate", (event) => {
   event.waitUntil(
     caches.keys().then((keys) =>
-<<<<<<< HEAD
-      Promise.all(keys.map((k) => (k !== STATIC_CACHE ? caches.delete(k) : null)))
-=======
-      Promise.all(keys.map((k) => (k !== CACHE_NAME ? caches.delete(k) : null)))
->>>>>>> 6b4abd0 (Fix static paths for PWA)
+      Promise.all(keys.map((k) => (k !== STATIC_CACHE && k !== PAGES_CACHE ? caches.delete(k) : null)))
     )
   );
   self.clients.claim();
 });
 
-<<<<<<< HEAD
-// NO cachear POST/PUT. Solo GET.
-self.addEventListener("fetch", (event) => {
-  if (event.request.method !== "GET") return;
+async function redOPagina(request) {
+  const cache = await caches.open(PAGES_CACHE);
+  try {
+    const resp = await fetch(request);
+    // Solo páginas reales (no el redirect a /login)
+    if (resp.ok && !resp.redirected) cache.put(request, resp.clone());
+    return resp;
+  } catch (e) {
+    const cached = await cache.match(request, { ignoreSearch: true });
+    return cached || new Response(
+      "<h3 style='font-family:sans-serif'>Sin conexión. Abre esta pantalla una vez con señal para usarla offline.</h3>",
+      { status: 503, headers: { "Content-Type": "text/html; charset=utf-8" } }
+    );
+  }
+}
+
+async function postOEncolar(request, op, volver) {
+  try {
+    return await fetch(request.clone());
+  } catch (e) {
+    const form = await request.formData();
+    const datos = {};
+    for (const [k, v] of form.entries()) datos[k] = v;
+    await self.BlessOutbox.agregar(op, datos);
+    if (self.registration.sync) {
+      try { await self.registration.sync.register("bless-outbox"); } catch (err) {}
+    }
+    return Response.redirect(volver + "?offline=1", 303);
+  }
+}
+
+// Calienta el cache de pantallas offline (lo pide base.html una vez al día)
+async function precargar() {
+  const cache = await caches.open(PAGES_CACHE);
+  await Promise.all(OFFLINE_PAGES.map(async (url) => {
+    try {
+      const resp = await fetch(url, { credentials: "same-origin" });
+      if (resp.ok && !resp.redirected) await cache.put(url, resp);
+    } catch (e) {}
+  }));
+}
 
-=======
 self.addEventListener("fetch", (event) => {
->>>>>>> 6b4abd0 (Fix static paths for PWA)
-  event.respondWith(
-    caches.match(event.request).then((cached) => cached || fetch(event.request))
-  );
+  const req = event.request;
+  const url = new URL(req.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (req.method === "POST" && QUEUED_POSTS[url.pathname]) {
+    const [op, volver] = QUEUED_POSTS[url.pathname];
+    event.respondWith(postOEncolar(req, op, volver));
+    return;
+  }
+
+  // NO cachear otros POST/PUT. Solo GET.
+  if (req.method !== "GET") return;
+
+  if (OFFLINE_PAGES.includes(url.pathname)) {
+    event.respondWith(redOPagina(req));
+    return;
+  }
+
+  if (url.pathname.startsWith("/static/")) {
+    event.respondWith(
+      caches.match(req).then((cached) => cached || fetch(req))
+    );
+  }
+});
+
+self.addEventListener("sync", (event) => {
+  if (event.tag === "bless-outbox") {
+    event.waitUntil(self.BlessOutbox.sincronizar());
+  }
+});
+
+self.addEventListener("message", (event) => {
+  const tipo = event.data && event.data.tipo;
+  if (tipo === "precargar") event.waitUntil(precargar());
+  if (tipo === "sincronizar") event.waitUntil(self.BlessOutbox.sincronizar().catch(() => 0));
 });
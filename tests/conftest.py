@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # templates/ y static/ son rutas relativas
+
+# BD de prueba vacía (app.db lee DB_PATH al importarse); nunca la real
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bless_test_"), "test.db")
+os.environ.setdefault("CACHE_BUS", "0")
+os.environ.pop("DATABASE_URL", None)
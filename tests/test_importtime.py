@@ -0,0 +1,15 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.importtime import IMPORT_BUDGET_MS, PESADAS, medir  # noqa: E402
+
+
+def test_import_main_en_frio_dentro_del_presupuesto():
+    total, _, pesadas = medir("main")
+
+    assert total > 0, "no se encontró la línea de import de main en -X importtime"
+    assert total <= IMPORT_BUDGET_MS, f"import en frío {total:.0f} ms > {IMPORT_BUDGET_MS:.0f} ms"
+    assert not pesadas, f"librerías pesadas ({', '.join(PESADAS)}) cargadas al arrancar: {pesadas}"
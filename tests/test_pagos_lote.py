@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app import db
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        r = c.post("/login", data={"username": "admin", "password": "admin123"}, follow_redirects=False)
+        assert r.status_code in (302, 303)
+        yield c
+
+
+def test_lote_mixto_un_item_malo_no_tumba_el_lote(client):
+    db.execute("INSERT INTO clientes (nombre) VALUES (?)", ["Lote Mixto"])
+    cid = db.fetch_one("SELECT MAX(id) AS id FROM clientes")["id"]
+    pagos = [
+        {"cliente_id": cid, "tipo": "abono", "monto": 1000},
+        {"cliente_id": cid, "tipo": 5, "monto": 1000},
+        {"cliente_id": cid, "tipo": ["abono"], "monto": 1000},
+        {"cliente_id": cid, "tipo": "prestamo", "monto_entregado": 5000, "frecuencia": 7, "fecha": 20240101},
+        {"cliente_id": cid, "tipo": "abono", "monto": "1e400"},
+        "no es un objeto",
+    ]
+    r = client.post("/pagos/lote", json={"pagos": pagos})
+    assert r.status_code == 200
+    estados = [x["estado"] for x in r.json()["resultados"]]
+    assert estados == ["ok", "error", "error", "error", "error", "error"]
+    assert r.json()["insertados"] == 1
+    assert r.json()["resultados"][1]["detalle"] == "tipo debe ser abono o prestamo"
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.saldos import FREQ_DAYS, _calcular_saldos, _norm_freq
+from app.utils import co_date_today
+
+
+def _saldo_por_cliente(c: dict, movs: list[dict], today: date) -> dict:
+    """El cálculo de antes de SALDOS_SQL: un loop por cliente sobre sus movimientos."""
+    total_prestado = total_abonos = 0.0
+    last_prestamo = last_abono = last_freq = None
+    last_interes = 20.0
+    for m in movs:
+        t = (m.get("tipo") or "").lower()
+        dt = date.fromisoformat(m["fecha"][:10]) if m.get("fecha") else None
+        if t == "prestamo":
+            total_prestado += float(m.get("monto_entregado") or 0) + float(m.get("seguro") or 0)
+            last_prestamo, last_abono = dt, None
+            last_freq = _norm_freq(m.get("frecuencia"))
+            last_interes = float(m.get("interes_mensual") or 20)
+        else:
+            total_abonos += float(m.get("monto") or 0)
+            if last_prestamo and dt and dt >= last_prestamo:
+                last_abono = dt
+
+    saldo = max(total_prestado - total_abonos, 0.0)
+    freq = last_freq or _norm_freq(c.get("tipo_cobro"))
+    base = last_abono or last_prestamo
+    mora_dias = 0
+    if saldo > 0 and base:
+        due = base + timedelta(days=FREQ_DAYS.get(freq, 30))
+        mora_dias = max((today - due).days, 0)
+    interes = 0.0
+    if saldo > 0 and last_prestamo:
+        interes = saldo * (last_interes / 100.0) * max(0.0, (today - last_prestamo).days / 30.0)
+    return {"frecuencia": freq, "saldo": saldo, "interes": round(interes), "mora_dias": mora_dias}
+
+
+@pytest.fixture(scope="module")
+def clientes():
+    db.init_db()
+    hoy = co_date_today()
+    dia = lambda n: (hoy - timedelta(days=n)).isoformat()  # noqa: E731
+    casos = {
+        "Saldo Mayúsculas": [
+            ("Prestamo", dia(90), 0, 100_000, 5_000, "Semanal"),
+            ("ABONO", dia(80), 20_000, 0, 0, None),
+        ],
+        "Saldo Tipo Nulo": [
+            ("prestamo", dia(60), 0, 200_000, 0, "quincenal"),
+            (None, dia(40), 30_000, 0, 0, None),
+            (None, dia(70), 10_000, 0, 0, None),  # antes del préstamo: no mueve la mora
+        ],
+        "Saldo Dos Prestamos": [
+            ("PRESTAMO", dia(120), 0, 50_000, 0, "diario"),
+            ("abono", dia(110), 50_000, 0, 0, None),
+            ("Prestamo", dia(20), 0, 80_000, 0, "mensual"),
+            ("Abono", dia(5), 10_000, 0, 0, None),
+        ],
+        "Saldo Sin Prestamo": [
+            (None, dia(3), 1_000, 0, 0, None),
+        ],
+    }
+    out = {}
+    for nombre, movs in casos.items():
+        db.execute("INSERT INTO clientes (nombre, tipo_cobro) VALUES (?, ?)", [nombre, "semanal"])
+        cid = db.fetch_one("SELECT MAX(id) AS id FROM clientes")["id"]
+        for tipo, fecha, monto, entregado, seguro, frecuencia in movs:
+            db.execute(
+                "INSERT INTO pagos (cliente_id, fecha, tipo, monto, seguro, monto_entregado, interes_mensual, frecuencia) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [cid, fecha, tipo, monto, seguro, entregado, 20, frecuencia],
+            )
+        out[nombre] = cid
+    return out
+
+
+def test_saldos_sql_igual_al_loop_por_cliente(clientes):
+    hoy = co_date_today()
+    filas = {r["nombre"]: r for r in _calcular_saldos()}
+    for nombre, cid in clientes.items():
+        c = db.fetch_one("SELECT * FROM clientes WHERE id = ?", [cid])
+        movs = db.fetch_all("SELECT * FROM pagos WHERE cliente_id = ? ORDER BY id ASC", [cid])
+        esperado = _saldo_por_cliente(c, movs, hoy)
+        r = filas[nombre]
+        assert r["saldo"] == esperado["saldo"], nombre
+        assert r["interes"] == esperado["interes"], nombre
+        assert r["mora_dias"] == esperado["mora_dias"], nombre
+        assert r["frecuencia"] == esperado["frecuencia"], nombre
+        assert r["en_mora"] == (esperado["mora_dias"] > 0), nombre